@@ -0,0 +1,148 @@
+"""
+Module : data.py
+But : Données OHLCV du backtest. Séries stockées en tableaux NumPy
+      (open_time en ms, open, high, low, close, volume), chargées depuis un
+      .npz ou un CSV de klines Binance (data.binance.vision ou export maison),
+      rééchantillonnées sans boucle Python (1m -> 3m / 5m / 1h ...).
+
+Téléchargement (futures, pagination 1500 bougies) :
+    python -m backtest.data ALGOUSDT 2024-01-01 2025-01-01 data/algousdt_1m.npz
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from core.candle_store import FIELDS, CandleView
+
+INTERVALS_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+
+def interval_ms(interval):
+    try:
+        return INTERVALS_MS[interval]
+    except KeyError:
+        raise ValueError(f"Intervalle non supporté : {interval}")
+
+def from_arrays(open_time, o, h, l, c, v):
+    """
+    Série OHLCV (CandleView) à partir de tableaux, triée et dédoublonnée par open_time.
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    values = [np.asarray(x, dtype=np.float64) for x in (o, h, l, c, v)]
+    order = np.argsort(open_time, kind="stable")
+    open_time = open_time[order]
+    # Doublons (fichiers mensuels qui se chevauchent) : on garde la dernière ligne
+    keep = np.r_[open_time[1:] != open_time[:-1], True]
+    return CandleView([open_time[keep]] + [x[order][keep] for x in values])
+
+# === Lecture / écriture ===
+def load_ohlcv(path):
+    """
+    Charge un .npz (clés = FIELDS) ou un CSV de klines (6 premières colonnes,
+    en-tête facultatif). Les horodatages en µs (fichiers Binance récents) sont ramenés en ms.
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return from_arrays(*(data[name] for name in FIELDS))
+    import pandas as pd
+    with open(path, encoding="utf-8") as f:
+        first = f.readline().split(",")[0].strip()
+    header = 0 if not first.lstrip("-").isdigit() else None
+    df = pd.read_csv(path, header=header, usecols=range(6))
+    open_time = df.iloc[:, 0].to_numpy(dtype=np.int64)
+    if len(open_time) and open_time[0] > 10**14:
+        open_time //= 1000
+    return from_arrays(open_time, *(df.iloc[:, i].to_numpy(dtype=np.float64) for i in range(1, 6)))
+
+def save_ohlcv(path, candles):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, **{name: getattr(candles, name) for name in FIELDS})
+
+def base_interval_ms(candles):
+    """
+    Pas de la série (médiane des écarts entre bougies).
+    """
+    if len(candles) < 2:
+        raise ValueError("Série trop courte pour déterminer l'intervalle")
+    return int(np.median(np.diff(candles.open_time)))
+
+# === Rééchantillonnage ===
+def resample(candles, interval):
+    """
+    Agrège la série de base vers un intervalle supérieur (bougies alignées sur
+    l'epoch, comme chez Binance). Retourne (bougies, last) où last[i] est l'indice
+    dans la série de base de la dernière bougie composant la bougie i :
+    c'est l'instant où la bougie agrégée est clôturée.
+    """
+    step = interval_ms(interval)
+    base = base_interval_ms(candles)
+    n = len(candles)
+    if step == base:
+        return candles, np.arange(n)
+    if step % base:
+        raise ValueError(f"{interval} n'est pas un multiple de l'intervalle de base ({base} ms)")
+    bucket = candles.open_time // step * step
+    starts = np.r_[0, np.flatnonzero(np.diff(bucket)) + 1]
+    last = np.r_[starts[1:] - 1, n - 1]
+    out = CandleView([
+        bucket[starts],
+        candles.open[starts],
+        np.maximum.reduceat(candles.high, starts),
+        np.minimum.reduceat(candles.low, starts),
+        candles.close[last],
+        np.add.reduceat(candles.volume, starts),
+    ])
+    return out, last
+
+# === Téléchargement ===
+def fetch_ohlcv(symbol, interval, start_ms, end_ms):
+    """
+    Télécharge les klines futures [start_ms, end_ms) par pages de 1500 (priorité basse).
+    """
+    from core.binance_client import client
+    from core import rate_limiter
+
+    step = interval_ms(interval)
+    rows = []
+    cursor = start_ms
+    with rate_limiter.low_priority():
+        while cursor < end_ms:
+            page = client.futures_klines(symbol=symbol, interval=interval,
+                                         startTime=cursor, endTime=end_ms - 1, limit=1500)
+            if not page:
+                break
+            rows.extend(page)
+            cursor = int(page[-1][0]) + step
+            print(f"📥 {symbol} {interval} : {len(rows)} bougies", end="\r")
+    print()
+    if not rows:
+        raise ValueError(f"Aucune bougie reçue pour {symbol} {interval}")
+    arr = np.array([r[:6] for r in rows], dtype=np.float64)
+    return from_arrays(arr[:, 0].astype(np.int64), *arr[:, 1:6].T)
+
+def _parse_date(text):
+    return int(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Téléchargement de klines futures pour le backtest")
+    parser.add_argument("symbol")
+    parser.add_argument("start", help="AAAA-MM-JJ (UTC)")
+    parser.add_argument("end", help="AAAA-MM-JJ (UTC, exclu)")
+    parser.add_argument("output", help="Fichier .npz")
+    parser.add_argument("--interval", default="1m")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    candles = fetch_ohlcv(args.symbol.upper(), args.interval, _parse_date(args.start), _parse_date(args.end))
+    save_ohlcv(args.output, candles)
+    print(f"✅ {len(candles)} bougies écrites dans {args.output} ({time.time() - started:.1f}s)")
+
+if __name__ == "__main__":
+    sys.exit(main())
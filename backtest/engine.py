@@ -0,0 +1,403 @@
+"""
+Module : engine.py
+But : Backtest vectorisé des stratégies EMA sur tableaux OHLCV NumPy.
+      - EMA par blocs (même récurrence que core.indicators / ta : ewm adjust=False)
+      - croisements 20/50 et alignement multi-intervalles en opérations sur tableaux
+      - sorties SL/TP (stop_loss_pct / take_profit_pct, trailing facultatif via
+        core.trailing_ladder) sur le high/low intrabar de la série de base,
+        retournement sur signal opposé
+      - liste des trades, courbe d'équité, statistiques
+      Aucune boucle Python par bougie : une année de 1m tient en quelques secondes.
+
+Stratégies :
+    ema_cross : croisement EMA 20/50 sur ema_interval (strategies/ema_cross.py)
+    ema_3m    : croisement EMA 20/50 en 3m confirmé par la tendance EMA 5m (strategies/ema_3m.py)
+
+Différence avec le live : les signaux sont évalués à la clôture des bougies
+(le bot réagit aussi en cours de bougie), l'entrée se fait au close du signal.
+
+Lancement :
+    python -m backtest.engine data/algousdt_1m.npz --strategy ema_3m --trades trades.csv
+"""
+
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from core.config import (
+    ema_interval, stop_loss_pct, take_profit_pct,
+    default_leverage, default_quantity_usdt,
+)
+from core.candle_store import FIELDS, CandleView
+from core import trailing_ladder
+from backtest.data import load_ohlcv, resample
+
+STRATEGIES = ("ema_cross", "ema_3m")
+
+# Frais taker futures par côté (0.04 %)
+DEFAULT_FEE_PCT = 0.0004
+
+# Motifs de sortie (colonne reason de la liste des trades)
+EXIT_SL, EXIT_TP, EXIT_SIGNAL, EXIT_END, EXIT_TRAIL = 0, 1, 2, 3, 4
+EXIT_REASONS = ("sl", "tp", "signal", "end", "trail")
+
+TRADE_DTYPE = np.dtype([
+    ("entry_idx", np.int64), ("exit_idx", np.int64),
+    ("entry_time", np.int64), ("exit_time", np.int64),
+    ("direction", np.int8), ("entry_price", np.float64), ("exit_price", np.float64),
+    ("qty", np.float64), ("pnl", np.float64), ("fees", np.float64),
+    ("ret", np.float64), ("reason", np.int8),
+])
+
+# === Indicateurs ===
+def ema(values, window, min_periods=None):
+    """
+    EMA vectorisée par blocs : y[t] = d * y[t-1] + a * x[t], y[0] = x[0].
+    Dans un bloc de longueur L, y = d^(j+1) * report + a * d^j * cumsum(x * d^-j) ;
+    L est borné pour que d^-L reste représentable. Seul le report entre blocs
+    est séquentiel (n / L itérations). NaN avant min_periods (défaut : window).
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+    alpha = 2.0 / (window + 1)
+    decay = 1.0 - alpha
+    size = max(1, min(n, int(np.log(1e12) / -np.log(decay))))
+    chunks = -(-n // size)
+    padded = np.zeros(chunks * size)
+    padded[:n] = x
+    blocks = padded.reshape(chunks, size)
+
+    j = np.arange(size)
+    inv_pows = decay ** -j.astype(np.float64)
+    pows = decay ** j.astype(np.float64)
+    partial = alpha * pows * np.cumsum(blocks * inv_pows, axis=1)
+
+    # Report d'un bloc au suivant (premier report = x[0] : y[0] = x[0])
+    carry_pow = decay ** size
+    carries = np.empty(chunks)
+    carry = x[0]
+    for i in range(chunks):
+        carries[i] = carry
+        carry = carry_pow * carry + partial[i, -1]
+    result = (partial + np.outer(carries, decay * pows)).ravel()[:n]
+
+    start = (window if min_periods is None else min_periods) - 1
+    out[start:] = result[start:]
+    return out
+
+def cross_signals(close, short=20, long=50):
+    """
+    +1 / -1 sur la bougie où l'EMA courte passe au-dessus / au-dessous de la
+    longue (inégalités strictes, comme detect_ema_cross), 0 sinon.
+    """
+    ema_s = ema(close, short)
+    ema_l = ema(close, long)
+    sig = np.zeros(len(close), dtype=np.int8)
+    prev_s, prev_l, cur_s, cur_l = ema_s[:-1], ema_l[:-1], ema_s[1:], ema_l[1:]
+    sig[1:][(prev_s < prev_l) & (cur_s > cur_l)] = 1
+    sig[1:][(prev_s > prev_l) & (cur_s < cur_l)] = -1
+    return sig
+
+def trend_at(base, bars, at_idx, short=20, long=50):
+    """
+    Tendance EMA de `bars` vue à l'instant de la bougie de base at_idx :
+    EMA provisoire de la bougie en cours (dernières clôtures + close courant),
+    comme indicator_engine.ema(...)[1] dans get_5m_trend. +1 / -1 / 0.
+    """
+    ts = base.open_time[at_idx]
+    pos = np.searchsorted(bars.open_time, ts, side="right") - 1
+    close_now = base.close[at_idx]
+    provisional = []
+    for window in (short, long):
+        alpha = 2.0 / (window + 1)
+        closed = ema(bars.close, window, min_periods=1)
+        prev = closed[np.maximum(pos - 1, 0)]
+        value = np.where(pos >= 1, (1 - alpha) * prev + alpha * close_now, close_now)
+        # Warm-up : au moins `window` bougies (en cours incluse), comme le live
+        provisional.append(np.where(pos + 1 >= window, value, np.nan))
+    p_short, p_long = provisional
+    return np.where(p_short > p_long, 1, np.where(p_short < p_long, -1, 0)).astype(np.int8)
+
+# === Signaux par stratégie ===
+def strategy_signals(base, strategy="ema_cross", interval=None, short=20, long=50,
+                     trend_interval="5m", signal_interval="3m"):
+    """
+    Retourne (entry_idx, direction) : indices dans la série de base où une
+    position est ouverte (clôture de la bougie de signal) et sens (+1 / -1).
+    """
+    if strategy == "ema_cross":
+        bars, last = resample(base, interval or ema_interval)
+        sig = cross_signals(bars.close, short, long)
+        hits = np.flatnonzero(sig)
+        return last[hits], sig[hits]
+    if strategy == "ema_3m":
+        bars, last = resample(base, signal_interval)
+        sig = cross_signals(bars.close, short, long)
+        hits = np.flatnonzero(sig)
+        entry_idx, direction = last[hits], sig[hits]
+        trend_bars, _ = resample(base, trend_interval)
+        trend = trend_at(base, trend_bars, entry_idx, short, long)
+        keep = trend == direction
+        return entry_idx[keep], direction[keep]
+    raise ValueError(f"Stratégie inconnue : {strategy}")
+
+# === Simulation ===
+def simulate(base, entry_idx, direction, sl_pct=stop_loss_pct, tp_pct=take_profit_pct,
+             margin=default_quantity_usdt, leverage=default_leverage, fee_pct=DEFAULT_FEE_PCT,
+             trailing=False, sl_ladder=None, tp_ladder=None):
+    """
+    Chaque signal ferme la position en cours et ouvre la suivante (comme
+    trade_on_external_signal) : le trade k vit sur les bougies (e_k, e_k+1].
+    Première bougie dont le high/low touche le SL ou le TP -> sortie au prix
+    du stop (ou à l'open en cas de gap). SL et TP dans la même bougie :
+    le SL est retenu (hypothèse prudente). Sans touche : sortie au close du
+    signal suivant, ou en fin de série.
+    trailing : SL et TP suivent les paliers (voir _trailing_stops).
+    """
+    n = len(base)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    direction = np.asarray(direction, dtype=np.int8)
+    trades = np.zeros(len(entry_idx), dtype=TRADE_DTYPE)
+    if len(entry_idx) == 0:
+        return trades
+
+    entry = base.close[entry_idx]
+    d = direction.astype(np.float64)
+    sl = entry * (1 - d * sl_pct)
+    tp = entry * (1 + d * tp_pct)
+
+    # Trade auquel appartient chaque bougie (-1 avant le premier signal)
+    seg = np.searchsorted(entry_idx, np.arange(n), side="left") - 1
+    active = np.flatnonzero(seg >= 0)
+    s = seg[active]
+    long_side = direction[s] > 0
+    high, low = base.high[active], base.low[active]
+    sl_bar, tp_bar, trail_bar = sl[s], tp[s], None
+    if trailing:
+        sl_bar, tp_bar, trail_bar = _trailing_stops(
+            entry, direction, s, high, low, sl_bar, tp_pct,
+            sl_ladder or trailing_ladder.sl_ladder,
+            # Sous le premier palier, le TP reste celui du trade (comme current_tp_pct en live)
+            (tp_ladder or trailing_ladder.tp_ladder).scaled(1.0, default=tp_pct),
+        )
+    sl_hit = np.where(long_side, low <= sl_bar, high >= sl_bar)
+    tp_hit = np.where(long_side, high >= tp_bar, low <= tp_bar)
+
+    hit = np.flatnonzero(sl_hit | tp_hit)
+    hit_seg = s[hit]
+    first = hit[np.r_[True, hit_seg[1:] != hit_seg[:-1]]] if len(hit) else hit
+    first_seg = s[first]
+
+    # Sortie par défaut : signal suivant ou fin de série, au close
+    exit_idx = np.r_[entry_idx[1:], n - 1]
+    reason = np.full(len(entry_idx), EXIT_SIGNAL, dtype=np.int8)
+    reason[-1] = EXIT_END
+    exit_price = base.close[exit_idx].copy()
+
+    bar = active[first]
+    is_sl = sl_hit[first]
+    opens = base.open[bar]
+    long_hit = direction[first_seg] > 0
+    # Gap au-delà du stop : exécution à l'open
+    sl_fill = np.where(long_hit, np.minimum(sl_bar[first], opens), np.maximum(sl_bar[first], opens))
+    tp_fill = np.where(long_hit, np.maximum(tp_bar[first], opens), np.minimum(tp_bar[first], opens))
+    exit_idx[first_seg] = bar
+    exit_price[first_seg] = np.where(is_sl, sl_fill, tp_fill)
+    sl_reason = EXIT_SL if trail_bar is None else np.where(trail_bar[first], EXIT_TRAIL, EXIT_SL)
+    reason[first_seg] = np.where(is_sl, sl_reason, EXIT_TP)
+
+    qty = margin * leverage / entry
+    fees = fee_pct * qty * (entry + exit_price)
+    pnl = qty * d * (exit_price - entry) - fees
+
+    trades["entry_idx"] = entry_idx
+    trades["exit_idx"] = exit_idx
+    trades["entry_time"] = base.open_time[entry_idx]
+    trades["exit_time"] = base.open_time[exit_idx]
+    trades["direction"] = direction
+    trades["entry_price"] = entry
+    trades["exit_price"] = exit_price
+    trades["qty"] = qty
+    trades["pnl"] = pnl
+    trades["fees"] = fees
+    trades["ret"] = pnl / margin
+    trades["reason"] = reason
+    return trades
+
+def _trailing_stops(entry, direction, s, high, low, sl_bar, tp_pct, sl_ladder, tp_ladder):
+    """
+    SL / TP en vigueur sur chaque bougie avec trailing, comme
+    update_trailing_sl_and_tp : les paliers sont évalués sur le meilleur prix
+    atteint par le trade jusqu'à la bougie précédente (l'ordre des extrêmes
+    dans la bougie courante est inconnu). Le SL trailing ne fait que se
+    resserrer et coexiste avec le SL initial ; le TP ne fait que s'éloigner.
+    Retourne (sl, tp, trailing_sl_actif) par bougie.
+    """
+    long_side = direction[s] > 0
+    entry_bar = entry[s]
+    favorable = trailing_ladder.gain_array(entry_bar, np.where(long_side, high, low), direction[s])
+
+    # Meilleur gain avant chaque bougie, trade par trade (boucle sur les trades, pas sur les bougies)
+    bounds = np.r_[0, np.flatnonzero(np.diff(s)) + 1, len(s)]
+    best = np.zeros(len(s))
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        if b - a > 1:
+            best[a + 1:b] = np.maximum(np.maximum.accumulate(favorable[a:b - 1]), 0.0)
+    best_price = np.where(long_side, entry_bar * (1 + best), entry_bar * (1 - best))
+
+    trail = trailing_ladder.trailing_sl_array(entry_bar, best_price, direction[s], sl_ladder)
+    # Cliquet : un SL trailing posé reste en place tant qu'un meilleur ne le remplace pas
+    signed = np.where(long_side, trail, -trail)
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        signed[a:b] = np.fmax.accumulate(signed[a:b])
+    trail = np.where(long_side, signed, -signed)
+    active = ~np.isnan(trail) & np.where(long_side, trail > sl_bar, trail < sl_bar)
+    sl_out = np.where(active, trail, sl_bar)
+
+    tp_level = trailing_ladder.trailing_tp_array(entry_bar, best_price, direction[s], tp_pct, tp_ladder)
+    tp_pct_bar = np.fmax(tp_pct, tp_level)
+    tp_out = np.where(long_side, entry_bar * (1 + tp_pct_bar), entry_bar * (1 - tp_pct_bar))
+    return sl_out, tp_out, active
+
+def equity_curve(base, trades, initial_balance=100.0):
+    """
+    Équité bougie par bougie : solde réalisé + latent de la position ouverte au close.
+    """
+    n = len(base)
+    realized = np.zeros(n)
+    if len(trades) == 0:
+        return realized + initial_balance
+    np.add.at(realized, trades["exit_idx"], trades["pnl"])
+    equity = initial_balance + np.cumsum(realized)
+
+    idx = np.arange(n)
+    seg = np.searchsorted(trades["entry_idx"], idx, side="left") - 1
+    safe = np.maximum(seg, 0)
+    open_mask = (seg >= 0) & (idx < trades["exit_idx"][safe])
+    unrealized = (trades["qty"][safe] * trades["direction"][safe]
+                  * (base.close - trades["entry_price"][safe]))
+    return equity + np.where(open_mask, unrealized, 0.0)
+
+# === Statistiques ===
+def summarize(base, trades, equity, initial_balance=100.0):
+    pnl = trades["pnl"]
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    peak = np.maximum.accumulate(equity)
+    drawdown = peak - equity
+    worst = int(np.argmax(drawdown)) if len(drawdown) else 0
+
+    # Sharpe sur les variations d'équité journalières (annualisé, 365 jours)
+    day = base.open_time // 86_400_000
+    day_end = np.r_[np.flatnonzero(np.diff(day)), len(day) - 1] if len(day) else np.array([], dtype=np.int64)
+    daily = np.diff(np.r_[initial_balance, equity[day_end]])
+    sharpe = float(daily.mean() / daily.std() * np.sqrt(365)) if len(daily) > 1 and daily.std() > 0 else None
+
+    gross_profit, gross_loss = float(wins.sum()), float(-losses.sum())
+    return {
+        "bars": len(base),
+        "start": int(base.open_time[0]) if len(base) else None,
+        "end": int(base.open_time[-1]) if len(base) else None,
+        "trades": len(trades),
+        "longs": int((trades["direction"] > 0).sum()),
+        "shorts": int((trades["direction"] < 0).sum()),
+        "win_rate": round(len(wins) / len(trades), 4) if len(trades) else None,
+        "net_pnl": round(float(pnl.sum()), 4),
+        "gross_profit": round(gross_profit, 4),
+        "gross_loss": round(gross_loss, 4),
+        "fees": round(float(trades["fees"].sum()), 4),
+        "profit_factor": round(gross_profit / gross_loss, 3) if gross_loss else None,
+        "avg_trade": round(float(pnl.mean()), 4) if len(trades) else None,
+        "avg_win": round(float(wins.mean()), 4) if len(wins) else None,
+        "avg_loss": round(float(losses.mean()), 4) if len(losses) else None,
+        "avg_bars_held": round(float((trades["exit_idx"] - trades["entry_idx"]).mean()), 1) if len(trades) else None,
+        "exits": {name: int((trades["reason"] == code).sum()) for code, name in enumerate(EXIT_REASONS)},
+        "final_equity": round(float(equity[-1]), 4) if len(equity) else initial_balance,
+        "return_pct": round((float(equity[-1]) / initial_balance - 1) * 100, 3) if len(equity) else 0.0,
+        "max_drawdown": round(float(drawdown[worst]), 4) if len(drawdown) else 0.0,
+        "max_drawdown_pct": round(float(drawdown[worst] / peak[worst] * 100), 3) if len(drawdown) else 0.0,
+        "sharpe_daily": round(sharpe, 3) if sharpe is not None else None,
+    }
+
+class BacktestResult:
+    """
+    Résultat d'un backtest : trades (tableau structuré), équité par bougie, stats.
+    """
+    __slots__ = ("trades", "equity", "stats")
+
+    def __init__(self, trades, equity, stats):
+        self.trades = trades
+        self.equity = equity
+        self.stats = stats
+
+    def trades_to_csv(self, path):
+        header = "entry_time,exit_time,direction,entry_price,exit_price,qty,pnl,fees,ret,reason"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header + "\n")
+            for t in self.trades:
+                f.write(
+                    f"{int(t['entry_time'])},{int(t['exit_time'])},"
+                    f"{'long' if t['direction'] > 0 else 'short'},"
+                    f"{t['entry_price']:.8g},{t['exit_price']:.8g},{t['qty']:.8g},"
+                    f"{t['pnl']:.6f},{t['fees']:.6f},{t['ret']:.6f},{EXIT_REASONS[t['reason']]}\n"
+                )
+
+def run_backtest(base, strategy="ema_cross", interval=None, sl_pct=stop_loss_pct, tp_pct=take_profit_pct,
+                 margin=default_quantity_usdt, leverage=default_leverage, fee_pct=DEFAULT_FEE_PCT,
+                 initial_balance=100.0, short=20, long=50, start=0, signals=None,
+                 trailing=False, sl_lock=1.0, tp_extend=1.0):
+    """
+    start : premières bougies réservées à la chauffe des indicateurs (aucune
+    entrée avant cet indice, stats et équité calculées à partir de lui).
+    signals : (entry_idx, direction) déjà calculés pour cette série (optimisation).
+    trailing : paliers de core.config ; sl_lock / tp_extend multiplient leurs niveaux.
+    """
+    if signals is None:
+        signals = strategy_signals(base, strategy, interval, short, long)
+    entry_idx, direction = signals
+    keep = entry_idx >= start
+    trades = simulate(base, entry_idx[keep], direction[keep], sl_pct, tp_pct, margin, leverage, fee_pct,
+                      trailing, trailing_ladder.sl_ladder.scaled(sl_lock), trailing_ladder.tp_ladder.scaled(tp_extend, default=tp_pct))
+    equity = equity_curve(base, trades, initial_balance)[start:]
+    window = CandleView([getattr(base, name)[start:] for name in FIELDS]) if start else base
+    return BacktestResult(trades, equity, summarize(window, trades, equity, initial_balance))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest vectorisé des stratégies EMA")
+    parser.add_argument("data", help="Fichier OHLCV (.npz ou .csv de klines)")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="ema_cross")
+    parser.add_argument("--interval", default=None, help=f"Intervalle ema_cross (défaut : {ema_interval})")
+    parser.add_argument("--sl", type=float, default=stop_loss_pct)
+    parser.add_argument("--tp", type=float, default=take_profit_pct)
+    parser.add_argument("--margin", type=float, default=default_quantity_usdt)
+    parser.add_argument("--leverage", type=float, default=default_leverage)
+    parser.add_argument("--fee", type=float, default=DEFAULT_FEE_PCT)
+    parser.add_argument("--balance", type=float, default=100.0)
+    parser.add_argument("--trailing", action="store_true", help="SL/TP trailing (paliers de core.config)")
+    parser.add_argument("--trades", default="", help="Export CSV de la liste des trades")
+    parser.add_argument("--equity", default="", help="Export .npy de la courbe d'équité")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    base = load_ohlcv(args.data)
+    loaded = time.perf_counter()
+    result = run_backtest(base, args.strategy, args.interval, args.sl, args.tp,
+                          args.margin, args.leverage, args.fee, args.balance, trailing=args.trailing)
+    elapsed = time.perf_counter() - loaded
+
+    print(json.dumps(result.stats, indent=2))
+    print(f"⏱️ Chargement {loaded - started:.2f}s, backtest {elapsed:.2f}s ({len(base)} bougies)")
+    if args.trades:
+        result.trades_to_csv(args.trades)
+        print(f"✅ Trades écrits dans {args.trades}")
+    if args.equity:
+        np.save(args.equity, result.equity)
+        print(f"✅ Équité écrite dans {args.equity}")
+
+if __name__ == "__main__":
+    sys.exit(main())
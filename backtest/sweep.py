@@ -0,0 +1,331 @@
+"""
+Module : sweep.py
+But : Optimisation des paramètres de stratégie sur tous les cœurs.
+      Recherche en grille ou aléatoire (fenêtres EMA, stop_loss_pct,
+      take_profit_pct, paliers de trailing) répartie sur un pool de process. Les données de
+      marché sont écrites une fois en .npy et ouvertes en memmap lecture seule
+      par chaque worker : les pages sont partagées via le cache du noyau,
+      aucune copie par worker. Découpage walk-forward (fenêtres
+      entraînement / test glissantes ou ancrées) et table de résultats classée.
+
+Lancement :
+    python -m backtest.sweep data/algousdt_1m.npz --strategy ema_3m \\
+        --grid short=10,20,30 long=50,100 sl_pct=0.004:0.012:0.002 tp_pct=0.01:0.03:0.005 \\
+        --walk-forward 6 --metric sharpe_daily --output sweep.csv
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.candle_store import FIELDS, CandleView
+from backtest.data import load_ohlcv
+from backtest import engine
+
+# Paramètres de run_backtest optimisables et leur type
+PARAMS = {
+    "short": int,
+    "long": int,
+    "sl_pct": float,
+    "tp_pct": float,
+    "interval": str,
+    "trailing": int,        # 0 / 1 : paliers de trailing SL/TP (core.trailing_ladder)
+    "sl_lock": float,       # Multiplicateur des niveaux du SL trailing
+    "tp_extend": float,     # Multiplicateur des niveaux du TP trailing
+}
+
+# Métriques de classement (toutes à maximiser)
+METRICS = ("net_pnl", "return_pct", "sharpe_daily", "profit_factor", "win_rate", "avg_trade")
+
+# Bougies de chauffe des indicateurs avant chaque fenêtre de test
+DEFAULT_WARMUP_BARS = 5_000
+
+# === Espace de recherche ===
+def parse_values(name, text):
+    """
+    "10,20,30" -> liste ; "0.004:0.012:0.002" -> bornes incluses, pas donné.
+    """
+    cast = PARAMS.get(name)
+    if cast is None:
+        raise ValueError(f"Paramètre inconnu : {name} (attendus : {', '.join(PARAMS)})")
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        values = np.arange(start, stop + step / 2, step)
+        return [cast(round(v, 10)) for v in values]
+    return [cast(v) for v in text.split(",")]
+
+def _valid(params):
+    return params.get("short", 20) < params.get("long", 50)
+
+def grid(space):
+    """
+    Produit cartésien de l'espace (dict nom -> valeurs), combinaisons invalides exclues.
+    """
+    # Paramètres des signaux en tête : ils varient le moins vite, les tâches voisines partagent leurs signaux
+    names = sorted(space, key=lambda n: n not in ("interval", "short", "long"))
+    combos = (dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names)))
+    return [p for p in combos if _valid(p)]
+
+def random_sample(space, count, seed=0):
+    """
+    Tirage sans remise de `count` points de la grille, sans la matérialiser
+    (décodage en base mixte d'indices tirés au hasard).
+    """
+    names = list(space)
+    sizes = [len(space[n]) for n in names]
+    total = int(np.prod(sizes, dtype=object))
+    rng = np.random.default_rng(seed)
+    picked, seen = [], set()
+    while len(picked) < count and len(seen) < total:
+        flat = int(rng.integers(total))
+        if flat in seen:
+            continue
+        seen.add(flat)
+        params = {}
+        for name, size in zip(reversed(names), reversed(sizes)):
+            flat, i = divmod(flat, size)
+            params[name] = space[name][i]
+        if _valid(params):
+            picked.append({n: params[n] for n in names})
+    # Regroupe les candidats qui partagent leurs signaux (voir grid)
+    picked.sort(key=lambda p: tuple(str(p.get(n)) for n in ("interval", "short", "long")))
+    return picked
+
+# === Découpage walk-forward ===
+def walk_forward_splits(n, folds, train_ratio=0.7, anchored=False):
+    """
+    Découpe [0, n) en `folds` fenêtres de test consécutives. Chaque fenêtre
+    de test est précédée de sa fenêtre d'entraînement (même longueur relative,
+    ou depuis le début de la série si anchored). Retourne [(train, test)] en
+    couples d'indices (début, fin).
+    """
+    if folds < 1:
+        raise ValueError("folds doit être >= 1")
+    # Longueur d'une fenêtre de test telle que train + folds * test = n
+    test_len = int(n * (1 - train_ratio) / (folds * (1 - train_ratio) + train_ratio) + 0.5)
+    train_len = n - folds * test_len
+    if test_len < 1 or train_len < 1:
+        raise ValueError("Série trop courte pour ce découpage")
+    splits = []
+    for k in range(folds):
+        test_start = train_len + k * test_len
+        test_end = n if k == folds - 1 else test_start + test_len
+        train_start = 0 if anchored else test_start - train_len
+        splits.append(((train_start, test_start), (test_start, test_end)))
+    return splits
+
+# === Données partagées (memmap) ===
+def share_ohlcv(candles, directory):
+    """
+    Écrit chaque colonne en .npy dans `directory` (lu en memmap par les workers).
+    """
+    for name in FIELDS:
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(candles, name))
+    return directory
+
+def open_shared(directory):
+    return CandleView([np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in FIELDS])
+
+_base = None
+_fixed = {}
+_signal_cache = {}
+SIGNAL_CACHE_SIZE = 64
+
+def _init_worker(directory, fixed):
+    global _base, _fixed
+    _base = open_shared(directory)
+    _fixed = fixed
+
+def _window(start, end):
+    return CandleView([getattr(_base, name)[start:end] for name in FIELDS])
+
+def _evaluate(task):
+    """
+    Un backtest sur [début, fin) ; les signaux ne sont retenus qu'à partir de trade_start.
+    """
+    task_id, params, start, end, trade_start = task
+    kwargs = dict(_fixed)
+    kwargs.update(params)
+    try:
+        window = _window(start, end)
+        # Signaux mis en cache par worker : seules les fenêtres EMA les changent,
+        # les tâches voisines (même fenêtre, autres SL/TP) les réutilisent
+        key = (start, end, kwargs.get("strategy", "ema_cross"), kwargs.get("interval"),
+               kwargs.get("short", 20), kwargs.get("long", 50))
+        signals = _signal_cache.get(key)
+        if signals is None:
+            if len(_signal_cache) >= SIGNAL_CACHE_SIZE:
+                _signal_cache.clear()
+            signals = _signal_cache[key] = engine.strategy_signals(window, *key[2:])
+        result = engine.run_backtest(window, start=trade_start - start, signals=signals, **kwargs)
+        stats = result.stats
+    except Exception as e:
+        stats = {"error": str(e)}
+    return task_id, stats
+
+# === Exécution ===
+def _score(stats, metric, min_trades):
+    value = stats.get(metric)
+    if value is None or stats.get("trades", 0) < min_trades:
+        return float("-inf")
+    return float(value)
+
+def run_tasks(directory, fixed, tasks, workers=None, progress=True):
+    """
+    Répartit les tâches sur le pool. Les tâches sont envoyées par paquets
+    pour amortir la sérialisation ; le résultat est indexé par task_id.
+    """
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    chunksize = max(1, len(tasks) // (workers * 8))
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory, fixed)) as pool:
+        for done, (task_id, stats) in enumerate(pool.map(_evaluate, tasks, chunksize=chunksize), 1):
+            results[task_id] = stats
+            if progress and (done % 50 == 0 or done == len(tasks)):
+                elapsed = time.time() - started
+                eta = elapsed / done * (len(tasks) - done)
+                print(f"⚙️ {done}/{len(tasks)} backtests ({elapsed:.0f}s, reste ~{eta:.0f}s)", end="\r")
+    if progress:
+        print()
+    return results
+
+def sweep(candles, candidates, fixed=None, metric="net_pnl", min_trades=10, workers=None,
+          folds=0, train_ratio=0.7, anchored=False, warmup=DEFAULT_WARMUP_BARS):
+    """
+    Évalue chaque jeu de paramètres et retourne (classement, plis).
+    - folds = 0 : un backtest par candidat sur toute la série.
+    - folds > 0 : walk-forward ; chaque candidat est évalué sur chaque fenêtre
+      d'entraînement et de test. Pour chaque pli, le meilleur candidat en
+      entraînement est retenu et son score hors échantillon est rapporté.
+    Le classement est trié par score d'entraînement moyen (jamais par le test).
+    """
+    fixed = fixed or {}
+    n = len(candles)
+    workdir = tempfile.mkdtemp(prefix="sweep_")
+    try:
+        share_ohlcv(candles, workdir)
+        tasks = []
+        if folds:
+            splits = walk_forward_splits(n, folds, train_ratio, anchored)
+            for ci, params in enumerate(candidates):
+                for fi, (train, test) in enumerate(splits):
+                    for phase, (a, b) in (("train", train), ("test", test)):
+                        tasks.append(((ci, fi, phase), params, max(0, a - warmup), b, a))
+        else:
+            splits = []
+            tasks = [((ci, 0, "full"), params, 0, n, 0) for ci, params in enumerate(candidates)]
+        results = run_tasks(workdir, fixed, tasks, workers)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    table = []
+    for ci, params in enumerate(candidates):
+        row = dict(params)
+        if folds:
+            train = [results[(ci, fi, "train")] for fi in range(folds)]
+            test = [results[(ci, fi, "test")] for fi in range(folds)]
+            row["score"] = float(np.mean([_score(s, metric, min_trades) for s in train]))
+            row["test_score"] = float(np.mean([_score(s, metric, min_trades) for s in test]))
+            row["trades"] = sum(s.get("trades", 0) for s in train)
+            row["test_trades"] = sum(s.get("trades", 0) for s in test)
+            row["test_net_pnl"] = round(sum(s.get("net_pnl", 0.0) for s in test), 4)
+        else:
+            stats = results[(ci, 0, "full")]
+            row["score"] = _score(stats, metric, min_trades)
+            row.update({k: v for k, v in stats.items() if k in METRICS + ("trades", "max_drawdown_pct", "error")})
+        table.append(row)
+    table.sort(key=lambda r: r["score"], reverse=True)
+
+    fold_report = []
+    for fi, (train, test) in enumerate(splits):
+        best = max(range(len(candidates)), key=lambda ci: _score(results[(ci, fi, "train")], metric, min_trades))
+        fold_report.append({
+            "fold": fi,
+            "train": [int(candles.open_time[train[0]]), int(candles.open_time[train[1] - 1])],
+            "test": [int(candles.open_time[test[0]]), int(candles.open_time[test[1] - 1])],
+            "params": candidates[best],
+            "train_score": _score(results[(best, fi, "train")], metric, min_trades),
+            "test_score": _score(results[(best, fi, "test")], metric, min_trades),
+            "test_stats": results[(best, fi, "test")],
+        })
+    return table, fold_report
+
+# === Sortie ===
+def format_table(table, limit=20):
+    if not table:
+        return "(aucun résultat)"
+    columns = [c for c in table[0] if c != "error"]
+    rows = [[("-" if r.get(c) is None else f"{r[c]:.4g}" if isinstance(r.get(c), float) else str(r[c]))
+             for c in columns] for r in table[:limit]]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(row, widths)) for row in rows]
+    return "\n".join(lines)
+
+def write_csv(path, table):
+    columns = list(dict.fromkeys(c for row in table for c in row))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(columns) + "\n")
+        for row in table:
+            f.write(",".join("" if row.get(c) is None else str(row[c]) for c in columns) + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimisation parallèle des paramètres (grille / aléatoire / walk-forward)")
+    parser.add_argument("data", help="Fichier OHLCV (.npz ou .csv de klines)")
+    parser.add_argument("--strategy", choices=engine.STRATEGIES, default="ema_cross")
+    parser.add_argument("--grid", nargs="+", required=True, metavar="NOM=VALEURS",
+                        help=f"Espace de recherche ({', '.join(PARAMS)}) : a,b,c ou début:fin:pas")
+    parser.add_argument("--random", type=int, default=0, help="Nombre de tirages aléatoires (0 : grille complète)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metric", choices=METRICS, default="net_pnl")
+    parser.add_argument("--min-trades", type=int, default=10)
+    parser.add_argument("--walk-forward", type=int, default=0, metavar="PLIS")
+    parser.add_argument("--train-ratio", type=float, default=0.7)
+    parser.add_argument("--anchored", action="store_true", help="Fenêtres d'entraînement depuis le début de la série")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP_BARS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--fee", type=float, default=engine.DEFAULT_FEE_PCT)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", default="", help="Table complète en CSV")
+    parser.add_argument("--folds-output", default="", help="Détail des plis walk-forward en JSON")
+    args = parser.parse_args(argv)
+
+    space = {}
+    for item in args.grid:
+        name, _, values = item.partition("=")
+        space[name] = parse_values(name, values)
+    candidates = random_sample(space, args.random, args.seed) if args.random else grid(space)
+
+    candles = load_ohlcv(args.data)
+    print(f"🔎 {len(candidates)} candidats, {len(candles)} bougies, "
+          f"{args.walk_forward or 'sans'} pli(s) walk-forward, {args.workers or os.cpu_count()} workers")
+    started = time.time()
+    table, folds = sweep(
+        candles, candidates, fixed={"strategy": args.strategy, "fee_pct": args.fee},
+        metric=args.metric, min_trades=args.min_trades, workers=args.workers,
+        folds=args.walk_forward, train_ratio=args.train_ratio, anchored=args.anchored, warmup=args.warmup,
+    )
+    print(format_table(table, args.top))
+    for fold in folds:
+        print(f"📆 Pli {fold['fold']} : {fold['params']} entraînement={fold['train_score']:.4g} "
+              f"test={fold['test_score']:.4g}")
+    print(f"⏱️ {time.time() - started:.1f}s")
+    if args.output:
+        write_csv(args.output, table)
+        print(f"✅ Classement écrit dans {args.output}")
+    if args.folds_output:
+        with open(args.folds_output, "w", encoding="utf-8") as f:
+            json.dump(folds, f, indent=2)
+        print(f"✅ Plis écrits dans {args.folds_output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
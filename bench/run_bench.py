@@ -0,0 +1,268 @@
+"""
+Module : run_bench.py
+But : Benchmark de bout en bout du pipeline de trading contre le simulateur local.
+      Lance sim.server dans un sous-processus (marché synthétique accéléré ou
+      chemin de prix rejoué), puis exécute dans ce process les vraies boucles
+      ema_cross / ema_3m, open_trade, l'ordonnanceur (SL/TP de sécurité,
+      surveillance, watchdog) et update_trailing_sl_and_tp.
+      Résultat JSON (comparable entre deux versions) :
+      - latences signal -> fill et signal -> SL/TP posés (p50/p90/p99/max)
+      - appels REST et poids par trade (compteurs côté simulateur)
+      - CPU par symbole, RSS max, histogrammes de core.latency
+
+Lancement :
+    python -m bench.run_bench --duration 120 --speed 60 --output bench_output.json
+    python -m bench.run_bench --replay ALGOUSDT=prices.csv --compare bench_output.json
+    python -m bench.run_bench --symbols ALGOUSDT,BTCUSDT,ETHUSDT
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import urllib.request
+
+import psutil
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True).strip()
+    except Exception:
+        return None
+
+def _get_json(url, timeout=2):
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+        return json.loads(r.read())
+
+def _peak_rss():
+    """
+    Mémoire résidente du process en octets (psutil : mêmes unités sur tous les OS) ;
+    pic réel sous Windows (peak_wset), valeur en fin de mesure ailleurs.
+    """
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss)
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None, "mean": None}
+    s = sorted(samples)
+    pick = lambda p: s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+    return {
+        "count": len(s),
+        "p50": round(pick(50), 3),
+        "p90": round(pick(90), 3),
+        "p99": round(pick(99), 3),
+        "max": round(s[-1], 3),
+        "mean": round(sum(s) / len(s), 3),
+    }
+
+# === Simulateur ===
+def start_sim(args, port, workdir):
+    cmd = [
+        sys.executable, "-m", "sim.server", "--port", str(port),
+        "--tick", str(args.tick), "--speed", str(args.speed),
+        "--volatility", str(args.volatility), "--seed", str(args.seed),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), f"--error-codes={args.error_codes}",
+    ]
+    if args.replay:
+        cmd += ["--replay", args.replay]
+    log_path = os.path.join(workdir, "sim.log")
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=open(log_path, "w"), stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            _get_json(f"{url}/sim/stats")
+            return proc, url
+        except Exception:
+            if proc.poll() is not None:
+                with open(log_path) as f:
+                    raise RuntimeError(f"Simulateur arrêté : {f.read()}")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Simulateur injoignable")
+
+# === Bot ===
+def bench_symbols(args):
+    return [s.strip().upper() for s in (args.symbols or args.symbol).split(",") if s.strip()]
+
+def run_pipeline(args, sim_url, workdir):
+    """
+    Importe et démarre les vrais composants du bot contre le simulateur.
+    """
+    os.environ.update({
+        "BINANCE_SIM_URL": sim_url,
+        "SYMBOL": bench_symbols(args)[0],
+        "SYMBOLS": ",".join(bench_symbols(args)),
+        "TELEGRAM_TOKEN": os.environ.get("TELEGRAM_TOKEN", "0:bench"),
+        "TELEGRAM_CHAT_ID": os.environ.get("TELEGRAM_CHAT_ID", "1"),
+        "LATENCY_FLUSH_INTERVAL": "3600",
+        "LOG_FILE": os.path.join(workdir, "bot.jsonl"),  # Journal JSON du benchmark hors de logs/
+        "LOCK_FILE": os.path.join(workdir, "bot.lock"),  # Ne touche pas au bot.lock du dépôt (contrôleur Telegram importé)
+    })
+    sys.path.insert(0, BASE_DIR)
+    from core import latency, user_stream
+    # Journal des trades et traces du benchmark hors de logs/ (ne pollue pas l'historique réel)
+    from core.trade_journal import journal
+    journal.path = os.path.join(workdir, "trades.db")
+    journal.csv_path = None  # Pas d'import de l'historique réel
+    latency.HISTOGRAM_FILE = os.path.join(workdir, "latency_histograms.json")
+    latency.TRACES_FILE = os.path.join(workdir, "latency_traces.jsonl")
+    from core.settings import settings
+    settings.path = os.path.join(workdir, "settings.json")  # Levier/quantité repris des fichiers du dépôt, sans les modifier
+    from core import runtime
+    from core.bot import run_scheduler, stop_event
+    from strategies.ema_cross import start_ema_5m_loop
+    from strategies.ema_3m import start_ema_3m_loop
+
+    user_stream.start()
+    if args.strategy in ("ema_5m", "both"):
+        start_ema_5m_loop()
+    if args.strategy in ("ema_3m", "both"):
+        start_ema_3m_loop()
+    runtime.spawn(run_scheduler, stop_event, name="scheduler")
+    return stop_event
+
+def collect(args, sim_url, wall, cpu, warmup_stats):
+    from core import latency, rate_limiter, http_session, notifier
+
+    traces = [t for t in latency.recent_traces() if t["name"] == "trade"]
+    def stage_at(trace, stage):
+        return next((s["at_ms"] for s in trace["stages"] if s["stage"] == stage), None)
+    to_fill = [v for v in (stage_at(t, "fill.confirmed") for t in traces) if v is not None]
+    to_protected = [v for v in (stage_at(t, "sltp.live") for t in traces) if v is not None]
+    trades = len(to_fill)
+
+    sim_stats = _get_json(f"{sim_url}/sim/stats")
+    calls = sim_stats["calls"] - warmup_stats["calls"]
+    weight = sim_stats["weight"] - warmup_stats["weight"]
+    endpoints = {}
+    for key, v in sim_stats["endpoints"].items():
+        base = warmup_stats["endpoints"].get(key, {"calls": 0, "weight": 0})
+        if v["calls"] - base["calls"]:
+            endpoints[key] = {"calls": v["calls"] - base["calls"], "weight": v["weight"] - base["weight"]}
+
+    n_symbols = len(bench_symbols(args))
+    return {
+        "trades": trades,
+        "signal_to_fill_ms": percentiles(to_fill),
+        "signal_to_protected_ms": percentiles(to_protected),
+        "rest_calls": calls,
+        "rest_weight": weight,
+        "rest_calls_per_trade": round(calls / trades, 2) if trades else None,
+        "rest_weight_per_trade": round(weight / trades, 2) if trades else None,
+        "rest_calls_per_minute": round(calls / wall * 60, 2),
+        "rest_endpoints": endpoints,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_pct": round(cpu / wall * 100, 2),
+        "cpu_seconds_per_symbol": round(cpu / n_symbols, 3),
+        "peak_rss_mb": round(_peak_rss() / 2 ** 20, 1),
+        "exchange": sim_stats["exchange"],
+        "telegram_messages": sim_stats["telegram_messages"],
+        "telegram_outbox": notifier.get_stats(),
+        "client_weight": rate_limiter.get_usage()["weight"],
+        "http": {k: v for k, v in http_session.get_stats().items() if k != "hosts"},
+        "stages": {stage: {k: h[k] for k in ("count", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")}
+                   for stage, h in latency.get_histograms().items()},
+    }
+
+# === Comparaison ===
+def _flatten(d, prefix=""):
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+def compare(baseline, current):
+    """
+    Affiche les métriques scalaires communes et leur variation relative.
+    """
+    base = _flatten(baseline["metrics"])
+    cur = _flatten(current["metrics"])
+    print(f"{'métrique':<45} {'avant':>12} {'après':>12} {'Δ%':>8}")
+    for key in sorted(set(base) & set(cur)):
+        if key.startswith(("rest_endpoints.", "stages.")):
+            continue
+        b, c = base[key], cur[key]
+        delta = f"{(c - b) / b * 100:+.1f}" if b else "-"
+        print(f"{key:<45} {b:>12} {c:>12} {delta:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline de trading (simulateur local)")
+    parser.add_argument("--duration", type=float, default=120, help="Durée mesurée (s réelles)")
+    parser.add_argument("--warmup", type=float, default=10, help="Chauffe exclue des mesures (s)")
+    parser.add_argument("--speed", type=float, default=60, help="Secondes de marché par seconde réelle")
+    parser.add_argument("--tick", type=float, default=0.05, help="Pas du simulateur (s réelles)")
+    parser.add_argument("--volatility", type=float, default=0.0005)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--symbol", default="ALGOUSDT")
+    parser.add_argument("--symbols", default="", help="Univers multi-symbole, ex : ALGOUSDT,BTCUSDT,ETHUSDT (remplace --symbol)")
+    parser.add_argument("--strategy", choices=("ema_5m", "ema_3m", "both"), default="both")
+    parser.add_argument("--replay", default="", help="SYMBOL=fichier de prix enregistrés")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", default="")
+    parser.add_argument("--output", default="", help="Fichier JSON de sortie (stdout sinon)")
+    parser.add_argument("--compare", default="", help="Résultat JSON de référence à comparer")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    proc, sim_url = start_sim(args, _free_port(), workdir)
+    try:
+        stop_event = run_pipeline(args, sim_url, workdir)
+        time.sleep(args.warmup)
+        warmup_stats = _get_json(f"{sim_url}/sim/stats")
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        time.sleep(args.duration)
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        metrics = collect(args, sim_url, wall, cpu, warmup_stats)
+        stop_event.set()
+    finally:
+        proc.terminate()
+
+    result = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "threads": threading.active_count(),
+            "args": vars(args),
+        },
+        "metrics": metrics,
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ Résultats écrits dans {args.output}")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
+    # Threads daemon du bot encore actifs : sortie immédiate
+    sys.stdout.flush()
+    os._exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,126 @@
 import os
+import copy
 import time
+import threading
 from binance.client import Client
 from dotenv import load_dotenv
-import traceback
 from core.notifier import send_telegram
-from core.config import symbol  # <-- Import du symbole centralisé
+from core.config import symbol, read_cache_ttl, sim_url  # <-- Import du symbole centralisé
+from core import rate_limiter, http_session
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # === Chargement des variables d’environnement (.env) ===
 load_dotenv()
 
+# === Coalescing des lectures (single-flight + fraîcheur courte) ===
+# Lectures partagées : appels identiques simultanés = une seule requête HTTP
+READ_METHODS = {
+    "futures_position_information",
+    "futures_get_open_orders",
+    "futures_account",
+    "futures_account_balance",
+    "futures_mark_price",
+    "futures_leverage_bracket",
+    "get_symbol_ticker",
+}
+# Écritures : lectures invalidées après chaque appel
+WRITE_INVALIDATES = {
+    "futures_create_order": ("futures_position_information", "futures_get_open_orders", "futures_account", "futures_account_balance"),
+    "futures_place_batch_order": ("futures_position_information", "futures_get_open_orders", "futures_account", "futures_account_balance"),
+    "futures_cancel_order": ("futures_get_open_orders",),
+    "futures_cancel_all_open_orders": ("futures_get_open_orders",),
+    "futures_change_leverage": ("futures_position_information", "futures_account", "futures_leverage_bracket"),
+}
+
+class _InFlight:
+    __slots__ = ("done", "result", "error", "finished_at", "generation", "level")
+
+    def __init__(self, generation, level):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.generation = generation
+        self.level = level       # Priorité du leader (rate_limiter.PRIORITY_*)
+
+class CoalescingClient:
+    """
+    Enveloppe du Client Binance : les lectures identiques concurrentes partagent
+    une seule requête en vol, et le résultat est réutilisé pendant `ttl` secondes.
+    Toute écriture invalide les lectures qu'elle affecte.
+    Chaque requête réelle passe d'abord par rate_limiter.acquire() : les écritures
+    en priorité ORDER, les autres selon la priorité du thread appelant. Une
+    lecture rejetée (RequestShed) faute de priorité chez le leader est retentée
+    par les appelants en attente plus prioritaires.
+    """
+
+    def __init__(self, raw_client, ttl):
+        self.raw = raw_client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}       # (méthode, args, kwargs) -> _InFlight
+        self._generations = {}   # méthode -> compteur d'invalidations
+
+    def __getattr__(self, name):
+        attr = getattr(self.raw, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        if name in READ_METHODS:
+            return lambda *args, **kwargs: self._read(name, attr, args, kwargs)
+        if name in WRITE_INVALIDATES:
+            return lambda *args, **kwargs: self._write(name, attr, args, kwargs)
+        return lambda *args, **kwargs: self._call(name, attr, args, kwargs)
+
+    def _call(self, name, fn, args, kwargs, level=None):
+        rate_limiter.acquire(rate_limiter.bucket_for_method(name), level)
+        return fn(*args, **kwargs)
+
+    def _read(self, name, fn, args, kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        level = rate_limiter.current_priority()
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                now = time.monotonic()
+                leader = entry is None or (entry.done.is_set() and (entry.error is not None or now - entry.finished_at > self.ttl))
+                if leader:
+                    entry = _InFlight(self._generations.get(name, 0), level)
+                    self._entries[key] = entry
+            if leader:
+                try:
+                    entry.result = self._call(name, fn, args, kwargs, level)
+                except Exception as e:
+                    entry.error = e
+                entry.finished_at = time.monotonic()
+                with self._lock:
+                    # Une écriture a eu lieu pendant la requête : le résultat n'est pas mis en cache
+                    if entry.generation != self._generations.get(name, 0) and self._entries.get(key) is entry:
+                        del self._entries[key]
+                entry.done.set()
+            else:
+                entry.done.wait()
+                # Leader moins prioritaire rejeté par le limiteur : on retente en leader à notre priorité
+                if isinstance(entry.error, rate_limiter.RequestShed) and level < entry.level:
+                    continue
+            if entry.error is not None:
+                raise entry.error
+            return copy.deepcopy(entry.result)
+
+    def invalidate(self, *names):
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [k for k in self._entries if k[0] in names]:
+                del self._entries[key]
+
+    def _write(self, name, fn, args, kwargs):
+        try:
+            return self._call(name, fn, args, kwargs, rate_limiter.PRIORITY_ORDER)
+        finally:
+            self.invalidate(*WRITE_INVALIDATES[name])
+
 # === Gestion singleton client Binance ===
 _client = None
 def get_client():
@@ -16,12 +128,30 @@ def get_client():
     if _client is None:
         API_KEY = os.getenv("BINANCE_API_KEY")
         API_SECRET = os.getenv("BINANCE_API_SECRET")
+        if sim_url:
+            # Le simulateur ne vérifie pas les signatures
+            API_KEY, API_SECRET = API_KEY or "sim", API_SECRET or "sim"
         if not API_KEY or not API_SECRET:
             err = "❌ Clés API Binance manquantes dans .env"
-            print(err)
+            log.error(err)
             send_telegram(err)
             raise ValueError(err)
-        _client = Client(API_KEY, API_SECRET)
+        raw = Client(API_KEY, API_SECRET, ping=False)
+        if sim_url:
+            raw.API_URL = f"{sim_url}/api"
+            raw.FUTURES_URL = f"{sim_url}/fapi"
+            log.info(f"🧪 Client Binance redirigé vers le simulateur : {sim_url}")
+        # Session sur le pool partagé (keep-alive, timeouts par défaut), en-têtes Binance conservés
+        raw.session = http_session.new_session(raw.session.headers)
+        # Relevé du poids utilisé et des Retry-After sur chaque réponse
+        raw.session.hooks["response"].append(rate_limiter.record_response)
+        _client = CoalescingClient(raw, read_cache_ttl)
+        # Préchauffage : DNS + TLS vers spot et futures ouverts avant le premier ordre
+        for warm_up in (raw.ping, raw.futures_ping):
+            try:
+                warm_up()
+            except Exception as e:
+                log.warning(f"⚠️ Préchauffage connexion Binance échoué : {e}")
     return _client
 
 client = get_client() 
@@ -35,14 +165,16 @@ def retry(func, max_retries: int = 3, delay: int = 3, verbose: bool = False):
             return func()
         except Exception as e:
             msg = f"❌ Tentative {attempt} échouée : {e}"
-            print(msg)
+            log.error(msg)
             if verbose:
                 send_telegram(msg)
             if attempt < max_retries:
-                print(f"⏳ Nouvelle tentative dans {delay} secondes...")
-                time.sleep(delay)
+                # Respecte un éventuel Retry-After (429/418) plutôt qu'un délai fixe
+                wait = max(delay, rate_limiter.retry_after_remaining())
+                log.warning(f"⏳ Nouvelle tentative dans {wait:.0f} secondes...")
+                time.sleep(wait)
             else:
-                print("🚫 Échec définitif après plusieurs tentatives.")
+                log.error("🚫 Échec définitif après plusieurs tentatives.")
                 if verbose:
                     send_telegram("🚫 Échec définitif après plusieurs tentatives.")
                 raise
@@ -52,10 +184,10 @@ def check_futures_permissions() -> None:
         account_info = get_client().futures_account()
         if "canTrade" not in account_info or not account_info["canTrade"]:
             raise Exception("⚠ Les Futures ne sont pas activés sur ce compte Binance.")
-        print("✅ Futures activés sur ce compte Binance.")
+        log.info("✅ Futures activés sur ce compte Binance.")
     except Exception as e:
         err_msg = f"❌ Erreur de permission Futures : {e}"
-        print(err_msg)
+        log.error(err_msg)
         send_telegram(err_msg)
         raise
 
@@ -71,13 +203,13 @@ def sync_time() -> None:
         delta = server_time - local_time
         if abs(delta) > 2:
             warn = f"⚠️ Décalage horaire détecté : {delta} secondes (Synchronisez l'horloge système !)"
-            print(warn)
+            log.warning(warn)
             send_telegram(warn)
         else:
-            print("⏰ Heure locale synchronisée avec Binance.")
+            log.info("⏰ Heure locale synchronisée avec Binance.")
     except Exception as e:
         err_msg = f"❌ Erreur lors de la synchronisation de l'heure : {e}"
-        print(err_msg)
+        log.error(err_msg)
         send_telegram(err_msg)
 
 def check_position_open(symbol: str = symbol) -> bool:  # <-- Utilisation du symbole centralisé par défaut
@@ -89,7 +221,7 @@ def check_position_open(symbol: str = symbol) -> bool:  # <-- Utilisation du sym
         return False
     except Exception as e:
         err_msg = f"❌ Erreur check_position_open : {e}"
-        print(err_msg)
+        log.error(err_msg)
         send_telegram(err_msg)
         return False
 
@@ -100,14 +232,14 @@ def change_leverage(symbol: str, leverage: int) -> bool:
     """
     def try_change():
         get_client().futures_change_leverage(symbol=symbol, leverage=leverage)
-        print(f"🔧 Levier mis à jour : x{leverage} sur {symbol}")
+        log.info(f"🔧 Levier mis à jour : x{leverage} sur {symbol}")
 
     try:
         retry(try_change, verbose=True)
         return True
     except Exception as e:
         err_msg = f"❌ Erreur changement levier : {e}"
-        print(err_msg)
+        log.error(err_msg)
         send_telegram(err_msg)
         return False
     return False
@@ -115,8 +247,9 @@ def change_leverage(symbol: str, leverage: int) -> bool:
 # === Vérifie si un symbole est valide (optionnel) ===
 def is_symbol_valid(symbol: str) -> bool:
     try:
-        info = get_client().futures_exchange_info()
-        return any(s['symbol'] == symbol for s in info['symbols'])
+        # Import local pour éviter l'import circulaire
+        from core.symbol_info import is_known_symbol
+        return is_known_symbol(symbol)
     except Exception as e:
-        print(f"❌ Erreur vérification du symbole : {e}")
+        log.error(f"❌ Erreur vérification du symbole : {e}")
         return False
\ No newline at end of file
@@ -1,33 +1,41 @@
 import os
 import time
 import threading
-import traceback
 from binance.client import Client
 from strategies.ema_cross import start_ema_5m_loop
 from strategies.ema_3m import start_ema_3m_loop
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from dotenv import load_dotenv
-from core.state import state
+from core.state import state, states
 from core.telegram_controller import stop_telegram_bot, send_telegram
 from core.config import (
     symbol,                # <-- Import du symbole centralisé
+    symbols,               # <-- Univers multi-symbole
     default_leverage,      # <-- Import du levier par défaut
-    default_quantity_usdt, # <-- Import de la quantité par défaut
     stop_loss_pct,         # <-- Import du SL centralisé
     take_profit_pct,       # <-- Import du TP centralisé
     BASE_DIR,              # <-- Import du répertoire de base
     MODE_FILE,             # <-- Import du chemin mode.txt
-    GAIN_ALERT_FILE        # <-- Import du chemin gain_alert.txt
+    GAIN_ALERT_FILE,       # <-- Import du chemin gain_alert.txt
+    LOCK_FILE,             # <-- Import du chemin bot.lock
+    control_socket         # <-- Socket JSON-RPC optionnelle
 )
 from core.binance_client import client, check_position_open, change_leverage
+from core import user_stream, symbol_info, runtime, commands, notifier
+from core.scheduler import scheduler
+from core.settings import settings
+from core.trade_stats import trade_stats
+from core.trade_journal import journal
 from core.trade_interface import open_trade, close_position
 from core.position_utils import sync_position
 from core.trailing import update_trailing_sl_and_tp, wait_for_tp_or_exit
 from core.utils import safe_round, retry_order
-from core.trading_utils import calculate_quantity, log_trade, get_mode, get_leverage_from_file
+from core.trading_utils import log_trade, get_mode, set_mode, get_leverage_from_file
 import subprocess
 import psutil
-import math
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # === Chargement des variables d’environnement (.env) ===
 load_dotenv()
@@ -36,12 +44,9 @@ API_KEY = os.getenv("BINANCE_API_KEY")
 API_SECRET = os.getenv("BINANCE_API_SECRET")
 
 # === VARIABLES GLOBALES ===
-trailing_thread = None
-tp_thread = None
 stop_event = threading.Event()
-last_bot_tp = None
-last_bot_sl = None
 position_lock = threading.Lock()  # à placer en haut du fichier
+leverage_applied_for = {}  # symbole -> prix d'entrée de la position pour laquelle le levier a été appliqué
 
 # === Vérification que les Futures sont activés sur le compte ===
 def check_futures_permissions():
@@ -49,9 +54,9 @@ def check_futures_permissions():
         account_info = client.futures_account()
         if "canTrade" not in account_info or not account_info["canTrade"]:
             raise Exception("⚠ Les Futures ne sont pas activés sur ce compte Binance.")
-            print("✅ Futures activés sur ce compte Binance.")
+            log.info("✅ Futures activés sur ce compte Binance.")
     except Exception as e:
-        print("❌ Erreur de permission Futures :", e)
+        log.error("❌ Erreur de permission Futures : %s", e)
         raise
 
 # === Synchronisation de l'horloge système avec Binance ===
@@ -61,131 +66,123 @@ def sync_time():
         local_time = int(time.time())
         delta = server_time - local_time
         if abs(delta) > 2:
-            print(f"⚠️ Décalage horaire détecté : {delta} secondes (Synchronisez l'horloge Windows !)")
+            log.warning(f"⚠️ Décalage horaire détecté : {delta} secondes (Synchronisez l'horloge Windows !)")
         else:
-            print("⏰ Heure locale synchronisée avec Binance.")
+            log.info("⏰ Heure locale synchronisée avec Binance.")
     except Exception as e:
-        print("Erreur lors de la synchronisation de l'heure :", e)
+        log.error("Erreur lors de la synchronisation de l'heure : %s", e)
 
 def sync_windows_time():
     try:
         # Force la resynchronisation
         subprocess.run("w32tm /resync", shell=True, check=True)
-        print("⏰ Synchronisation de l'heure Windows effectuée.")
+        log.info("⏰ Synchronisation de l'heure Windows effectuée.")
     except Exception as e:
-        print(f"Erreur lors de la synchronisation de l'heure Windows : {e}")
+        log.error(f"Erreur lors de la synchronisation de l'heure Windows : {e}")
         send_telegram(f"⚠️ Erreur synchronisation heure Windows : {e}")
         
 def get_price_precision(symbol):
-    info = client.futures_exchange_info()
-    for s in info['symbols']:
-        if s['symbol'] == symbol:
-            tick_size = float([f for f in s['filters'] if f['filterType'] == 'PRICE_FILTER'][0]['tickSize'])
-            return int(round(-math.log10(tick_size)))
-    return 4  # Valeur par défaut si non trouvé
+    try:
+        return symbol_info.price_precision(symbol)  # Exchange info en cache (TTL)
+    except Exception:
+        return 4  # Valeur par défaut si non trouvé
 
-from core.trading_utils import get_leverage_from_file  # à importer si dans un fichier utils séparé
+# === POSE SL/TP DE SÉCURITÉ (tâche "sltp" de l'ordonnanceur, par symbole) ===
+def ensure_sl_tp(sym, positions, orders):
+    state = states.get(sym)
+    if state.opening:
+        return  # open_trade pose SL/TP lui-même (lot batchOrders) : pas de seconde paire
+    try:
+        pos = next((p for p in positions if float(p['positionAmt']) != 0), None)
+        if pos is None:
+            state.position_open = False
+            state.current_entry_price = None
+            state.current_direction = None
+            state.current_quantity = None
+            return
 
-def auto_set_sl_tp(stop_event):
-    while not stop_event.is_set():
-        try:
-            positions = client.futures_position_information(symbol=symbol)
-            position_handled = False
-
-            for pos in positions:
-                amt = float(pos['positionAmt'])
-
-                if amt != 0 and not position_handled:
-                    position_handled = True
-
-                    try:
-                        # Récupération fiable du levier via futures_account()
-                        account_info = client.futures_account()
-                        current_leverage = default_leverage
-                        for asset in account_info['positions']:
-                            if asset['symbol'] == symbol:
-                                current_leverage = int(asset.get('leverage', default_leverage))
-                                break
-
-                        # Application du levier
-                        client.futures_change_leverage(symbol=symbol, leverage=current_leverage)
-
-                    except Exception as e:
-                        print(f"⚠️ Erreur application du levier : {e}")
-                        send_telegram(f"⚠️ Erreur application du levier : {e}")
-
-                    # ⬇️ Mise à jour des infos dans le state
-                    state.position_open = True
-                    entry_price = float(pos['entryPrice'])
-                    state.current_entry_price = entry_price
-                    direction = "bullish" if amt > 0 else "bearish"
-                    state.current_direction = direction
-                    qty = abs(amt)
-                    state.current_quantity = qty
-
-                    side_close = "SELL" if direction == "bullish" else "BUY"
-
-                    # Calcul du TP et SL selon la direction
-                    take_profit = entry_price * (1 + take_profit_pct if amt > 0 else 1 - take_profit_pct)
-                    stop_price = entry_price * (1 - stop_loss_pct if amt > 0 else 1 + stop_loss_pct)
-
-                    precision = get_price_precision(symbol)
-                    stop_price = round(stop_price, precision)
-                    take_profit = round(take_profit, precision)
-
-                    orders = client.futures_get_open_orders(symbol=symbol)
-                    sl_orders = [o for o in orders if o['type'] == "STOP_MARKET" and o['side'] == side_close and o.get('closePosition', False)]
-                    tp_orders = [o for o in orders if o['type'] == "TAKE_PROFIT_MARKET" and o['side'] == side_close and o.get('closePosition', False)]
-
-                    # Vérifie juste la présence d'au moins un SL/TP
-                    has_sl = len(sl_orders) > 0
-                    has_tp = len(tp_orders) > 0
-
-                    print(f"Positions: {amt}, SL orders found: {len(sl_orders)}, TP orders found: {len(tp_orders)}")
-                    print(f"Has SL: {has_sl}, Has TP: {has_tp}")
-
-                    # Ne supprime rien, pose un SL/TP seulement si aucun n'existe
-                    if not has_tp:
-                        retry_order(lambda: client.futures_create_order(
-                            symbol=symbol,
-                            side=side_close,
-                            type="TAKE_PROFIT_MARKET",
-                            stopPrice=take_profit,
-                            closePosition=True,
-                            timeInForce="GTC"
-                        ))
-                        last_bot_tp = take_profit
-                        send_telegram(f"🎯Take profit automatique à {take_profit}$")
-
-                    if not has_sl:
-                        retry_order(lambda: client.futures_create_order(
-                            symbol=symbol,
-                            side=side_close,
-                            type="STOP_MARKET",
-                            stopPrice=stop_price,
-                            closePosition=True,
-                            timeInForce="GTC"
-                        ))
-                        last_bot_sl = stop_price
-                        send_telegram(f"🛡 Stop loss automatique à {stop_price}$")
-
-            if not position_handled:
-                state.position_open = False
-                state.current_entry_price = None
-                state.current_direction = None
-                state.current_quantity = None
-
-            time.sleep(3)
+        amt = float(pos['positionAmt'])
 
-        except Exception as e:
-            print(f"❌ Erreur dans auto_set_sl_tp : {e}")
-            send_telegram(f"❌ Erreur dans auto_set_sl_tp : {e}")
+        # Levier appliqué une seule fois par position (et non à chaque événement)
+        if leverage_applied_for.get(sym) != pos['entryPrice']:
+            leverage_applied_for[sym] = pos['entryPrice']
+            try:
+                # Récupération fiable du levier via futures_account()
+                account_info = client.futures_account()
+                current_leverage = default_leverage
+                for asset in account_info['positions']:
+                    if asset['symbol'] == sym:
+                        current_leverage = int(asset.get('leverage', default_leverage))
+                        break
+
+                # Application du levier
+                client.futures_change_leverage(symbol=sym, leverage=current_leverage)
 
-        time.sleep(3)
+            except Exception as e:
+                log.warning(f"⚠️ Erreur application du levier ({sym}) : {e}")
+                send_telegram(f"⚠️ Erreur application du levier ({sym}) : {e}")
+
+        # ⬇️ Mise à jour des infos dans le state
+        state.position_open = True
+        entry_price = float(pos['entryPrice'])
+        state.current_entry_price = entry_price
+        direction = "bullish" if amt > 0 else "bearish"
+        state.current_direction = direction
+        qty = abs(amt)
+        state.current_quantity = qty
+
+        side_close = "SELL" if direction == "bullish" else "BUY"
+
+        # Calcul du TP et SL selon la direction
+        take_profit = entry_price * (1 + take_profit_pct if amt > 0 else 1 - take_profit_pct)
+        stop_price = entry_price * (1 - stop_loss_pct if amt > 0 else 1 + stop_loss_pct)
+
+        stop_price = symbol_info.round_price(sym, stop_price)
+        take_profit = symbol_info.round_price(sym, take_profit)
+
+        def protections(orders):
+            sl = [o for o in orders if o['type'] == "STOP_MARKET" and o['side'] == side_close and o.get('closePosition', False)]
+            tp = [o for o in orders if o['type'] == "TAKE_PROFIT_MARKET" and o['side'] == side_close and o.get('closePosition', False)]
+            return sl, tp
+
+        sl_orders, tp_orders = protections(orders)
+        if not sl_orders or not tp_orders:
+            # Le snapshot peut précéder le SL/TP posé par open_trade : relecture avant de poser
+            sl_orders, tp_orders = protections(user_stream.get_open_orders(sym))
+
+        # Vérifie juste la présence d'au moins un SL/TP
+        has_sl = len(sl_orders) > 0
+        has_tp = len(tp_orders) > 0
+
+        log.debug(f"[{sym}] Positions: {amt}, SL orders found: {len(sl_orders)}, TP orders found: {len(tp_orders)}")
+        log.debug(f"[{sym}] Has SL: {has_sl}, Has TP: {has_tp}")
+
+        # Ne supprime rien, pose un SL/TP seulement si aucun n'existe
+        if not has_tp:
+            user_stream.record_order(retry_order(lambda: client.futures_create_order(
+                symbol=sym,
+                side=side_close,
+                type="TAKE_PROFIT_MARKET",
+                stopPrice=take_profit,
+                closePosition=True,
+                timeInForce="GTC"
+            )))
+            send_telegram(f"🎯Take profit automatique {sym} à {take_profit}$")
+
+        if not has_sl:
+            user_stream.record_order(retry_order(lambda: client.futures_create_order(
+                symbol=sym,
+                side=side_close,
+                type="STOP_MARKET",
+                stopPrice=stop_price,
+                closePosition=True,
+                timeInForce="GTC"
+            )))
+            send_telegram(f"🛡 Stop loss automatique {sym} à {stop_price}$")
 
-def should_stop():
-    stop_path = os.path.join(BASE_DIR, "stop.txt")
-    return os.path.exists(stop_path)
+    except Exception as e:
+        log.error(f"❌ Erreur dans ensure_sl_tp ({sym}) : {e}")
+        send_telegram(f"❌ Erreur dans ensure_sl_tp ({sym}) : {e}")
 
 def update_status(text):  # ✅ version avec try-except
     try:
@@ -193,75 +190,88 @@ def update_status(text):  # ✅ version avec try-except
         with open(status_path, "w") as f:
             f.write(text)
     except Exception as e:
-        print(f"Erreur écriture status.txt : {e}")
-
-def manual_close_requested():
-    manual_close_path = os.path.join(BASE_DIR, "manual_close_request.txt")
-    return os.path.exists(manual_close_path)
-
-def reset_manual_close():
-    manual_close_path = os.path.join(BASE_DIR, "manual_close_request.txt")
-    if os.path.exists(manual_close_path):
-        os.remove(manual_close_path)
-
-def manual_close_watcher(stop_event):
-    while not stop_event.is_set():
-        if manual_close_requested():
-            try:
-                close_position()
-            except Exception as e:
-                send_telegram(f"❌ Erreur lors de la fermeture manuelle : {e}")
-            reset_manual_close()
-        time.sleep(0.1)
-
-# === FONCTION DE SURVEILLANCE DE LA POSITION ===
-def monitor_position(stop_event):
-    global last_bot_tp, last_bot_sl
-    last_position_amt = None
-    last_detected_tp = None
-    last_detected_sl = None
-
-    while not stop_event.is_set():
+        log.error(f"Erreur écriture status.txt : {e}")
+
+# === COMMANDES (bus en mémoire : Telegram, socket de contrôle) ===
+def close_positions(sym=None):
+    """
+    Commande "close" : ferme la position de sym, ou toutes les positions
+    ouvertes de l'univers (paire principale si aucune n'est connue).
+    """
+    targets = [sym.upper()] if sym else (states.open_positions() or [symbol])
+    for target in targets:
         try:
-            positions = client.futures_position_information(symbol=symbol)
-            detected = False
-            for pos in positions:
-                if float(pos['positionAmt']) != 0:
-                    detected = True
-                    with position_lock:
-                        if not state.position_open:
-                            send_telegram("⚠ Une position a été détectée ouverte manuellement sur Binance.")
-                        state.position_open = True
-                        state.current_entry_price = float(pos['entryPrice'])
-                        state.current_direction = "bullish" if float(pos['positionAmt']) > 0 else "bearish"
-                        state.current_quantity = abs(float(pos['positionAmt']))
-                    # Log pour debug
-                    print(f"[monitor_position] Position détectée : {pos['positionAmt']} @ {pos['entryPrice']}")
-                    # Vérifie les ordres ouverts
-                    orders = client.futures_get_open_orders(symbol=symbol)
-                    tp = None
-                    sl = None
-                    for order in orders:
-                        if order['type'] == "TAKE_PROFIT_MARKET":
-                            tp = float(order['stopPrice'])
-                        if order['type'] == "STOP_MARKET":
-                            sl = float(order['stopPrice'])
-                    last_position_amt = float(pos['positionAmt'])
-                    break  # Une seule position prise en compte
-            if not detected:
-                with position_lock:
-                    if state.position_open:
-                        print("[monitor_position] Reset de la position (aucune position détectée)")
-                        state.reset_all()
-                        last_detected_tp = None
-                        last_detected_sl = None
-                        last_position_amt = None
-            time.sleep(1)  # Vérification plus fréquente
+            close_position(target)
         except Exception as e:
-            print("Erreur dans monitor_position :", e)
-            traceback.print_exc()
-            time.sleep(10)
-           
+            send_telegram(f"❌ Erreur lors de la fermeture manuelle {target} : {e}")
+    return targets
+
+def request_stop(reason="commande stop"):
+    """
+    Commande "stop" : arrêt immédiat de toutes les tâches (stop_event).
+    """
+    if not stop_event.is_set():
+        stop_event.set()
+        send_telegram(f"🛑 Arrêt du bot ({reason}).")
+        update_status(f"ARRÊT - {reason}")
+    return True
+
+def bot_status():
+    """
+    Commande "status" : mode et positions ouvertes.
+    """
+    return {**settings.get().as_dict(), "running": not stop_event.is_set(), "open_positions": states.open_positions()}
+
+def update_settings(**changes):
+    """
+    Commande "settings" : lit (sans argument) ou modifie les paramètres dynamiques.
+    """
+    if changes:
+        settings.update(source="commande", **changes)
+    return settings.get().as_dict()
+
+commands.register("close", close_positions)
+commands.register("stop", request_stop)
+commands.register("mode", set_mode)
+commands.register("status", bot_status)
+commands.register("settings", update_settings)
+commands.register("stats", trade_stats.compute)
+
+# === SURVEILLANCE DE LA POSITION (tâche "monitor" de l'ordonnanceur, par symbole) ===
+def watch_position(sym, positions, orders):
+    state = states.get(sym)
+    pos = next((p for p in positions if float(p['positionAmt']) != 0), None)
+    if pos is not None:
+        with position_lock:
+            if not state.position_open:
+                send_telegram(f"⚠ Une position {sym} a été détectée ouverte manuellement sur Binance.")
+            state.position_open = True
+            state.current_entry_price = float(pos['entryPrice'])
+            state.current_direction = "bullish" if float(pos['positionAmt']) > 0 else "bearish"
+            state.current_quantity = abs(float(pos['positionAmt']))
+        # Log pour debug
+        log.debug(f"[monitor_position] {sym} Position détectée : {pos['positionAmt']} @ {pos['entryPrice']}")
+    else:
+        with position_lock:
+            if state.opening:
+                return  # Fill pas encore poussé : open_trade tient l'état à jour
+            trade_id = state.current_position_id
+            if trade_id:
+                # Position disparue sans exécution closePosition reçue (flux coupé, fermeture externe)
+                journal.close(sym, trade_id, status="FERMÉ - EXTERNE")
+            if state.position_open or trade_id:
+                log.info(f"[monitor_position] {sym} Reset de la position (aucune position détectée)")
+                state.reset_all()
+
+# === ORDONNANCEUR : une seule boucle pour tous les symboles ===
+# Flux actif : réveil au prochain événement position/ordre ; sinon polling groupé
+# (un positionRisk pour tout l'univers) toutes les 6s pour le SL/TP, 1s pour la surveillance.
+scheduler.add("sltp", ensure_sl_tp, 6)
+scheduler.add("monitor", watch_position, 1, low_priority=True, needs_orders=False)  # Surveillance passive : cède le budget de poids au trading
+
+async def run_scheduler(stop_event):
+    await scheduler.run(stop_event)
+
 def is_another_bot_running(lock_file):
     """Vérifie si un autre process Python (hors le nôtre) tourne et a le lock."""
     current_pid = os.getpid()
@@ -278,27 +288,27 @@ def is_another_bot_running(lock_file):
     return False
 
 def run_bot():
-    lock_file = os.path.join(BASE_DIR, "bot.lock")
+    lock_file = LOCK_FILE
 
     # Si le lock existe, vérifie s'il y a un autre bot actif
     if os.path.exists(lock_file):
         if is_another_bot_running(lock_file):
-            print("⚠️ Une autre instance du bot est déjà en cours (process détecté). Abandon.")
+            log.warning("⚠️ Une autre instance du bot est déjà en cours (process détecté). Abandon.")
             send_telegram("⚠️ Lancement annulé : une autre instance du bot est déjà en cours (process détecté).")
             return
         else:
             # Aucun autre process, lock orphelin : on le supprime
             try:
                 os.remove(lock_file)
-                print("🟢 Fichier bot.lock orphelin supprimé automatiquement.")
+                log.info("🟢 Fichier bot.lock orphelin supprimé automatiquement.")
             except Exception as e:
-                print(f"❌ Impossible de supprimer bot.lock : {e}")
+                log.error(f"❌ Impossible de supprimer bot.lock : {e}")
                 send_telegram(f"❌ Impossible de supprimer bot.lock : {e}")
                 return
 
     # Vérifie à nouveau après suppression
     if os.path.exists(lock_file):
-        print("⚠️ Une autre instance du bot est déjà en cours. Abandon.")
+        log.warning("⚠️ Une autre instance du bot est déjà en cours. Abandon.")
         send_telegram("⚠️ Lancement annulé : une autre instance du bot est déjà en cours.")
         return
 
@@ -310,45 +320,32 @@ def run_bot():
         send_telegram("🤖 Bot est bien lancé monsieur ...")
         update_status("ACTIF - En cours d'exécution ...")
 
-        print("🔁 Lancement des threads de surveillance...")
-        resilient_thread(monitor_position, stop_event)
-
         levier = get_leverage_from_file()
-        if change_leverage(symbol, levier):
-            print(f"✅ Levier mis à jour avec succès : x{levier}")
+        failed = [sym for sym in symbols if not change_leverage(sym, levier)]
+        if not failed:
+            log.info(f"✅ Levier mis à jour avec succès : x{levier}")
             send_telegram(f"✅ Levier mis à jour avec succès : x{levier}")  # <-- Ajout du message Telegram
         else:
-            print(f"⚠️ Levier non mis à jour : x{levier}")
-            send_telegram(f"⚠️ Levier non mis à jour : x{levier}")  # <-- Ajout du message Telegram
+            log.warning(f"⚠️ Levier non mis à jour : x{levier} ({', '.join(failed)})")
+            send_telegram(f"⚠️ Levier non mis à jour : x{levier} ({', '.join(failed)})")  # <-- Ajout du message Telegram
 
         backoff_time = 5
         max_backoff = 60
-        print("🔄 Démarrage du bot de trading...")
+        log.info("🔄 Démarrage du bot de trading...")
 
+        # Fermeture manuelle, mode et arrêt arrivent par le bus de commandes :
+        # ce thread attend seulement le stop_event (plus de fichiers de signal)
         while not stop_event.is_set():
             try:
-                if should_stop():
-                    stop_event.set()
-                    send_telegram("🛑 Fichier stop.txt détecté, arrêt du bot.")
-                    update_status("ARRÊT - Fichier stop.txt détecté")
-                    break
-
-                time.sleep(5)
-
-                if manual_close_requested() and state.position_open:
-                    close_position()
-                    reset_manual_close()
-                    time.sleep(2)
-
-                time.sleep(10)
+                stop_event.wait(15)
                 backoff_time = 5  # Réinitialise le délai si tout va bien
 
             except Exception as e:
                 send_telegram(f"❌ Erreur principale : {e}")
                 update_status(f"ERREUR - {str(e)}")
-                traceback.print_exc()
-                print(f"⏳ Erreur rencontrée, nouvelle tentative dans {backoff_time}s...")
-                time.sleep(backoff_time)
+                log.exception(f"❌ Erreur principale : {e}")
+                log.warning(f"⏳ Erreur rencontrée, nouvelle tentative dans {backoff_time}s...")
+                stop_event.wait(backoff_time)
                 backoff_time = min(max_backoff, backoff_time * 2)
 
         update_status("ARRÊT - Terminé proprement")
@@ -356,51 +353,36 @@ def run_bot():
 # le fichier bot.lock
 
     finally:
-        print("🔒 Arrêt du bot, suppression du fichier de verrouillage...")
+        runtime.stop()  # Annule toutes les tâches de fond et ferme les WebSockets
+        log.info("🔒 Arrêt du bot, suppression du fichier de verrouillage...")
         if os.path.exists(lock_file):
             os.remove(lock_file)
           
 # === FONCTION PRINCIPALE DU BOT ===
 def launch_bot():
-    global trailing_thread, tp_thread
-
     try:
-        if not change_leverage(symbol, default_leverage):
-            send_telegram(f"❌ Bot arrêté : changement de levier échoué sur {symbol}")
-            return
+        for sym in symbols:
+            if not change_leverage(sym, default_leverage):
+                send_telegram(f"❌ Bot arrêté : changement de levier échoué sur {sym}")
+                return
 
-        start_ema_5m_loop()   # ← Stratégie EMA 5min (timer 5s)
-        start_ema_3m_loop()   # ← Stratégie EMA 3min
-        
-        # Stocker les threads dans les variables globales
-        trailing_thread = resilient_thread(auto_set_sl_tp, stop_event)
-        tp_thread = resilient_thread(manual_close_watcher, stop_event)
-        resilient_thread(monitor_position, stop_event)  # Tu peux aussi stocker celui-ci si tu veux
+        user_stream.start()   # ← Position/ordres poussés par le user-data stream
+        start_ema_5m_loop()   # ← Stratégie EMA 5min, tous les symboles
+        start_ema_3m_loop()   # ← Stratégie EMA 3min, tous les symboles
 
-        print("🔄 Lancement du bot de trading...")
+        # Tâches de fond : coroutines de la boucle du runtime, annulées au stop_event
+        log.info(f"🔁 Lancement de l'ordonnanceur ({len(symbols)} symbole(s) : {', '.join(symbols)})...")
+        runtime.spawn(run_scheduler, stop_event, name="scheduler")  # SL/TP de sécurité, surveillance, watchdog
+        runtime.spawn(commands.bus.run, name="commands")  # Fermeture manuelle, mode, arrêt : effet immédiat
+        if control_socket:
+            runtime.spawn(commands.serve_socket, control_socket, name="control_socket")
+        runtime.spawn(runtime.watch_stop_event, stop_event, name="stop_watch", resilient=False)
+
+        log.info("🔄 Lancement du bot de trading...")
         run_bot()
     except Exception as e:
         send_telegram(f"❌ Erreur critique lors du lancement du bot : {e}")
-        traceback.print_exc()
-
-# === FONCTIONS DE LECTURE DES VALEURS DYNAMIQUES ===
-def get_dynamic_leverage():
-    try:
-        lev_path = os.path.join(BASE_DIR, "leverage.txt")
-        with open(lev_path, "r") as f:
-            lev = int(f.read().strip())
-            return lev
-    except Exception:
-        return default_leverage
-
-def get_dynamic_quantity():
-    try:
-        qty_path = os.path.join(BASE_DIR, "quantity.txt")
-        with open(qty_path, "r") as f:
-            qty = float(f.read().strip())
-            return qty
-    except Exception:
-        return default_quantity_usdt
+        log.exception(f"❌ Erreur critique lors du lancement du bot : {e}")
 
 def retry_order(order_fn, max_retries=3, delay=2):
     for attempt in range(max_retries):
@@ -411,7 +393,7 @@ def retry_order(order_fn, max_retries=3, delay=2):
                 time.sleep(delay)
             else:
                 send_telegram(f"❌ Erreur lors de la pose d'un ordre (SL/TP) : {e}")
-                print(f"❌ Erreur lors de la pose d'un ordre (SL/TP) : {e}")
+                log.error(f"❌ Erreur lors de la pose d'un ordre (SL/TP) : {e}")
 
 def resilient_thread(target_fn, *args):  # ✅ Nouvelle version
     def wrapper():
@@ -421,7 +403,7 @@ def resilient_thread(target_fn, *args):  # ✅ Nouvelle version
                 target_fn(*args)
                 break
             except Exception as e:
-                print(f"Thread {target_fn.__name__} crashé : {e}, relance dans 5s")
+                log.error(f"Thread {target_fn.__name__} crashé : {e}, relance dans 5s")
                 retries += 1
                 if retries > 10:
                     send_telegram(f"❌ Trop d'erreurs sur {target_fn.__name__}, thread arrêté.")
@@ -432,18 +414,16 @@ def resilient_thread(target_fn, *args):  # ✅ Nouvelle version
     return t
 
 def stop_bot():
-    print("🔴 Arrêt du bot demandé, signal d’arrêt envoyé aux threads...")
+    log.info("🔴 Arrêt du bot demandé, signal d’arrêt envoyé aux threads...")
     stop_event.set()
+    user_stream.stop()
+    runtime.stop()  # Annule ordonnanceur, stratégies, trailing et ferme les WebSockets
+    notifier.outbox.flush()  # Derniers messages Telegram en attente
 
-    if trailing_thread and trailing_thread.is_alive():
-        trailing_thread.join()
-    if tp_thread and tp_thread.is_alive():
-        tp_thread.join()
-    
     # Arrêt propre du bot Telegram
     stop_telegram_bot()
     
-    print("🟢 Tous les composants ont été arrêtés proprement.")
+    log.info("🟢 Tous les composants ont été arrêtés proprement.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+"""
+Module : candle_store.py
+But : Stockage unique des bougies pour tout le process, par (symbole, intervalle).
+      Chaque série est un buffer circulaire NumPy de taille fixe ; les stratégies
+      reçoivent des vues en lecture seule (aucune copie, aucune allocation pandas).
+"""
+
+import threading
+import numpy as np
+
+from core.config import kline_window
+
+FIELDS = ("open_time", "open", "high", "low", "close", "volume")
+
+class CandleView:
+    """
+    Vue en lecture seule sur les n dernières bougies d'un buffer.
+    Les tableaux partagent la mémoire du buffer : la bougie en cours (dernière
+    ligne) continue d'évoluer. Utiliser .copy() pour figer une valeur.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, arrays):
+        for name, arr in zip(FIELDS, arrays):
+            setattr(self, name, arr)
+
+    def __len__(self):
+        return len(self.close)
+
+class CandleBuffer:
+    """
+    Buffer circulaire à écriture double : chaque ligne est écrite en i et
+    i + capacity, de sorte que les n dernières lignes sont toujours contiguës
+    et peuvent être exposées en vue NumPy sans copie.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._open_time = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((5, 2 * capacity), dtype=np.float64)  # open, high, low, close, volume
+        self._count = 0
+        self.version = 0
+        self.cond = threading.Condition()
+
+    def __len__(self):
+        with self.cond:
+            return min(self._count, self.capacity)
+
+    def _write(self, logical_index, open_time, values):
+        pos = logical_index % self.capacity
+        for p in (pos, pos + self.capacity):
+            self._open_time[p] = open_time
+            self._values[:, p] = values
+
+    def _changed(self):
+        self.version += 1
+        self.cond.notify_all()
+
+    def last_open_time(self):
+        with self.cond:
+            if self._count == 0:
+                return None
+            pos = (self._count - 1) % self.capacity
+            return int(self._open_time[pos])
+
+    def upsert(self, open_time, o, h, l, c, v):
+        """
+        Met à jour la bougie en cours ou ajoute une nouvelle bougie.
+        Les bougies plus anciennes que la dernière sont ignorées.
+        """
+        with self.cond:
+            values = (o, h, l, c, v)
+            if self._count:
+                last = (self._count - 1) % self.capacity
+                last_time = self._open_time[last]
+                if open_time == last_time:
+                    self._write(self._count - 1, open_time, values)
+                    self._changed()
+                    return True
+                if open_time < last_time:
+                    return False
+            self._write(self._count, open_time, values)
+            self._count += 1
+            self._changed()
+            return True
+
+    def replace(self, rows):
+        """
+        Remplace tout le contenu (backfill REST). `rows` au format klines REST.
+        Les bougies plus récentes que le backfill (déjà reçues en live) sont conservées.
+        """
+        with self.cond:
+            newer = []
+            if rows and self._count:
+                newest_rest = int(rows[-1][0])
+                n = min(self._count, self.capacity)
+                view = self._view_locked(n)
+                newer = [(int(view[0][j]),) + tuple(float(view[i][j]) for i in range(1, 6))
+                         for j in range(n) if view[0][j] > newest_rest]
+            self._count = 0
+            for r in rows[-self.capacity:]:
+                self._write(self._count, int(r[0]), (float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])))
+                self._count += 1
+            for r in newer:
+                self._write(self._count, r[0], r[1:])
+                self._count += 1
+            self._changed()
+
+    def _view_locked(self, n):
+        n = min(n, self._count, self.capacity)
+        end = (self._count - 1) % self.capacity + self.capacity + 1 if self._count else self.capacity
+        start = end - n
+        arrays = [self._open_time[start:end]] + [self._values[i, start:end] for i in range(5)]
+        for arr in arrays:
+            arr.flags.writeable = False
+        return arrays
+
+    def view(self, n):
+        """
+        Retourne une CandleView (lecture seule) des n dernières bougies.
+        """
+        with self.cond:
+            return CandleView(self._view_locked(n))
+
+    def wait_for_change(self, version, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version != version
+
+class CandleStore:
+    """
+    Registre process-wide des buffers, une entrée par (symbole, intervalle).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._buffers = {}
+
+    def get(self, symbol, interval):
+        """
+        Retourne le buffer (symbole, intervalle), créé à la demande.
+        Retourne aussi True si le buffer vient d'être créé.
+        """
+        key = (symbol.upper(), interval)
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is not None:
+                return buf, False
+            buf = CandleBuffer(self.capacity)
+            self._buffers[key] = buf
+            return buf, True
+
+    def keys(self):
+        with self._lock:
+            return list(self._buffers.keys())
+
+    def view(self, symbol, interval, n):
+        buf, _ = self.get(symbol, interval)
+        return buf.view(n)
+
+# ✅ Instance globale unique partagée par toutes les stratégies
+candle_store = CandleStore(kline_window)
@@ -0,0 +1,180 @@
+"""
+Module : commands.py
+But : Bus de commandes en mémoire entre les interfaces (Telegram, socket de
+      contrôle) et le bot de trading : remplace les fichiers de signal
+      (manual_close_request.txt, stop.txt, écriture de mode.txt relue plus tard).
+      publish() est thread-safe et rend la main immédiatement ; la coroutine
+      run() du runtime exécute la commande dès sa publication (pool du runtime),
+      sans aucun polling du disque.
+      Optionnel : serve_socket(path) expose les commandes en JSON-RPC 2.0 sur
+      une socket Unix (une requête JSON par ligne) pour les outils externes ;
+      Linux/macOS uniquement (pas de socket Unix asyncio sous Windows).
+
+Commandes enregistrées par les modules (fn(**params) -> résultat JSON) :
+    commands.register("close", close_positions)
+"""
+
+import os
+import json
+import socket
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from core import runtime
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+class Command:
+    __slots__ = ("name", "params", "source", "future")
+
+    def __init__(self, name, params, source):
+        self.name = name
+        self.params = params
+        self.source = source
+        self.future = Future()  # Résultat du gestionnaire (Telegram peut l'ignorer, le JSON-RPC l'attend)
+
+class CommandBus:
+    def __init__(self):
+        self._handlers = {}
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._signal = runtime.Signal()
+
+    def register(self, name, fn):
+        """
+        Enregistre (ou remplace) le gestionnaire d'une commande.
+        """
+        with self._lock:
+            self._handlers[name] = fn
+
+    def names(self):
+        with self._lock:
+            return sorted(self._handlers)
+
+    def publish(self, name, source="interne", **params):
+        """
+        Publie une commande depuis n'importe quel thread. Les commandes publiées
+        avant le démarrage du bot sont conservées et exécutées à son lancement.
+        """
+        cmd = Command(name, params, source)
+        with self._lock:
+            self._pending.append(cmd)
+        self._signal.fire()
+        return cmd.future
+
+    async def run(self):
+        """
+        Boucle de consommation (coroutine du runtime) : chaque commande part
+        aussitôt dans le pool, une fermeture lente ne retarde pas un arrêt.
+        """
+        while True:
+            version = self._signal.version
+            with self._lock:
+                batch = list(self._pending)
+                self._pending.clear()
+            for cmd in batch:
+                asyncio.ensure_future(self._execute(cmd))
+            if not batch:
+                await self._signal.wait(version, None)
+
+    async def _execute(self, cmd):
+        with self._lock:
+            fn = self._handlers.get(cmd.name)
+        if fn is None:
+            cmd.future.set_exception(KeyError(f"Commande inconnue : {cmd.name}"))
+            return
+        log.info(f"📨 Commande {cmd.name} {cmd.params or ''} ({cmd.source})")
+        try:
+            cmd.future.set_result(await runtime.run_blocking(fn, **cmd.params))
+        except Exception as e:
+            log.exception(f"❌ Erreur commande {cmd.name} : {e}")
+            cmd.future.set_exception(e)
+
+# ✅ Instance globale unique
+bus = CommandBus()
+
+def register(name, fn):
+    bus.register(name, fn)
+
+def publish(name, source="interne", **params):
+    return bus.publish(name, source, **params)
+
+# === Socket de contrôle JSON-RPC (optionnelle) ===
+# Exemple : echo '{"jsonrpc": "2.0", "method": "close", "params": {"sym": "BTCUSDT"}, "id": 1}' | nc -U bot.sock
+async def serve_socket(path):
+    """
+    Serveur JSON-RPC 2.0 sur une socket Unix (accès limité au propriétaire).
+    Sans effet (erreur journalisée) là où les sockets Unix manquent (Windows).
+    """
+    if not hasattr(socket, "AF_UNIX") or not hasattr(asyncio, "start_unix_server"):
+        log.error(f"❌ CONTROL_SOCKET={path} ignoré : sockets Unix non disponibles sur cette plateforme ({os.name})")
+        return
+    if os.path.exists(path):
+        os.remove(path)
+    # Socket créée directement en 0600 (umask) : aucun instant où un autre utilisateur peut s'y connecter
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous_umask = os.umask(0o177)
+    try:
+        sock.bind(path)
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(previous_umask)
+    server = await asyncio.start_unix_server(_handle_client, sock=sock)
+    log.info(f"🟢 Socket de contrôle prête : {path} (commandes : {', '.join(bus.names())})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in list(_clients):
+            task.cancel()
+        await asyncio.gather(*_clients, return_exceptions=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+_clients = set()  # Connexions en cours, annulées à l'arrêt du runtime
+
+async def _handle_client(reader, writer):
+    task = asyncio.current_task()
+    _clients.add(task)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            response = await _rpc(line)
+            writer.write((json.dumps(response, default=str) + "\n").encode())
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except asyncio.CancelledError:
+        pass  # Arrêt du runtime : fin normale (asyncio lit task.exception() sur cette tâche)
+    finally:
+        _clients.discard(task)
+        writer.close()
+
+async def _rpc(line):
+    try:
+        request = json.loads(line)
+        method = request["method"]
+        params = request.get("params") or {}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Requête invalide"}}
+    req_id = request.get("id")
+    if method == "commands":
+        return {"jsonrpc": "2.0", "id": req_id, "result": bus.names()}
+    if method not in bus.names():
+        return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": f"Commande inconnue : {method}"}}
+    if not isinstance(params, dict):
+        return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32602, "message": "params doit être un objet"}}
+    try:
+        result = await asyncio.wrap_future(bus.publish(method, source="socket", **params))
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+    except Exception as e:
+        return {"jsonrpc": "2.0", "id": req_id, "error": {"code": -32000, "message": str(e)}}
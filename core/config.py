@@ -1,10 +1,14 @@
 import os
+import json
 
 from dotenv import load_dotenv
 load_dotenv()  # <-- Ajoute ceci tout en haut, AVANT tout os.getenv
 
 # ⚙️ Paramètres principaux de trading
-symbol = os.getenv("SYMBOL", "ALGOUSDT")         # 🔁 Paire de trading
+symbols = [s.strip().upper() for s in os.getenv("SYMBOLS", os.getenv("SYMBOL", "ALGOUSDT")).split(",") if s.strip()]  # 🌐 Univers tradé (SYMBOLS=ALGOUSDT,ADAUSDT,...)
+symbol = os.getenv("SYMBOL", symbols[0]).strip().upper()  # 🔁 Paire principale (commandes Telegram, valeurs par défaut)
+if symbol not in symbols:
+    symbols.append(symbol)  # Paire principale toujours surveillée (ordonnanceur, stratégies, user-data stream)
 default_leverage = int(os.getenv("LEVERAGE", 10))  # 📈 Levier par défaut
 default_quantity_usdt = float(os.getenv("QUANTITY_USDT", 2))  # 💰 Quantité USDT par trade
 
@@ -27,6 +31,7 @@ MANUAL_CLOSE_FILE = os.path.join(BASE_DIR, "manual_close_request.txt")
 CONTEXT_FILE = os.path.join(BASE_DIR, "context.json")
 STATUS_FILE = os.path.join(BASE_DIR, "status.txt")
 TRADE_STATUS_FILE = os.path.join(BASE_DIR, "trade_status.txt")
+LOCK_FILE = os.getenv("LOCK_FILE", os.path.join(BASE_DIR, "bot.lock"))  # Anti-double instance (bot et Telegram)
 
 # 🔒 Sécurité & accès
 admin_chat_id_env = os.getenv("TELEGRAM_CHAT_ID")
@@ -41,3 +46,91 @@ retry_delay = int(os.getenv("RETRY_DELAY", 2))          # Délai entre les retry
 # === Paramètres EMA Cross centralisés ===
 ema_interval = os.getenv("EMA_INTERVAL", "5m")
 ema_lookback = int(os.getenv("EMA_LOOKBACK", 100))
+
+# === Simulateur local (sim/) ===
+# BINANCE_SIM_URL=http://127.0.0.1:8765 : REST, WebSocket et Telegram redirigés vers `python -m sim.server`
+sim_url = os.getenv("BINANCE_SIM_URL", "").rstrip("/")
+sim_ws_url = sim_url.replace("http", "ws", 1) + "/ws" if sim_url else ""
+
+# === Flux WebSocket des bougies (stratégies EMA) ===
+kline_ws_url = os.getenv("KLINE_WS_URL", sim_ws_url or "wss://stream.binance.com:9443/ws")
+kline_window = max(int(os.getenv("KLINE_WINDOW", 150)), ema_lookback)  # Bougies gardées en mémoire par (symbole, intervalle)
+kline_stale_seconds = int(os.getenv("KLINE_STALE_SECONDS", 30))       # Au-delà, la fenêtre est rechargée via REST
+kline_rest_min_interval = float(os.getenv("KLINE_REST_MIN_INTERVAL", 5))  # Flux coupé : 1 fetch REST max par intervalle, partagé
+
+# === Flux WebSocket Futures (prix mark, trailing SL/TP) ===
+futures_ws_url = os.getenv("FUTURES_WS_URL", sim_ws_url or "wss://fstream.binance.com/ws")
+mark_price_stale_seconds = float(os.getenv("MARK_PRICE_STALE_SECONDS", 5))    # Au-delà, le flux est considéré figé
+mark_price_rest_interval = float(os.getenv("MARK_PRICE_REST_INTERVAL", 15))   # Repli REST : 1 appel max par intervalle
+trailing_position_check_interval = float(os.getenv("TRAILING_POSITION_CHECK", 30))  # Vérif REST de la position dans le trailing
+
+# === User-data stream (listenKey) ===
+listen_key_keepalive_interval = int(os.getenv("LISTEN_KEY_KEEPALIVE", 1800))  # Keepalive listenKey (expire après 60 min)
+user_stream_resync_interval = int(os.getenv("USER_STREAM_RESYNC", 300))       # Contrôle REST de cohérence quand le flux est actif
+
+# === Cache exchange info (filtres symbole) ===
+exchange_info_ttl = int(os.getenv("EXCHANGE_INFO_TTL", 3600))  # Durée de validité du cache (secondes)
+
+# === Coalescing des lectures REST (core.binance_client) ===
+read_cache_ttl = float(os.getenv("READ_CACHE_TTL", 0.5))  # Fraîcheur d'une lecture partagée (secondes), 0 = single-flight seul
+
+# === Budget de poids des requêtes Binance (core.rate_limiter) ===
+weight_limit_futures = int(os.getenv("WEIGHT_LIMIT_FUTURES", 2400))   # Poids max / minute (USDⓈ-M Futures)
+weight_limit_spot = int(os.getenv("WEIGHT_LIMIT_SPOT", 6000))         # Poids max / minute (Spot, klines)
+low_priority_weight_pct = float(os.getenv("LOW_PRIORITY_WEIGHT_PCT", 0.60))       # Au-delà : lectures basse priorité rejetées
+normal_priority_weight_pct = float(os.getenv("NORMAL_PRIORITY_WEIGHT_PCT", 0.85)) # Au-delà : lectures normales mises en attente
+
+# === Pool HTTP partagé (core.http_session) ===
+http_pool_connections = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))   # Nombre d'hôtes gardés en pool
+http_pool_maxsize = int(os.getenv("HTTP_POOL_MAXSIZE", 20))           # Connexions keep-alive max par hôte
+http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))  # Timeout de connexion (s)
+http_read_timeout = float(os.getenv("HTTP_READ_TIMEOUT", 10))          # Timeout de lecture par défaut (s)
+http_order_read_timeout = float(os.getenv("HTTP_ORDER_READ_TIMEOUT", 5))  # Timeout de lecture des ordres (s)
+
+# === Mesures de latence (core.latency) ===
+latency_flush_interval = int(os.getenv("LATENCY_FLUSH_INTERVAL", 60))  # Écriture des histogrammes dans logs/ (s)
+
+# === Paliers de trailing SL/TP (core.trailing_ladder) ===
+# levels : (seuil de gain, niveau) ; au-delà de step_from, niveau = step_base + n * step_level
+# avec n = nombre de pas de step_gain franchis. Niveaux SL : gain verrouillé ; niveaux TP : % du TP.
+# Surchargeables en JSON : TRAILING_SL_RULES='{"levels": [[0.004, 0.001]], "step_from": 0.02, ...}'
+trailing_sl_rules = json.loads(os.getenv("TRAILING_SL_RULES", "null")) or {
+    "levels": [[0.005, 0.002], [0.006, 0.003], [0.010, 0.005], [0.012, 0.006], [0.015, 0.010]],
+    "step_from": 0.015, "step_base": 0.010, "step_gain": 0.005, "step_level": 0.005,
+}
+trailing_tp_rules = json.loads(os.getenv("TRAILING_TP_RULES", "null")) or {
+    "levels": [[0.012, 0.02], [0.018, 0.025]],
+    "step_from": 0.018, "step_base": 0.025, "step_gain": 0.005, "step_level": 0.005,
+}
+trailing_sl_min_distance = float(os.getenv("TRAILING_SL_MIN_DISTANCE", 0.001))  # Écart min prix / nouveau SL (fraction du prix d'entrée)
+
+# === Ordonnanceur multi-symbole (core.scheduler) ===
+scheduler_poll_interval = float(os.getenv("SCHEDULER_POLL_INTERVAL", 1))  # Pas de l'ordonnanceur sans user-data stream (s)
+open_orders_batch_min_symbols = int(os.getenv("OPEN_ORDERS_BATCH_MIN_SYMBOLS", 40))  # openOrders sans symbole (poids 40) au-delà de N symboles
+
+# === Runtime asyncio (core.runtime) ===
+runtime_io_workers = int(os.getenv("RUNTIME_IO_WORKERS", 16))  # Pool des appels REST bloquants lancés depuis la boucle
+
+# === Bus de commandes (core.commands) ===
+control_socket = os.getenv("CONTROL_SOCKET", "")  # Socket Unix JSON-RPC pour les outils externes (vide = désactivé ; non disponible sous Windows)
+
+# === File d'envoi Telegram (core.notifier) ===
+telegram_outbox_size = int(os.getenv("TELEGRAM_OUTBOX_SIZE", 100))  # Messages distincts en attente max (les informatifs les plus anciens sont écartés)
+telegram_rate_per_second = float(os.getenv("TELEGRAM_RATE_PER_SECOND", 1))  # Limite Telegram par chat : ~1 message/s
+telegram_rate_per_minute = int(os.getenv("TELEGRAM_RATE_PER_MINUTE", 20))  # ... et 20 messages/minute
+telegram_coalesce_seconds = float(os.getenv("TELEGRAM_COALESCE_SECONDS", 15))  # Messages similaires (informatifs) regroupés sur cette fenêtre
+
+# === Journal des trades (core.trade_journal) ===
+TRADES_DB = os.getenv("TRADES_DB", os.path.join(LOG_DIR, "trades.db"))  # SQLite (WAL) : remplace logs/logs.csv (importé une fois)
+trade_journal_batch_window = float(os.getenv("TRADE_JOURNAL_BATCH_WINDOW", 0.05))  # Écritures regroupées en une transaction sur cette fenêtre (s)
+
+# === Statistiques des trades (core.trade_stats, commande /stats) ===
+trade_stats_cache_ttl = float(os.getenv("TRADE_STATS_CACHE_TTL", 60))  # Durée max d'un résultat en cache sans nouvelle écriture (fenêtre glissante)
+
+# === Journalisation (core.log) ===
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(LOG_DIR, "bot.jsonl"))  # JSON Lines, une ligne par message
+log_level = os.getenv("LOG_LEVEL", "INFO")                      # Niveau global
+log_levels = os.getenv("LOG_LEVELS", "urllib3=WARNING")         # Niveaux par module : "core.ws_stream=DEBUG,TeleBot=WARNING"
+log_console_level = os.getenv("LOG_CONSOLE_LEVEL", "INFO")      # Niveau minimal affiché en console
+log_max_bytes = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))  # Rotation au-delà de cette taille (et chaque jour à minuit)
+log_backup_count = int(os.getenv("LOG_BACKUP_COUNT", 14))       # Archives .gz conservées
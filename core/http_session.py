@@ -0,0 +1,90 @@
+"""
+Module : http_session.py
+But : Pool de connexions HTTP unique pour tout le process (Binance REST, Telegram).
+      Un seul HTTPAdapter réglé (taille du pool, keep-alive) est monté sur chaque
+      session ; chaque service garde sa propre session pour ses en-têtes
+      (la clé API Binance ne part jamais vers Telegram). Timeouts par défaut
+      par appel et statistiques de réutilisation des connexions.
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+from core.config import (
+    http_pool_connections, http_pool_maxsize,
+    http_connect_timeout, http_read_timeout, http_order_read_timeout,
+)
+
+# Endpoints du chemin d'ordre : timeout de lecture plus court, l'état est de toute façon
+# resynchronisé par le user-data stream si la réponse se perd
+ORDER_PATHS = ("/fapi/v1/order", "/fapi/v1/batchOrders")
+
+_lock = threading.Lock()
+_adapter = None
+
+def get_adapter():
+    """
+    Adapter partagé (keep-alive, pool dimensionné pour les threads du bot).
+    Pas de retry urllib3 : les reprises sont gérées par l'appelant (retry(), rate_limiter).
+    """
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(
+                pool_connections=http_pool_connections,
+                pool_maxsize=http_pool_maxsize,
+                max_retries=0,
+                pool_block=False,
+            )
+        return _adapter
+
+class TimeoutSession(requests.Session):
+    """
+    Session requests avec timeout (connexion, lecture) par défaut si l'appelant n'en fournit pas.
+    """
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            read = http_order_read_timeout if urlparse(url).path in ORDER_PATHS else http_read_timeout
+            kwargs["timeout"] = (http_connect_timeout, read)
+        return super().request(method, url, **kwargs)
+
+def new_session(headers=None):
+    """
+    Nouvelle session montée sur le pool partagé.
+    """
+    session = TimeoutSession()
+    adapter = get_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+# === Statistiques de réutilisation ===
+def get_stats():
+    """
+    Connexions ouvertes vs requêtes servies, par hôte.
+    reuse_ratio = part des requêtes servies sur une connexion déjà ouverte.
+    """
+    adapter = get_adapter()
+    pools = adapter.poolmanager.pools
+    hosts = {}
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        host = f"{pool.scheme}://{pool.host}:{pool.port}"
+        stats = hosts.setdefault(host, {"connections": 0, "requests": 0})
+        stats["connections"] += pool.num_connections
+        stats["requests"] += pool.num_requests
+    total_conn = sum(s["connections"] for s in hosts.values())
+    total_req = sum(s["requests"] for s in hosts.values())
+    return {
+        "connections": total_conn,
+        "requests": total_req,
+        "reuse_ratio": round(1 - total_conn / total_req, 4) if total_req else 0.0,
+        "hosts": hosts,
+    }
@@ -0,0 +1,119 @@
+"""
+Module : indicators.py
+But : Moteur d'indicateurs incrémental. Une EMA courante par
+      (symbole, intervalle, fenêtre), mise à jour en O(1) à la clôture de
+      chaque bougie, avec une valeur provisoire pour la bougie en cours.
+      Même récurrence que ta.trend.EMAIndicator (ewm adjust=False,
+      min_periods=window) : sur la même série, les valeurs sont identiques.
+"""
+
+import threading
+import numpy as np
+
+from core.candle_store import candle_store
+
+class EmaState:
+    """
+    État d'une EMA : valeur à la dernière bougie clôturée et nombre de bougies vues.
+    """
+    __slots__ = ("window", "alpha", "_decay", "value", "count", "last_open_time")
+
+    def __init__(self, window):
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self._decay = 1.0 - self.alpha
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.count = 0
+        self.last_open_time = None
+
+    def _step(self, value, close):
+        if value is None:
+            return close
+        # Même formule que pandas ewm(adjust=False)
+        return (self._decay * value + self.alpha * close) / (self._decay + self.alpha)
+
+    def update(self, close, open_time=None):
+        """
+        Intègre une bougie clôturée (O(1)).
+        """
+        self.value = self._step(self.value, close)
+        self.count += 1
+        self.last_open_time = open_time
+
+    def current(self):
+        """
+        EMA à la dernière bougie clôturée, None pendant le warm-up.
+        """
+        return self.value if self.count >= self.window else None
+
+    def provisional(self, close):
+        """
+        EMA incluant la bougie en cours (non enregistrée dans l'état).
+        """
+        if self.count + 1 < self.window:
+            return None
+        return self._step(self.value, close)
+
+class IndicatorEngine:
+    """
+    EMA courantes synchronisées paresseusement sur le candle_store :
+    à chaque lecture, seules les bougies clôturées depuis la dernière
+    lecture sont intégrées (0 ou 1 en régime normal). Si la série a été
+    rechargée avec un trou (reconnexion longue), l'EMA est réamorcée.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._emas = {}
+
+    def _get_state(self, key):
+        with self._lock:
+            st = self._emas.get(key)
+            if st is None:
+                st = EmaState(key[2])
+                self._emas[key] = st
+            return st
+
+    def _sync(self, st, candles):
+        # La dernière ligne est la bougie en cours, les autres sont clôturées
+        times = candles.open_time[:-1]
+        closes = candles.close[:-1]
+        if len(times) == 0:
+            return
+        if st.last_open_time is None:
+            start = 0
+        else:
+            idx = int(np.searchsorted(times, st.last_open_time))
+            if idx < len(times) and times[idx] == st.last_open_time:
+                start = idx + 1
+            elif st.last_open_time > times[-1]:
+                return  # Rien de nouveau (ne devrait pas arriver)
+            else:
+                st.reset()
+                start = 0
+        for i in range(start, len(times)):
+            st.update(float(closes[i]), int(times[i]))
+
+    def ema(self, symbol, interval, window):
+        """
+        Retourne (ema_dernière_clôture, ema_provisoire_bougie_en_cours).
+        Chaque valeur vaut None tant que le warm-up n'est pas terminé.
+        """
+        key = (symbol.upper(), interval, window)
+        st = self._get_state(key)
+        buf, _ = self._store.get(symbol, interval)
+        with buf.cond:
+            candles = buf.view(buf.capacity)
+            if len(candles) == 0:
+                return None, None
+            live_close = float(candles.close[-1])
+            with self._lock:
+                self._sync(st, candles)
+                return st.current(), st.provisional(live_close)
+
+# ✅ Instance globale unique
+indicator_engine = IndicatorEngine(candle_store)
@@ -0,0 +1,172 @@
+"""
+Module : kline_stream.py
+But : Alimente le candle_store partagé via le flux WebSocket <symbol>@kline_<interval>.
+      Backfill REST au démarrage et après chaque reconnexion ; si le flux est
+      coupé, une seule requête REST par (symbole, intervalle) est partagée entre
+      toutes les stratégies (single-flight + intervalle minimal).
+      Un compteur global de mises à jour permet à une seule boucle de stratégie
+      de suivre toutes les paires de l'univers (wait_for_any_update).
+"""
+
+import time
+import threading
+
+from core.binance_client import client
+from core.candle_store import candle_store
+from core.config import kline_ws_url, kline_window, kline_stale_seconds, kline_rest_min_interval
+from core.ws_stream import StreamConnection
+from core import runtime
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+_lock = threading.Lock()
+_connection = None
+_last_update = {}      # (symbol, interval) -> timestamp local de la dernière mise à jour
+_last_fetch = {}       # (symbol, interval) -> timestamp du dernier appel REST
+_fetch_locks = {}      # (symbol, interval) -> Lock (un seul fetch REST à la fois)
+_updated = threading.Condition()
+_update_count = 0      # Incrémenté à chaque mise à jour d'une série (tous couples)
+_update_signal = runtime.Signal()  # Même compteur, attendu par les coroutines
+
+def _key(symbol, interval):
+    return (symbol.upper(), interval)
+
+def _stream_name(symbol, interval):
+    return f"{symbol.lower()}@kline_{interval}"
+
+def _notify_update():
+    global _update_count
+    with _updated:
+        _update_count += 1
+        _updated.notify_all()
+        _update_signal.fire()
+
+# === Backfill REST ===
+def backfill(symbol, interval):
+    """
+    Recharge la série complète via REST (démarrage, reconnexion ou flux coupé).
+    """
+    key = _key(symbol, interval)
+    klines = client.get_klines(symbol=key[0], interval=interval, limit=kline_window)
+    _last_fetch[key] = time.time()
+    buf, _ = candle_store.get(*key)
+    buf.replace(klines)
+    _last_update[key] = time.time()
+    _notify_update()
+
+def _backfill_all():
+    for symbol, interval in candle_store.keys():
+        try:
+            backfill(symbol, interval)
+        except Exception as e:
+            log.error(f"❌ Erreur backfill klines {symbol} {interval} : {e}")
+
+# === Réception des événements WebSocket ===
+def _on_message(payload):
+    if payload.get("e") != "kline":
+        return
+    k = payload["k"]
+    key = _key(payload["s"], k["i"])
+    if key not in _fetch_locks:
+        return
+    buf, _ = candle_store.get(*key)
+    if buf.upsert(int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])):
+        _last_update[key] = time.time()
+        _notify_update()
+
+def _get_connection():
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = StreamConnection(kline_ws_url, _on_message, on_open=_backfill_all, name="klines")
+        return _connection
+
+# === API publique ===
+def subscribe(symbol, interval):
+    """
+    Abonne le store au flux kline du couple (symbole, intervalle).
+    Idempotent : un seul abonnement et un seul buffer par couple.
+    """
+    key = _key(symbol, interval)
+    with _lock:
+        is_new = key not in _fetch_locks
+        if is_new:
+            _fetch_locks[key] = threading.Lock()
+            _last_update[key] = 0.0
+            _last_fetch[key] = 0.0
+    if is_new:
+        try:
+            _refresh_if_stale(key)
+        except Exception:
+            pass  # Nouvelle tentative au prochain get_candles
+        _get_connection().add_streams([_stream_name(symbol, interval)])
+
+def is_fresh(symbol, interval):
+    """
+    La série est fraîche si le WebSocket est connecté et a bougé récemment.
+    """
+    key = _key(symbol, interval)
+    if _connection is None or not _connection.is_connected():
+        return False
+    return time.time() - _last_update.get(key, 0.0) < kline_stale_seconds
+
+def _refresh_if_stale(key):
+    if is_fresh(*key):
+        return
+    with _fetch_locks[key]:
+        # Un autre consommateur vient peut-être de faire le fetch
+        if time.time() - _last_fetch[key] < kline_rest_min_interval:
+            return
+        try:
+            backfill(*key)
+        except Exception as e:
+            _last_fetch[key] = time.time()
+            log.error(f"❌ Erreur backfill klines {key[0]} {key[1]} : {e}")
+            raise
+
+def get_candles(symbol, interval, limit):
+    """
+    Retourne une vue en lecture seule des `limit` dernières bougies
+    (bougie en cours incluse). Voir candle_store.CandleView.
+    """
+    key = _key(symbol, interval)
+    subscribe(symbol, interval)
+    _refresh_if_stale(key)
+    return candle_store.view(key[0], interval, limit)
+
+def wait_for_update(symbol, interval, timeout):
+    """
+    Bloque jusqu'à la prochaine mise à jour de la série (ou le timeout).
+    Retourne True si une mise à jour est arrivée.
+    """
+    subscribe(symbol, interval)
+    buf, _ = candle_store.get(symbol, interval)
+    return buf.wait_for_change(buf.version, timeout)
+
+def series_version(symbol, interval):
+    """
+    Version de la série (change à chaque mise à jour) : permet de ne revérifier que les paires qui ont bougé.
+    """
+    subscribe(symbol, interval)
+    buf, _ = candle_store.get(symbol, interval)
+    return buf.version
+
+def update_count():
+    with _updated:
+        return _update_count
+
+def wait_for_any_update(count, timeout):
+    """
+    Bloque jusqu'à la prochaine mise à jour de n'importe quelle série après
+    `count` (lu avant l'itération pour ne rien manquer), ou le timeout.
+    Retourne True si une mise à jour est arrivée.
+    """
+    with _updated:
+        return _updated.wait_for(lambda: _update_count != count, timeout=timeout)
+
+async def wait_for_any_update_async(count, timeout):
+    """
+    wait_for_any_update pour les coroutines du runtime (sans bloquer la boucle).
+    """
+    return await _update_signal.wait(count, timeout)
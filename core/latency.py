@@ -0,0 +1,228 @@
+"""
+Module : latency.py
+But : Traçage de latence du signal jusqu'à la position protégée.
+      Chaque trade porte un trace ID ; chaque étape est horodatée en temps
+      monotone (perf_counter). Les durées par étape alimentent des
+      histogrammes en mémoire, écrits périodiquement dans logs/ :
+      - latency_histograms.json : snapshot des histogrammes (compteurs, p50/p90/p99)
+      - latency_traces.jsonl : une ligne JSON par trace terminée
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from core.config import LOG_DIR, latency_flush_interval
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# Bornes supérieures des seaux d'histogramme, en millisecondes (dernier seau : +inf)
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+HISTOGRAM_FILE = os.path.join(LOG_DIR, "latency_histograms.json")
+TRACES_FILE = os.path.join(LOG_DIR, "latency_traces.jsonl")
+
+class Histogram:
+    """
+    Histogramme à seaux fixes (ms) ; percentiles estimés par la borne du seau.
+    """
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                # Borne du seau, sans dépasser le max observé
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "buckets_ms": list(BUCKETS_MS) + ["inf"],
+            "counts": list(self.counts),
+        }
+
+class Trace:
+    """
+    Trace d'un trade : étapes successives (nom, ms depuis le début, ms depuis l'étape précédente).
+    """
+    __slots__ = ("trace_id", "name", "attrs", "started", "last", "stages", "discarded")
+
+    def __init__(self, name, **attrs):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.stages = []
+        self.discarded = False
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        delta_ms = (now - self.last) * 1000
+        self.stages.append((stage, round((now - self.started) * 1000, 3), round(delta_ms, 3)))
+        self.last = now
+        _observe(stage, delta_ms)
+
+    def discard(self):
+        # Itération sans signal : rien n'est enregistré
+        self.discarded = True
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "ts": time.time(),
+            "total_ms": round((self.last - self.started) * 1000, 3),
+            "last_stage": self.stages[-1][0] if self.stages else None,
+            "stages": [{"stage": s, "at_ms": at, "delta_ms": d} for s, at, d in self.stages],
+            **self.attrs,
+        }
+
+# === État process-wide ===
+_lock = threading.Lock()
+_local = threading.local()
+_histograms = {}
+_finished = []                 # Traces terminées en attente d'écriture
+_recent = deque(maxlen=1000)   # Dernières traces terminées (benchmark, diagnostic)
+_flush_thread = None
+
+def _observe(stage, ms):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.observe(ms)
+
+def observe(stage, seconds):
+    """
+    Enregistre une durée isolée (hors trace), en secondes.
+    """
+    _observe(stage, seconds * 1000)
+
+# === API de traçage ===
+def current():
+    return getattr(_local, "trace", None)
+
+@contextmanager
+def trace(name, **attrs):
+    """
+    Ouvre une trace pour le thread courant ; réutilise la trace en cours si
+    elle existe déjà (ex : open_trade appelé depuis une stratégie).
+    """
+    existing = current()
+    if existing is not None:
+        yield existing
+        return
+    tr = Trace(name, **attrs)
+    _local.trace = tr
+    _ensure_flush_thread()
+    try:
+        yield tr
+    finally:
+        _local.trace = None
+        if not tr.discarded and tr.stages:
+            _observe(f"{name}.total", (tr.last - tr.started) * 1000)
+            record = tr.to_dict()
+            with _lock:
+                _finished.append(record)
+                _recent.append(record)
+
+def mark(stage):
+    """
+    Horodate une étape de la trace courante (sans effet hors trace).
+    """
+    tr = current()
+    if tr is not None:
+        tr.mark(stage)
+
+def trace_id():
+    tr = current()
+    return tr.trace_id if tr is not None else None
+
+@contextmanager
+def span(stage):
+    """
+    Mesure la durée d'un bloc (hors trace : boucles de trailing, etc.).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(stage, (time.perf_counter() - started) * 1000)
+
+# === Lecture et écriture sur disque ===
+def recent_traces():
+    with _lock:
+        return list(_recent)
+
+def get_histograms():
+    with _lock:
+        return {stage: hist.snapshot() for stage, hist in _histograms.items()}
+
+def flush():
+    with _lock:
+        finished, _finished[:] = list(_finished), []
+        snapshot = {stage: hist.snapshot() for stage, hist in _histograms.items()}
+    if not finished and not snapshot:
+        return
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        if finished:
+            with open(TRACES_FILE, "a", encoding="utf-8") as f:
+                for item in finished:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        tmp = HISTOGRAM_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"updated": time.time(), "stages": snapshot}, f, indent=2)
+        os.replace(tmp, HISTOGRAM_FILE)
+    except Exception as e:
+        log.warning(f"⚠️ Écriture des mesures de latence échouée : {e}")
+
+def _flush_loop():
+    while True:
+        time.sleep(latency_flush_interval)
+        flush()
+
+def _ensure_flush_thread():
+    global _flush_thread
+    if _flush_thread is not None:
+        return
+    with _lock:
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(target=_flush_loop, name="latency-flush", daemon=True)
+            _flush_thread.start()
+
+atexit.register(flush)
@@ -0,0 +1,197 @@
+"""
+Module : log.py
+But : Journalisation unifiée du bot (remplace print, logs/errors.txt ouvert à
+      chaque erreur et le logging.basicConfig relatif du contrôleur Telegram).
+      - Les threads de trading ne font que déposer l'enregistrement dans une
+        file (QueueHandler) : formatage, écriture disque et console sont faits
+        par un thread unique ("log-writer", QueueListener).
+      - Fichier JSON Lines (une ligne = un objet : ts, level, logger, msg,
+        thread, trace_id, symbol, source, exc...) : lisible par jq ou pandas.
+      - Rotation à la taille (LOG_MAX_BYTES) et chaque jour à minuit, archives
+        compressées en .gz (LOG_BACKUP_COUNT conservées).
+      - Niveaux par module : LOG_LEVEL (global), LOG_LEVELS="core.ws_stream=DEBUG,TeleBot=WARNING".
+      - trace_id (= trade_id du journal des trades), symbol et source de la
+        trace de latence en cours ajoutés automatiquement aux messages émis
+        pendant un trade ; extra={"symbol": ..., "trade_id": ...} sinon.
+
+Utilisation :
+    from core.log import get_logger
+    log = get_logger(__name__)
+    log.info("🟢 Flux prêt")
+    log.exception("❌ Erreur ordre")   # trace de la pile incluse (champ exc)
+
+Lecture :
+    jq -c 'select(.level == "ERROR")' logs/bot.jsonl
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import datetime
+import threading
+import traceback
+import logging.handlers
+
+from core.config import LOG_FILE, log_level, log_levels, log_console_level, log_max_bytes, log_backup_count
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra= et part dans le JSON
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+# === Formats ===
+class JsonFormatter(logging.Formatter):
+    """
+    Une ligne JSON par enregistrement (horodatage ISO 8601 UTC à la milliseconde).
+    """
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class ConsoleFormatter(logging.Formatter):
+    """
+    Console : heure + message (les emojis restent le repère visuel), pile des erreurs en dessous.
+    """
+    def __init__(self):
+        super().__init__("%(asctime)s %(message)s", datefmt="%H:%M:%S")
+
+# === File d'attente (côté threads appelants) ===
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Ajoute le contexte du thread appelant (trace de latence en cours) et fige
+    message et pile avant le passage au thread d'écriture ; rien d'autre.
+    """
+    def prepare(self, record):
+        from core import latency  # Import local : latency n'importe pas ce module
+        tr = latency.current()
+        if tr is not None:
+            if getattr(record, "trace_id", None) is None:
+                record.trace_id = tr.trace_id
+            for key in ("symbol", "source"):
+                if getattr(record, key, None) is None and key in tr.attrs:
+                    setattr(record, key, tr.attrs[key])
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+# === Rotation taille + date, archives compressées ===
+class RotatingJsonFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Bascule quand le fichier dépasse max_bytes ou au changement de jour ;
+    bot.jsonl -> bot.jsonl.1.gz -> bot.jsonl.2.gz ... (compression dans le thread d'écriture).
+    """
+    def __init__(self, path, max_bytes, backup_count):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _compress
+        self._rollover_at = _next_midnight()
+
+    def shouldRollover(self, record):
+        if time.time() >= self._rollover_at and os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self._rollover_at = _next_midnight()
+
+def _compress(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def _next_midnight():
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    return time.mktime(tomorrow.timetuple())
+
+# === Mise en place (une seule fois par process) ===
+_lock = threading.Lock()
+_listener = None
+_stopped = False
+
+def _parse_levels(text):
+    """
+    "core.ws_stream=DEBUG,TeleBot=WARNING" -> {"core.ws_stream": "DEBUG", "TeleBot": "WARNING"}
+    """
+    levels = {}
+    for item in (text or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup(path=LOG_FILE, level=log_level, levels=log_levels, console_level=log_console_level):
+    """
+    Branche la racine du logging sur la file et démarre le thread d'écriture.
+    Sans effet au second appel (get_logger l'appelle au besoin).
+    """
+    global _listener
+    with _lock:
+        if _listener is not None or _stopped:
+            return
+        records = queue.SimpleQueue()
+        file_handler = RotatingJsonFileHandler(path, log_max_bytes, log_backup_count)
+        file_handler.setFormatter(JsonFormatter())
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(ConsoleFormatter())
+        console.setLevel(console_level.upper())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(ContextQueueHandler(records))
+        root.setLevel(level.upper())
+        for name, value in _parse_levels(levels).items():
+            logging.getLogger(name).setLevel(value)
+        logging.captureWarnings(True)
+
+        _listener = logging.handlers.QueueListener(records, file_handler, console, respect_handler_level=True)
+        _listener.start()
+        _listener._thread.name = "log-writer"
+        atexit.register(shutdown)
+
+def shutdown():
+    """
+    Vide la file et ferme les fichiers (arrêt du bot, atexit). Les messages
+    émis ensuite (fin d'arrêt) vont directement à la console.
+    """
+    global _listener, _stopped
+    with _lock:
+        listener, _listener, _stopped = _listener, None, True
+    if listener is None:
+        return
+    root = logging.getLogger()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(ConsoleFormatter())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(console)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+def get_logger(name):
+    if _listener is None:
+        setup()
+    return logging.getLogger(name)
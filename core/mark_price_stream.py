@@ -0,0 +1,92 @@
+"""
+Module : mark_price_stream.py
+But : Prix mark en temps réel via le flux <symbol>@markPrice@1s (Futures).
+      Si le flux est figé ou coupé, repli REST (futures_mark_price) limité
+      à un appel par intervalle pour ne pas retomber dans le polling.
+"""
+
+import time
+import threading
+
+from core.binance_client import client
+from core.config import futures_ws_url, mark_price_stale_seconds, mark_price_rest_interval
+from core.ws_stream import StreamConnection
+from core import runtime
+
+_lock = threading.Lock()
+_cond = threading.Condition(_lock)
+_prices = {}        # symbol -> (prix, timestamp local de réception)
+_versions = {}      # symbol -> compteur de mises à jour
+_last_rest = {}     # symbol -> timestamp du dernier repli REST
+_connection = None
+
+def _on_message(payload):
+    if payload.get("e") != "markPriceUpdate":
+        return
+    sym = payload["s"].upper()
+    with _cond:
+        _prices[sym] = (float(payload["p"]), time.time())
+        _versions[sym] = _versions.get(sym, 0) + 1
+        _cond.notify_all()
+    runtime.signal(("mark", sym)).fire()
+
+def _get_connection():
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = StreamConnection(futures_ws_url, _on_message, name="markPrice")
+        return _connection
+
+def subscribe(symbol):
+    """
+    Abonne le flux mark price du symbole (idempotent).
+    """
+    _get_connection().add_streams([f"{symbol.lower()}@markPrice@1s"])
+
+def is_fresh(symbol):
+    with _lock:
+        entry = _prices.get(symbol.upper())
+    return entry is not None and time.time() - entry[1] < mark_price_stale_seconds
+
+def get_mark_price(symbol):
+    """
+    Retourne le dernier prix mark. Flux figé : repli REST, au plus un appel
+    toutes les mark_price_rest_interval secondes (sinon dernière valeur connue).
+    """
+    sym = symbol.upper()
+    subscribe(sym)
+    with _lock:
+        entry = _prices.get(sym)
+        fresh = entry is not None and time.time() - entry[1] < mark_price_stale_seconds
+        rest_due = time.time() - _last_rest.get(sym, 0.0) >= mark_price_rest_interval
+        if not fresh and rest_due:
+            _last_rest[sym] = time.time()
+    if fresh or (entry is not None and not rest_due):
+        return entry[0]
+    price = float(client.futures_mark_price(symbol=sym)["markPrice"])
+    with _cond:
+        _prices[sym] = (price, time.time())
+        _versions[sym] = _versions.get(sym, 0) + 1
+        _cond.notify_all()
+    runtime.signal(("mark", sym)).fire()
+    return price
+
+def wait_for_update(symbol, timeout):
+    """
+    Bloque jusqu'au prochain prix mark reçu (ou le timeout).
+    Retourne True si un nouveau prix est arrivé.
+    """
+    sym = symbol.upper()
+    subscribe(sym)
+    with _cond:
+        before = _versions.get(sym, 0)
+        return _cond.wait_for(lambda: _versions.get(sym, 0) != before, timeout=timeout)
+
+async def wait_for_update_async(symbol, timeout):
+    """
+    wait_for_update pour les coroutines du runtime (sans bloquer la boucle).
+    """
+    sym = symbol.upper()
+    subscribe(sym)
+    sig = runtime.signal(("mark", sym))
+    return await sig.wait(sig.version, timeout)
@@ -1,22 +1,275 @@
-from telebot import TeleBot
+"""
+Module : notifier.py
+But : Notifications Telegram sans attente pour les threads de trading.
+      send_telegram() dépose le message dans une file bornée et rend la main
+      immédiatement ; un thread d'envoi unique ("telegram-outbox") :
+      - sert les messages critiques (❌, ⚠, 🛑...) avant les informatifs ;
+      - regroupe les rafales de messages similaires (même texte aux nombres
+        près, ou même clé) en un seul envoi « (×N) » ;
+      - respecte les limites Telegram par chat (1 message/s, 20/minute) et
+        les retry_after des réponses 429.
+      Remplace les cooldowns ad hoc (can_send_telegram) des stratégies.
+"""
+
+from telebot import TeleBot, apihelper
 import os
+import re
+import time
+import atexit
+import threading
+from collections import deque
 from dotenv import load_dotenv
+from core import http_session
+from core.config import (
+    sim_url,
+    telegram_outbox_size,
+    telegram_rate_per_second,
+    telegram_rate_per_minute,
+    telegram_coalesce_seconds,
+)
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# Tous les TeleBot du process (notifier, telegram_controller) passent par le pool partagé
+apihelper.session = http_session.new_session()
+if sim_url:
+    # Simulateur : les messages sont affichés dans sa console
+    apihelper.API_URL = sim_url + "/bot{0}/{1}"
+
 bot = TeleBot(TELEGRAM_TOKEN)
 
-def send_telegram(message):
+# === Priorités ===
+CRITICAL = 0  # Erreurs, alertes, arrêts : jamais retardés par la fenêtre de regroupement
+INFO = 1      # Signaux, confirmations, suivi
+
+_CRITICAL_PREFIXES = ("❌", "⚠", "🛑", "🚨", "⛔")
+_NUMBERS = re.compile(r"\d+(?:[.,]\d+)*")
+
+def classify(message):
+    return CRITICAL if message.lstrip().startswith(_CRITICAL_PREFIXES) else INFO
+
+def coalesce_key(message):
     """
-    Envoie un message Telegram à ton chat configuré
+    Clé de regroupement par défaut : le texte, nombres (prix, quantités, délais) masqués.
+    """
+    return _NUMBERS.sub("#", message)[:300]
+
+class _Pending:
+    __slots__ = ("key", "text", "priority", "count", "seq", "due_at")
+
+    def __init__(self, key, text, priority, seq, due_at):
+        self.key = key
+        self.text = text
+        self.priority = priority
+        self.count = 1
+        self.seq = seq
+        self.due_at = due_at
+
+    def render(self):
+        if self.count > 1:
+            return f"{self.text}\n(×{self.count} messages similaires)"
+        return self.text
+
+class Outbox:
+    def __init__(self, send_fn, max_size=telegram_outbox_size, rate_per_second=telegram_rate_per_second,
+                 rate_per_minute=telegram_rate_per_minute, coalesce_seconds=telegram_coalesce_seconds):
+        self._send_fn = send_fn
+        self.max_size = max_size
+        self.min_interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.rate_per_minute = rate_per_minute
+        self.coalesce_seconds = coalesce_seconds
+        self._cond = threading.Condition()
+        self._pending = {}                 # clé -> _Pending (un seul message en attente par clé)
+        self._last_sent_by_key = {}        # clé -> dernier envoi (fenêtre de regroupement)
+        self._sent_times = deque()         # envois de la dernière minute
+        self._last_send = 0.0
+        self._blocked_until = 0.0          # retry_after d'une réponse 429
+        self._seq = 0
+        self._flushing = False
+        self._sending = False
+        self._thread = None
+        self.stats = {"queued": 0, "sent": 0, "merged": 0, "dropped": 0, "failed": 0, "rate_limited": 0}
+
+    # === Dépôt (threads de trading : jamais bloquant au-delà du verrou) ===
+    def submit(self, message, priority=None, key=None):
+        message = str(message)
+        priority = classify(message) if priority is None else priority
+        key = coalesce_key(message) if key is None else key
+        now = time.monotonic()
+        with self._cond:
+            self.stats["queued"] += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                # Rafale : un seul envoi avec le dernier texte et le nombre de messages
+                pending.text = message
+                pending.count += 1
+                pending.priority = min(pending.priority, priority)
+                if priority == CRITICAL:
+                    pending.due_at = min(pending.due_at, now)
+                self.stats["merged"] += 1
+                return
+            if len(self._pending) >= self.max_size and not self._evict(priority):
+                self.stats["dropped"] += 1
+                return
+            due_at = now
+            if priority == INFO:
+                last = self._last_sent_by_key.get(key)
+                if last is not None:
+                    due_at = max(now, last + self.coalesce_seconds)
+            self._seq += 1
+            self._pending[key] = _Pending(key, message, priority, self._seq, due_at)
+            self._cond.notify()
+        self._ensure_thread()
+
+    def _evict(self, priority):
+        """
+        File pleine : écarte l'informatif le plus ancien (ou, pour un message
+        critique, le critique le plus ancien). False si le nouveau doit être écarté.
+        """
+        infos = [p for p in self._pending.values() if p.priority == INFO]
+        if infos:
+            victim = min(infos, key=lambda p: p.seq)
+        elif priority == CRITICAL:
+            victim = min(self._pending.values(), key=lambda p: p.seq)
+        else:
+            return False
+        del self._pending[victim.key]
+        self.stats["dropped"] += victim.count
+        return True
+
+    # === Envoi ===
+    def _next_slot(self, now):
+        slot = max(self._last_send + self.min_interval, self._blocked_until)
+        while self._sent_times and now - self._sent_times[0] >= 60:
+            self._sent_times.popleft()
+        if self.rate_per_minute and len(self._sent_times) >= self.rate_per_minute:
+            slot = max(slot, self._sent_times[0] + 60)
+        return slot
+
+    def _take(self):
+        """
+        Attend le prochain message envoyable (priorité, puis ancienneté) et le retire de la file.
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                slot = self._next_slot(now)
+                ready = [p for p in self._pending.values() if self._flushing or p.due_at <= now]
+                if ready and slot <= now:
+                    item = min(ready, key=lambda p: (p.priority, p.seq))
+                    del self._pending[item.key]
+                    self._last_send = now
+                    self._sent_times.append(now)
+                    self._sending = True
+                    return item
+                if ready:
+                    timeout = slot - now
+                elif self._pending:
+                    timeout = max(0.0, min(p.due_at for p in self._pending.values()) - now)
+                else:
+                    timeout = None
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            item = self._take()
+            try:
+                self._send_fn(item.render())
+                sent = True
+            except apihelper.ApiTelegramException as e:
+                sent = False
+                retry_after = (getattr(e, "result_json", None) or {}).get("parameters", {}).get("retry_after")
+                if e.error_code == 429 and retry_after:
+                    self._requeue(item, float(retry_after))
+                    continue
+                log.error(f"Erreur Telegram : {e}")
+            except Exception as e:
+                sent = False
+                log.error(f"Erreur Telegram : {e}")
+            with self._cond:
+                self._sending = False
+                if sent:
+                    self.stats["sent"] += 1
+                    self._last_sent_by_key[item.key] = time.monotonic()
+                    if len(self._last_sent_by_key) > 4 * self.max_size:
+                        cutoff = time.monotonic() - self.coalesce_seconds
+                        self._last_sent_by_key = {k: t for k, t in self._last_sent_by_key.items() if t > cutoff}
+                else:
+                    self.stats["failed"] += item.count
+                self._cond.notify_all()
+
+    def _requeue(self, item, retry_after):
+        with self._cond:
+            self.stats["rate_limited"] += 1
+            self._sending = False
+            self._blocked_until = time.monotonic() + retry_after
+            pending = self._pending.get(item.key)
+            if pending is not None:
+                pending.count += item.count
+                pending.priority = min(pending.priority, item.priority)
+                pending.seq = min(pending.seq, item.seq)
+            else:
+                self._pending[item.key] = item
+            self._cond.notify_all()
+        log.warning(f"⏳ Limite Telegram atteinte, reprise dans {retry_after:.0f}s")
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout=5):
+        """
+        Envoie tout ce qui est en attente, sans fenêtre de regroupement (arrêt du bot).
+        Retourne True si la file est vide avant le timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if not self._pending and not self._sending:
+                return True
+            self._flushing = True
+            self._cond.notify_all()
+        self._ensure_thread()
+        with self._cond:
+            try:
+                while self._pending or self._sending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing = False
+
+    def get_stats(self):
+        with self._cond:
+            return {**self.stats, "pending": sum(p.count for p in self._pending.values())}
+
+def _send_now(message):
+    bot.send_message(CHAT_ID, message)
+
+# ✅ Instance globale unique
+outbox = Outbox(_send_now)
+atexit.register(outbox.flush, 3)
+
+def send_telegram(message, priority=None, key=None):
+    """
+    Envoie un message Telegram à ton chat configuré (sans attendre : file d'envoi).
+    priority : CRITICAL / INFO (déduite du préfixe sinon) ; key : clé de regroupement.
     """
     if TELEGRAM_TOKEN and CHAT_ID:
-        try:
-            bot.send_message(CHAT_ID, message)
-        except Exception as e:
-            print(f"Erreur Telegram : {e}")
+        outbox.submit(message, priority, key)
     else:
-        print("⚠️ Token ou Chat ID manquant dans le fichier .env")
+        log.warning("⚠️ Token ou Chat ID manquant dans le fichier .env")
+
+def get_stats():
+    return outbox.get_stats()
@@ -4,27 +4,30 @@ But : Fournir une fonction pour synchroniser la position actuelle sur Binance
       avec l'état local du bot (state).
 """
 
-from core.state import state
-from core.binance_client import check_position_open
+from core.state import states
+from core.binance_client import client
 from core.config import symbol
 from core.telegram_controller import send_telegram
 from threading import Lock
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # Lock pour éviter les conflits d'accès concurrentiels
 position_lock = Lock()
 
-def sync_position():
+def sync_position(sym=symbol):
     """
-    Synchronise l'état local avec la position réelle sur Binance.
-    Met à jour state.position_open en fonction de l'info Binance.
-    Gère les erreurs réseau/API.
+    Synchronise l'état local d'un symbole avec la position réelle sur Binance.
+    Met à jour state.position_open seulement sur une réponse REST réussie :
+    en cas d'erreur (timeout, 429, requête délestée) l'état est conservé.
     """
+    state = states.get(sym)
     try:
         with position_lock:
-            pos_open = check_position_open(symbol=symbol)
-            state.position_open = pos_open
+            positions = client.futures_position_information(symbol=sym)
+            state.position_open = any(float(p["positionAmt"]) != 0 for p in positions)
     except Exception as e:
-        err_msg = f"⚠️ Erreur lors de la synchronisation de position : {e}"
-        print(err_msg)
+        err_msg = f"⚠️ Erreur lors de la synchronisation de position {sym} (état conservé) : {e}"
+        log.warning(err_msg)
         send_telegram(err_msg)
-        state.position_open = False
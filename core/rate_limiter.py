@@ -0,0 +1,139 @@
+"""
+Module : rate_limiter.py
+But : Comptabilité du poids des requêtes Binance et ordonnancement par priorité.
+      Lit X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-* sur chaque réponse,
+      respecte Retry-After (429/418) et, quand le budget se réduit, met en
+      attente les lectures normales et rejette les lectures basse priorité
+      (vues Telegram, watchdogs) pour garder du poids pour les ordres.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from core.config import weight_limit_futures, weight_limit_spot, low_priority_weight_pct, normal_priority_weight_pct
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# === Priorités ===
+PRIORITY_ORDER = 0    # Passage/annulation d'ordres : jamais retardés par le budget
+PRIORITY_NORMAL = 1   # Lectures des boucles de trading : attendent la minute suivante si budget serré
+PRIORITY_LOW = 2      # Vues Telegram, watchdogs : rejetées si budget serré
+
+LIMITS = {"futures": weight_limit_futures, "spot": weight_limit_spot}
+
+class RequestShed(Exception):
+    """
+    Requête basse priorité abandonnée pour préserver le budget de poids.
+    """
+
+_lock = threading.Lock()
+_local = threading.local()
+_used_weight = {"futures": 0, "spot": 0}      # Dernier poids rapporté par Binance
+_weight_minute = {"futures": 0, "spot": 0}    # Minute (epoch // 60) du dernier relevé
+_order_count = {}                              # En-tête -> valeur (X-MBX-ORDER-COUNT-10S / -1M)
+_retry_until = {"futures": 0.0, "spot": 0.0}  # Fin du Retry-After en cours
+_endpoints = {}                                # chemin -> {"calls", "weight"}
+_shed_count = 0
+
+def _bucket_for_url(url):
+    host = urlparse(url).netloc
+    return "futures" if host.startswith("fapi") or "/fapi/" in url else "spot"
+
+def bucket_for_method(method_name):
+    return "futures" if method_name.startswith("futures_") else "spot"
+
+# === Priorité du thread courant ===
+@contextmanager
+def priority(level):
+    previous = getattr(_local, "priority", PRIORITY_NORMAL)
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+def low_priority():
+    return priority(PRIORITY_LOW)
+
+def current_priority():
+    return getattr(_local, "priority", PRIORITY_NORMAL)
+
+# === Relevé des en-têtes (hook de réponse requests) ===
+def record_response(response, *args, **kwargs):
+    bucket = _bucket_for_url(response.url)
+    path = urlparse(response.url).path
+    headers = response.headers
+    now = time.time()
+    with _lock:
+        stats = _endpoints.setdefault(path, {"calls": 0, "weight": 0})
+        stats["calls"] += 1
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("X-MBX-USED-WEIGHT")
+        if used is not None:
+            used = int(used)
+            minute = int(now // 60)
+            previous = _used_weight[bucket] if _weight_minute[bucket] == minute else 0
+            # Estimation du poids de l'endpoint (approximative si requêtes concurrentes)
+            stats["weight"] += max(0, used - previous)
+            _used_weight[bucket] = used
+            _weight_minute[bucket] = minute
+        for name, value in headers.items():
+            if name.upper().startswith("X-MBX-ORDER-COUNT-"):
+                _order_count[name.upper()] = int(value)
+        if response.status_code in (429, 418):
+            retry_after = headers.get("Retry-After")
+            delay = float(retry_after) if retry_after else 60.0
+            _retry_until[bucket] = max(_retry_until[bucket], now + delay)
+            log.error(f"🚨 Limite Binance atteinte ({response.status_code}) sur {path}, pause {delay:.0f}s")
+    return response
+
+def _usage_locked(bucket, now):
+    if _weight_minute[bucket] != int(now // 60):
+        return 0  # Le compteur Binance repart à zéro chaque minute
+    return _used_weight[bucket]
+
+# === Admission avant chaque requête ===
+def acquire(bucket, level=None):
+    """
+    Bloque ou rejette la requête selon sa priorité et le budget restant.
+    """
+    global _shed_count
+    level = current_priority() if level is None else level
+    limit = LIMITS[bucket]
+    while True:
+        now = time.time()
+        with _lock:
+            wait = _retry_until[bucket] - now
+            usage = _usage_locked(bucket, now)
+            if wait <= 0:
+                if level == PRIORITY_ORDER:
+                    return
+                if level == PRIORITY_LOW and usage >= limit * low_priority_weight_pct:
+                    _shed_count += 1
+                    raise RequestShed(f"Budget de poids {bucket} serré ({usage}/{limit}), requête basse priorité abandonnée")
+                if usage < limit * normal_priority_weight_pct:
+                    return
+                wait = 60 - now % 60 + 0.1  # Attente de la minute suivante
+            elif level == PRIORITY_LOW:
+                _shed_count += 1
+                raise RequestShed(f"Retry-After en cours sur {bucket} ({wait:.0f}s), requête basse priorité abandonnée")
+        time.sleep(min(wait, 1.0))
+
+def retry_after_remaining(bucket="futures"):
+    with _lock:
+        return max(0.0, _retry_until[bucket] - time.time())
+
+# === Exposition de l'usage courant ===
+def get_usage():
+    now = time.time()
+    with _lock:
+        return {
+            "weight": {b: _usage_locked(b, now) for b in LIMITS},
+            "limits": dict(LIMITS),
+            "order_count": dict(_order_count),
+            "retry_after": {b: max(0.0, _retry_until[b] - now) for b in LIMITS},
+            "endpoints": {path: dict(stats) for path, stats in _endpoints.items()},
+            "shed": _shed_count,
+        }
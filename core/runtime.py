@@ -0,0 +1,244 @@
+"""
+Module : runtime.py
+But : Boucle asyncio unique (thread "bot-runtime") pour les tâches de fond du
+      bot : ordonnanceur, stratégies, trailing, demandes manuelles, keepalive
+      et connexions WebSocket (aiohttp). Les appels REST passent par le client
+      synchrone existant (limiteur de poids, coalescence, simulateur) dans un
+      pool borné (run_blocking) : la boucle n'est jamais bloquée.
+      Les API synchrones (core.trade_interface, Telegram) restent utilisables
+      depuis n'importe quel thread.
+      Arrêt : stop_event (ou stop()) annule toutes les tâches, ferme les
+      WebSockets puis arrête la boucle.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import runtime_io_workers
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+_lock = threading.Lock()
+_loop = None
+_thread = None
+_executor = None
+_tasks = {}            # nom -> asyncio.Task (accès depuis la boucle uniquement)
+_signals = {}          # clé -> Signal
+_closers = []          # coroutines appelées à l'arrêt (fermeture des WebSockets)
+
+# === Cycle de vie de la boucle ===
+def loop():
+    """
+    Boucle du runtime, démarrée à la première utilisation.
+    """
+    global _loop, _thread, _executor
+    with _lock:
+        if _loop is None:
+            _executor = ThreadPoolExecutor(max_workers=runtime_io_workers, thread_name_prefix="runtime-io")
+            _loop = asyncio.new_event_loop()
+            _loop.set_default_executor(_executor)
+            ready = threading.Event()
+            _thread = threading.Thread(target=_run, args=(_loop, ready), name="bot-runtime", daemon=True)
+            _thread.start()
+            ready.wait()
+        return _loop
+
+def _run(lp, ready):
+    asyncio.set_event_loop(lp)
+    lp.call_soon(ready.set)
+    lp.run_forever()
+
+def is_running():
+    return _loop is not None and _loop.is_running()
+
+def in_loop():
+    return threading.current_thread() is _thread
+
+def stop(timeout=10):
+    """
+    Annule toutes les tâches, ferme les connexions puis arrête la boucle et le pool.
+    """
+    global _loop, _thread, _executor
+    with _lock:
+        lp, thread, executor = _loop, _thread, _executor
+    if lp is None:
+        return
+    if not in_loop():
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), lp).result(timeout)
+        except Exception as e:
+            log.warning(f"⚠️ Arrêt du runtime incomplet : {e}")
+        lp.call_soon_threadsafe(lp.stop)
+        thread.join(timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+        with _lock:
+            _loop = _thread = _executor = None
+    else:
+        lp.create_task(_shutdown()).add_done_callback(lambda _: lp.stop())
+
+async def _shutdown():
+    current = asyncio.current_task()
+    tasks = [t for t in _tasks.values() if not t.done() and t is not current]
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for closer in list(_closers):
+        try:
+            await closer()
+        except Exception as e:
+            log.warning(f"⚠️ Erreur fermeture runtime : {e}")
+    log.info(f"🛑 Runtime arrêté ({len(tasks)} tâche(s) annulée(s)).")
+
+def on_shutdown(closer):
+    """
+    Enregistre une coroutine (sans argument) appelée à l'arrêt du runtime.
+    """
+    _closers.append(closer)
+
+# === Tâches ===
+def spawn(coro_fn, *args, name=None, resilient=True):
+    """
+    Lance coro_fn(*args) comme tâche de la boucle (depuis n'importe quel thread).
+    Une tâche du même nom déjà en cours est annulée. resilient : relance après
+    un crash, comme resilient_thread (10 tentatives, 5s d'intervalle).
+    """
+    lp = loop()
+    name = name or coro_fn.__name__
+
+    def create():
+        previous = _tasks.get(name)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task = lp.create_task(_supervise(coro_fn, args, name, resilient), name=name)
+        _tasks[name] = task
+        task.add_done_callback(lambda t: _tasks.pop(name, None) if _tasks.get(name) is t else None)
+
+    if in_loop():
+        create()
+    else:
+        lp.call_soon_threadsafe(create)
+
+def cancel(name):
+    """
+    Annule la tâche `name` si elle existe (depuis n'importe quel thread).
+    """
+    if _loop is None:
+        return
+
+    def _cancel():
+        task = _tasks.get(name)
+        if task is not None:
+            task.cancel()
+
+    if in_loop():
+        _cancel()
+    else:
+        _loop.call_soon_threadsafe(_cancel)
+
+async def _supervise(coro_fn, args, name, resilient):
+    retries = 0
+    while True:
+        try:
+            await coro_fn(*args)
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception(f"Tâche {name} crashée : {e}, relance dans 5s")
+            retries += 1
+            if not resilient or retries > 10:
+                from core.telegram_controller import send_telegram
+                send_telegram(f"❌ Trop d'erreurs sur {name}, tâche arrêtée.")
+                return
+            await asyncio.sleep(5)
+
+def task_names():
+    return sorted(_tasks)
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Exécute un appel bloquant (REST, fichiers) dans le pool du runtime.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+def call(coro, timeout=None):
+    """
+    Pont synchrone : exécute une coroutine sur la boucle et attend son résultat.
+    """
+    if in_loop():
+        raise RuntimeError("runtime.call() depuis la boucle : utiliser await")
+    return asyncio.run_coroutine_threadsafe(coro, loop()).result(timeout)
+
+async def watch_stop_event(stop_event, interval=0.2):
+    """
+    Arrête toutes les tâches quand stop_event est levé (commande "stop" du bus :
+    /stop Telegram ou socket de contrôle ; stop_bot).
+    """
+    while not stop_event.is_set():
+        await asyncio.sleep(interval)
+    await _shutdown()
+
+# === Signaux (réveil des coroutines depuis les threads) ===
+class Signal:
+    """
+    Compteur de mises à jour déclenché depuis n'importe quel thread (callbacks
+    WebSocket, réponses REST) et attendu sans thread par les coroutines.
+    """
+    __slots__ = ("version", "_waiters", "_lock")
+
+    def __init__(self):
+        self.version = 0
+        self._waiters = set()
+        self._lock = threading.Lock()
+
+    def fire(self):
+        with self._lock:
+            self.version += 1
+            if not self._waiters:
+                return
+        lp = _loop
+        if lp is None:
+            return
+        if in_loop():
+            self._wake()
+        else:
+            lp.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        with self._lock:
+            waiters, self._waiters = self._waiters, set()
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def wait(self, version, timeout):
+        """
+        Attend une mise à jour postérieure à `version` (lue avant l'itération).
+        Retourne True si elle est arrivée avant le timeout.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        with self._lock:
+            if self.version != version:
+                return True
+            self._waiters.add(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(fut)
+        return self.version != version
+
+def signal(key):
+    """
+    Signal partagé pour une clé ("state", "klines", ("mark", symbole)...).
+    """
+    with _lock:
+        sig = _signals.get(key)
+        if sig is None:
+            sig = _signals[key] = Signal()
+        return sig
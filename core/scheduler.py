@@ -0,0 +1,112 @@
+"""
+Module : scheduler.py
+But : Ordonnanceur unique des tâches de surveillance pour tout l'univers de
+      symboles (core.config.symbols). Une seule coroutine du runtime au lieu
+      d'un thread et d'un polling par symbole et par tâche : à chaque tour, les
+      tâches échues reçoivent le même snapshot groupé (user_stream.snapshot :
+      état poussé par le user-data stream, ou un seul positionRisk sans symbole
+      en repli REST). Le tour lui-même (REST, ordres) s'exécute dans le pool du runtime.
+
+Tâches enregistrées par les modules (fn(sym, positions, orders)) :
+    scheduler.add("sltp", ensure_sl_tp, 6)
+"""
+
+import time
+import asyncio
+import threading
+
+from core.config import symbols, scheduler_poll_interval
+from core.state import states
+from core import user_stream, rate_limiter, runtime
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+class Task:
+    """
+    Tâche par symbole : fn(sym, positions, orders), toutes les `interval`
+    secondes, et à chaque événement poussé quand le user-data stream est actif.
+    """
+    __slots__ = ("name", "fn", "interval", "low_priority", "needs_orders", "next_due")
+
+    def __init__(self, name, fn, interval, low_priority=False, needs_orders=True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.low_priority = low_priority
+        self.needs_orders = needs_orders  # False : orders=None, pas de lecture openOrders pour cette tâche
+        self.next_due = 0.0
+
+class Scheduler:
+    def __init__(self, syms):
+        self.symbols = [s.upper() for s in syms]
+        self._tasks = []
+        self._lock = threading.Lock()
+
+    def add(self, name, fn, interval, low_priority=False, needs_orders=True):
+        """
+        Enregistre (ou remplace) une tâche par son nom.
+        """
+        task = Task(name, fn, interval, low_priority, needs_orders)
+        with self._lock:
+            self._tasks = [t for t in self._tasks if t.name != name] + [task]
+
+    def tasks(self):
+        with self._lock:
+            return list(self._tasks)
+
+    def run_once(self, tasks):
+        """
+        Un snapshot groupé pour tous les symboles, puis chaque tâche sur chaque symbole.
+        Une erreur sur un symbole n'interrompt ni les autres symboles ni les autres tâches.
+        """
+        # Snapshot en basse priorité seulement si aucune tâche de trading n'en a besoin
+        with_orders = any(t.needs_orders for t in tasks)
+        if all(t.low_priority for t in tasks):
+            with rate_limiter.low_priority():
+                positions, orders = user_stream.snapshot(self.symbols, with_orders)
+        else:
+            positions, orders = user_stream.snapshot(self.symbols, with_orders)
+        for task in tasks:
+            for sym in self.symbols:
+                try:
+                    if task.low_priority:
+                        with rate_limiter.low_priority():
+                            task.fn(sym, positions[sym], orders[sym] if task.needs_orders else None)
+                    else:
+                        task.fn(sym, positions[sym], orders[sym] if task.needs_orders else None)
+                except Exception as e:
+                    log.exception(f"❌ Erreur tâche {task.name} sur {sym} : {e}")
+
+    async def run(self, stop_event):
+        """
+        Boucle principale (coroutine du runtime) : réveil au prochain événement
+        poussé (flux actif) ou à l'échéance de la prochaine tâche (polling REST groupé sinon).
+        """
+        log.info(f"🗓 Ordonnanceur démarré : {len(self.symbols)} symbole(s), tâches {[t.name for t in self.tasks()]}")
+        last_version = None
+        while not stop_event.is_set():
+            version = states.version
+            now = time.monotonic()
+            pushed = user_stream.is_live() and version != last_version
+            tasks = self.tasks()
+            due = [t for t in tasks if pushed or now >= t.next_due]
+            if due:
+                last_version = version
+                try:
+                    await runtime.run_blocking(self.run_once, due)
+                except Exception as e:
+                    log.exception(f"❌ Erreur snapshot ordonnanceur : {e}")
+                    await asyncio.sleep(3)
+                    continue
+                finished = time.monotonic()
+                for t in due:
+                    t.next_due = finished + t.interval
+            wait = max(0.0, min((t.next_due for t in tasks), default=scheduler_poll_interval) - time.monotonic())
+            if user_stream.is_live():
+                await states.wait_for_change_async(version, timeout=wait)
+            else:
+                await asyncio.sleep(wait)
+
+# ✅ Instance globale unique (univers de core.config.symbols)
+scheduler = Scheduler(symbols)
@@ -0,0 +1,239 @@
+"""
+Module : settings.py
+But : Paramètres modifiables à chaud (levier, quantité USDT, mode, alertes de
+      gains) en mémoire : chargés une fois, validés, remplacés atomiquement à
+      chaque modification (Telegram, bus de commandes) et lus sans verrou ni
+      disque sur le chemin des ordres.
+      Persistance différée (write-behind) dans un seul fichier settings.json ;
+      au premier démarrage, reprise des anciens fichiers leverage.txt,
+      quantity.txt, mode.txt et gain_alert.txt.
+
+Utilisation :
+    from core.settings import settings
+    lev = settings.get().leverage
+    settings.update(leverage=20, source="telegram")
+    settings.subscribe(lambda old, new, changed: ...)
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+
+from core.config import (
+    BASE_DIR,
+    MODE_FILE,
+    LEVERAGE_FILE,
+    QUANTITY_FILE,
+    GAIN_ALERT_FILE,
+    default_leverage,
+    default_quantity_usdt,
+)
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
+WRITE_DELAY = 0.5  # Regroupe les modifications rapprochées en une seule écriture (s)
+
+MODES = ("auto", "alert")
+
+# === Validation ===
+def _leverage(value):
+    lev = int(value)
+    if float(value) != lev or lev < 1 or lev > 125:
+        raise ValueError(f"Levier hors limites (entier 1-125) : {value}")
+    return lev
+
+def _quantity(value):
+    qty = float(value)
+    if not qty > 0:
+        raise ValueError(f"Quantité invalide (<=0) : {value}")
+    return qty
+
+def _mode(value):
+    mode = str(value).strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : {value} (auto ou alert)")
+    return mode
+
+def _flag(value):
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ("on", "true", "1", "oui"):
+            return True
+        if text in ("off", "false", "0", "non"):
+            return False
+        raise ValueError(f"Valeur on/off invalide : {value}")
+    return bool(value)
+
+FIELDS = {
+    "leverage": _leverage,
+    "quantity_usdt": _quantity,
+    "mode": _mode,
+    "gain_alert": _flag,
+}
+
+class Settings:
+    """
+    Instantané immuable des paramètres : une lecture de get() donne un jeu
+    cohérent (levier et quantité d'un même trade).
+    """
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, leverage, quantity_usdt, mode, gain_alert):
+        object.__setattr__(self, "leverage", leverage)
+        object.__setattr__(self, "quantity_usdt", quantity_usdt)
+        object.__setattr__(self, "mode", mode)
+        object.__setattr__(self, "gain_alert", gain_alert)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings est immuable : utiliser settings.update()")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def __repr__(self):
+        return f"Settings({self.as_dict()})"
+
+DEFAULTS = Settings(default_leverage, default_quantity_usdt, "auto", True)
+
+class SettingsStore:
+    def __init__(self, path=SETTINGS_FILE):
+        self.path = path
+        self._current = None
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._dirty = threading.Event()
+        self._write_lock = threading.Lock()  # Écrivain différé et flush d'arrêt (atexit)
+        self._writer = None
+
+    # === Chargement (une seule fois) ===
+    def get(self):
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._load()
+                current = self._current
+            if self._dirty.is_set():
+                self._ensure_writer()
+        return current
+
+    def _load(self):
+        """
+        settings.json s'il existe, sinon reprise des anciens fichiers texte.
+        Une valeur absente ou invalide prend la valeur par défaut.
+        """
+        values, source = {}, os.path.basename(self.path)
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    values = json.load(f)
+            else:
+                values, source = _read_legacy_files(), "fichiers .txt"
+                self._dirty.set()  # Migration : settings.json écrit dès le premier flush
+        except Exception as e:
+            log.warning(f"⚠️ Lecture des paramètres impossible ({e}), valeurs par défaut.")
+        clean = DEFAULTS.as_dict()
+        for name, validate in FIELDS.items():
+            if name in values:
+                try:
+                    clean[name] = validate(values[name])
+                except (TypeError, ValueError) as e:
+                    log.warning(f"⚠️ Paramètre {name} invalide ({e}), défaut : {clean[name]}")
+        settings = Settings(**clean)
+        log.info(f"⚙️ Paramètres chargés ({source}) : {settings.as_dict()}")
+        return settings
+
+    # === Modification atomique ===
+    def update(self, source="interne", **changes):
+        """
+        Valide puis remplace l'instantané en une fois (ValueError si une valeur
+        est invalide : rien n'est modifié). Notifie les abonnés et planifie
+        l'écriture du fichier. Retourne le nouvel instantané.
+        """
+        unknown = set(changes) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Paramètre(s) inconnu(s) : {', '.join(sorted(unknown))}")
+        clean = {name: FIELDS[name](value) for name, value in changes.items()}
+        self.get()
+        with self._lock:
+            old = self._current
+            values = old.as_dict()
+            values.update(clean)
+            new = Settings(**values)
+            changed = [name for name in FIELDS if getattr(old, name) != getattr(new, name)]
+            if not changed:
+                return old
+            self._current = new
+            subscribers = list(self._subscribers)
+        log.info(f"⚙️ Paramètres modifiés ({source}) : " + ", ".join(f"{n} {getattr(old, n)} → {getattr(new, n)}" for n in changed))
+        self._dirty.set()
+        self._ensure_writer()
+        for fn in subscribers:
+            try:
+                fn(old, new, changed)
+            except Exception as e:
+                log.exception(f"❌ Erreur abonné paramètres : {e}")
+        return new
+
+    def subscribe(self, fn):
+        """
+        fn(old, new, changed) après chaque modification, dans le thread appelant.
+        """
+        with self._lock:
+            self._subscribers.append(fn)
+
+    # === Persistance différée ===
+    def flush(self):
+        """
+        Écrit l'instantané courant si une modification est en attente (écriture atomique).
+        """
+        with self._write_lock:
+            if not self._dirty.is_set() or self._current is None:
+                return
+            self._dirty.clear()
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._current.as_dict(), f, indent=2)
+                os.replace(tmp, self.path)
+            except Exception as e:
+                self._dirty.set()
+                log.warning(f"⚠️ Écriture de {self.path} échouée : {e}")
+                return False
+        return True
+
+    def _write_loop(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(WRITE_DELAY)
+            if self.flush() is False:
+                time.sleep(5)  # Disque indisponible : nouvel essai plus tard
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="settings-writer", daemon=True)
+                self._writer.start()
+
+def _read_legacy_files():
+    values = {}
+    for name, path in (("leverage", LEVERAGE_FILE), ("quantity_usdt", QUANTITY_FILE),
+                       ("mode", MODE_FILE), ("gain_alert", GAIN_ALERT_FILE)):
+        try:
+            with open(path, "r") as f:
+                content = f.read().strip()
+            if content:
+                values[name] = content
+        except FileNotFoundError:
+            continue
+    return values
+
+# ✅ Instance globale unique
+settings = SettingsStore()
+atexit.register(settings.flush)
@@ -1,13 +1,31 @@
 import threading
+from collections import deque
+
+from core.config import symbol, symbols
+from core import runtime
 
 class State:
-    def __init__(self):
-        self._lock = threading.Lock()
+    """
+    État d'un symbole. Verrou, compteur d'événements et statut du user-data
+    stream sont partagés par le registre : une boucle peut attendre le
+    prochain événement de n'importe quel symbole.
+    """
+    def __init__(self, symbol=None, registry=None):
+        self.symbol = symbol
+        self._registry = registry
+        self._lock = registry._lock
         self._position_open = False
         self._current_direction = None
         self._current_entry_price = None
         self._current_quantity = None
         self._current_position_id = None  # Pour futur tracking si nécessaire
+        # Position telle que poussée par l'exchange (ACCOUNT_UPDATE / resync REST) : écrite
+        # uniquement par apply_position, jamais par sync_position ni les exécuteurs
+        self._opening = False             # Ouverture en cours (ordre -> SL/TP initiaux posés)
+        self._pushed_amt = 0.0
+        self._pushed_entry_price = 0.0
+        self._open_orders = {}            # orderId -> ordre (format REST) tenu à jour par le user-data stream
+        self._closed_orders = deque(maxlen=500)  # orderId déjà exécutés/annulés (événement arrivé avant la réponse REST)
 
     # === Propriété : position ouverte ===
     @property
@@ -64,6 +82,96 @@ class State:
         with self._lock:
             self._current_position_id = value
 
+    # === Propriété : ouverture en cours (ensure_sl_tp ne pose rien pendant ce temps) ===
+    @property
+    def opening(self):
+        with self._lock:
+            return self._opening
+
+    @opening.setter
+    def opening(self, value: bool):
+        with self._lock:
+            self._opening = value
+
+    # === Propriété : user-data stream actif (commun à tous les symboles) ===
+    @property
+    def user_stream_live(self):
+        return self._registry.user_stream_live
+
+    @user_stream_live.setter
+    def user_stream_live(self, value: bool):
+        self._registry.user_stream_live = value
+
+    # === Événements poussés (user-data stream) ===
+    def _notify_locked(self):
+        self._registry._notify_locked()
+
+    def apply_position(self, amt: float, entry_price: float):
+        """
+        Applique une position reçue (ACCOUNT_UPDATE ou resynchronisation REST).
+        """
+        with self._lock:
+            self._pushed_amt = amt
+            self._pushed_entry_price = entry_price if amt != 0 else 0.0
+            if amt != 0:
+                self._position_open = True
+                self._current_direction = "bullish" if amt > 0 else "bearish"
+                self._current_entry_price = entry_price
+                self._current_quantity = abs(amt)
+            else:
+                self._position_open = False
+                self._current_direction = None
+                self._current_entry_price = None
+                self._current_quantity = None
+            self._notify_locked()
+
+    def apply_order(self, order: dict):
+        """
+        Ajoute/met à jour un ordre ouvert, ou le retire s'il n'est plus actif.
+        """
+        with self._lock:
+            if order.get("status") in ("NEW", "PARTIALLY_FILLED"):
+                if order["orderId"] in self._closed_orders:
+                    return  # Réponse REST en retard sur l'événement de clôture
+                self._open_orders[order["orderId"]] = order
+            else:
+                self._open_orders.pop(order["orderId"], None)
+                self._closed_orders.append(order["orderId"])
+            self._notify_locked()
+
+    def set_open_orders(self, orders: list):
+        with self._lock:
+            self._open_orders = {o["orderId"]: o for o in orders}
+            self._notify_locked()
+
+    def get_open_orders(self):
+        with self._lock:
+            return list(self._open_orders.values())
+
+    def get_position_information(self, symbol: str = None):
+        """
+        Position poussée par l'exchange au format de futures_position_information
+        (champs utilisés par le bot). Indépendante de position_open : une erreur
+        REST ou un reset local ne fait pas disparaître une position encore ouverte.
+        """
+        symbol = symbol or self.symbol
+        with self._lock:
+            return [{
+                "symbol": symbol,
+                "positionAmt": str(self._pushed_amt),
+                "entryPrice": str(self._pushed_entry_price),
+            }]
+
+    @property
+    def version(self):
+        return self._registry.version
+
+    def wait_for_change(self, version: int, timeout: float) -> bool:
+        """
+        Bloque jusqu'au prochain événement poussé après `version` (tous symboles), ou le timeout.
+        """
+        return self._registry.wait_for_change(version, timeout)
+
     # === Réinitialisation de tout l’état (utile après fermeture de position) ===
     def reset_all(self):
         with self._lock:
@@ -84,5 +192,71 @@ class State:
                 "position_id": self._current_position_id
             }
 
-# ✅ Instance globale unique utilisée dans tout le bot
-state = State()
+class StateRegistry:
+    """
+    Un State par symbole de l'univers, créés à la demande.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._version = 0                 # Incrémenté à chaque événement poussé (tous symboles)
+        self._user_stream_live = False    # True quand le user-data stream est connecté et synchronisé
+        self._states = {}
+        self._signal = runtime.Signal()   # Même compteur, attendu par les coroutines
+
+    def get(self, symbol: str) -> State:
+        key = symbol.upper()
+        with self._lock:
+            st = self._states.get(key)
+            if st is None:
+                st = self._states[key] = State(key, self)
+            return st
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._states.values()))
+
+    def _notify_locked(self):
+        self._version += 1
+        self._changed.notify_all()
+        self._signal.fire()  # Réveil des coroutines du runtime (ordonnanceur)
+
+    async def wait_for_change_async(self, version: int, timeout: float) -> bool:
+        """
+        wait_for_change pour les coroutines du runtime (sans bloquer la boucle).
+        """
+        return await self._signal.wait(version, timeout)
+
+    @property
+    def user_stream_live(self):
+        with self._lock:
+            return self._user_stream_live
+
+    @user_stream_live.setter
+    def user_stream_live(self, value: bool):
+        with self._lock:
+            self._user_stream_live = value
+            self._notify_locked()
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def wait_for_change(self, version: int, timeout: float) -> bool:
+        with self._lock:
+            return self._changed.wait_for(lambda: self._version != version, timeout=timeout)
+
+    def open_positions(self):
+        """
+        Symboles avec une position ouverte (état local).
+        """
+        return [st.symbol for st in self if st.position_open]
+
+# ✅ Registre global : un état par symbole de l'univers
+states = StateRegistry()
+for _sym in symbols:
+    states.get(_sym)
+
+# ✅ État du symbole principal (commandes Telegram, code mono-symbole)
+state = states.get(symbol)
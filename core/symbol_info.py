@@ -0,0 +1,110 @@
+"""
+Module : symbol_info.py
+But : Cache des métadonnées symbole (exchange info Futures) avec TTL.
+      LOT_SIZE, MIN_NOTIONAL et PRICE_FILTER sont parsés une fois par symbole ;
+      round_qty / round_price arrondissent en Decimal exact au pas du symbole.
+"""
+
+import time
+import threading
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_UP
+
+from core.binance_client import client
+from core.config import exchange_info_ttl
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+class SymbolFilters:
+    """
+    Filtres d'un symbole, avec quantizers précalculés.
+    """
+    __slots__ = ("symbol", "tick_size", "step_size", "min_qty", "min_notional",
+                 "price_precision", "qty_precision")
+
+    def __init__(self, symbol_data):
+        filters = {f["filterType"]: f for f in symbol_data["filters"]}
+        self.symbol = symbol_data["symbol"]
+        self.tick_size = Decimal(filters["PRICE_FILTER"]["tickSize"]).normalize()
+        self.step_size = Decimal(filters["LOT_SIZE"]["stepSize"]).normalize()
+        self.min_qty = Decimal(filters["LOT_SIZE"]["minQty"]).normalize()
+        notional = filters.get("MIN_NOTIONAL", {})
+        self.min_notional = Decimal(notional.get("notional", notional.get("minNotional", "0")))
+        self.price_precision = max(0, -self.tick_size.as_tuple().exponent)
+        self.qty_precision = max(0, -self.step_size.as_tuple().exponent)
+
+    @staticmethod
+    def _quantize(value, step, rounding):
+        units = (Decimal(str(value)) / step).to_integral_value(rounding=rounding)
+        return float((units * step).quantize(step))
+
+    def round_qty(self, qty, rounding=ROUND_HALF_EVEN):
+        return self._quantize(qty, self.step_size, rounding)
+
+    def round_price(self, price, rounding=ROUND_HALF_EVEN):
+        return self._quantize(price, self.tick_size, rounding)
+
+    def min_qty_for_notional(self, price):
+        """
+        Plus petite quantité (multiple du pas) respectant minQty et minNotional au prix donné.
+        """
+        qty = max(self.min_qty, self.min_notional / Decimal(str(price)))
+        return self._quantize(qty, self.step_size, ROUND_UP)
+
+# === Cache process-wide ===
+_lock = threading.Lock()
+_filters = {}
+_loaded_at = 0.0
+
+def refresh():
+    """
+    Télécharge l'exchange info (une seule fois pour tous les symboles).
+    """
+    global _filters, _loaded_at
+    info = client.futures_exchange_info()
+    parsed = {}
+    for s in info["symbols"]:
+        try:
+            parsed[s["symbol"]] = SymbolFilters(s)
+        except (KeyError, ArithmeticError):
+            continue  # Symbole sans filtres exploitables
+    _filters = parsed
+    _loaded_at = time.time()
+
+def _ensure_loaded():
+    global _loaded_at
+    if _filters and time.time() - _loaded_at < exchange_info_ttl:
+        return
+    with _lock:
+        # Un autre thread a peut-être déjà rafraîchi pendant l'attente
+        if _filters and time.time() - _loaded_at < exchange_info_ttl:
+            return
+        try:
+            refresh()
+        except Exception as e:
+            if not _filters:
+                raise
+            log.warning(f"⚠️ Rafraîchissement exchange info échoué, cache conservé : {e}")
+            # Cache périmé mais utilisable : nouvelle tentative dans 60s au lieu de chaque appel
+            _loaded_at = time.time() - exchange_info_ttl + 60
+
+# === API publique ===
+def get_filters(symbol) -> SymbolFilters:
+    _ensure_loaded()
+    try:
+        return _filters[symbol.upper()]
+    except KeyError:
+        raise ValueError(f"❌ Symbole inconnu sur Binance Futures : {symbol}")
+
+def is_known_symbol(symbol) -> bool:
+    _ensure_loaded()
+    return symbol.upper() in _filters
+
+def round_qty(symbol, qty, rounding=ROUND_HALF_EVEN) -> float:
+    return get_filters(symbol).round_qty(qty, rounding)
+
+def round_price(symbol, price, rounding=ROUND_HALF_EVEN) -> float:
+    return get_filters(symbol).round_price(price, rounding)
+
+def price_precision(symbol) -> int:
+    return get_filters(symbol).price_precision
@@ -1,9 +1,12 @@
 import os
 import sys
 import psutil
-from core.config import BASE_DIR, symbol, default_leverage, default_quantity_usdt # Utilise BASE_DIR depuis config.py
+from core.config import LOCK_FILE, symbol # Utilise LOCK_FILE depuis config.py
+from core.log import get_logger
 
-lock_file = os.path.join(BASE_DIR, "bot.lock")
+log = get_logger(__name__)
+
+lock_file = LOCK_FILE
 
 def is_another_bot_running(lock_file):
     current_pid = os.getpid()
@@ -21,15 +24,15 @@ def is_another_bot_running(lock_file):
 # Protection anti-double instance Telegram
 if os.path.exists(lock_file):
     if is_another_bot_running(lock_file):
-        print("⚠️ Une autre instance du bot (trading ou Telegram) est déjà en cours. Abandon.")
+        log.warning("⚠️ Une autre instance du bot (trading ou Telegram) est déjà en cours. Abandon.")
         sys.exit(0)
     else:
         # Aucun autre process, lock orphelin : on le supprime
         try:
             os.remove(lock_file)
-            print("🟢 Fichier bot.lock orphelin supprimé automatiquement (Telegram).")
+            log.info("🟢 Fichier bot.lock orphelin supprimé automatiquement (Telegram).")
         except Exception as e:
-            print(f"❌ Impossible de supprimer bot.lock : {e}")
+            log.error(f"❌ Impossible de supprimer bot.lock : {e}")
             sys.exit(0)
 
 # Crée le lock pour Telegram aussi
@@ -46,7 +49,6 @@ import sys
 import os
 import threading
 import json
-import logging
 import time
 import traceback
 # Ajout du chemin parent dans sys.path pour imports relatifs
@@ -58,18 +60,15 @@ from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeybo
 from types import SimpleNamespace
 from core.utils import safe_round
 from core.notifier import send_telegram
-from binance.client import Client
+from core import rate_limiter, commands
+from core.trading_utils import get_mode
+from core.settings import settings
+from core.trade_stats import trade_stats
+from core.binance_client import client
 
 # === Chargement des variables d’environnement (.env) ===
 load_dotenv()
 
-# === Configuration du logging ===
-logging.basicConfig(
-    filename="logs/telegram_bot.log",
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
-
 # === Chargement des variables de config à partir de .env ===
 API_KEY = os.getenv("BINANCE_API_KEY")
 API_SECRET = os.getenv("BINANCE_API_SECRET")
@@ -90,31 +89,18 @@ if not API_KEY or not API_SECRET:
 if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
     raise Exception("❌ TELEGRAM_TOKEN ou TELEGRAM_CHAT_ID manquant dans .env")
 
-# === Initialisation du client Binance (API) ===
-client = Client(API_KEY, API_SECRET)
-
 # === Initialisation du bot Telegram ===
 bot = telebot.TeleBot(TELEGRAM_TOKEN)
 
 # === Contexte utilisateur en mémoire ===
 user_trade_context = {}
 
-# === Prix initial (exemple) ===
-try:
-    price = float(client.get_symbol_ticker(symbol=symbol)["price"])
-except Exception as e:
-    logging.error(f"Erreur récupération prix initial: {e}")
-    price = 0.0
-
-# === Configuration du logging ===
-
+# === Journalisation (core.log : fichier JSON Lines + console, hors du thread Telegram) ===
 def log_info(msg):
-    print(msg)  # console
-    logging.info(msg)
+    log.info(msg)
 
 def log_error(msg):
-    print(msg)  # console
-    logging.error(msg)
+    log.error(msg)
 
 # === Fonction pour demander à l'utilisateur ===
 # Cette fonction envoie un message à l'utilisateur et attend sa réponse.
@@ -138,22 +124,17 @@ def save_user_trade_context():
         with open("context.json", "w") as f:
             json.dump(user_trade_context, f)
     except Exception as e:
-        print(f"Erreur sauvegarde contexte : {e}")
+        log.error(f"Erreur sauvegarde contexte : {e}")
 
 # Charge le contexte au démarrage
 user_trade_context = load_user_trade_context()
 
 # === ALERTES DE GAINS ===
 def read_gain_alert():
-    try:
-        with open("gain_alert.txt", "r") as f:
-            return f.read().strip() == "on"
-    except FileNotFoundError:
-        return True  # par défaut activé
+    return settings.get().gain_alert
 
 def write_gain_alert(value):
-    with open("gain_alert.txt", "w") as f:
-        f.write("on" if value else "off")
+    settings.update(source="telegram", gain_alert=value)
 
 @bot.message_handler(commands=['gain_alert'])
 def toggle_gain_alert(message):
@@ -168,23 +149,32 @@ def toggle_gain_alert(message):
 @bot.message_handler(commands=['status'])
 def status(message):
     log_info(f"[STATUS] Commande reçue de {message.chat.id} : {message.text}")
-    try:
-        with open("mode.txt", "r") as f:
-            mode_value = f.read().strip().lower()
-            if mode_value not in ["auto", "alert"]:
-                mode_value = "auto"  # Valeur par défaut si contenu inattendu
-    except Exception:
-        mode_value = "auto"  # Valeur par défaut si fichier absent ou erreur
+    mode_value = get_mode()
     mode_label = "AUTO" if mode_value == "auto" else "ALERTE"
     bot.reply_to(message, f"✅ SKY_TRADER est bien actif et en mode {mode_label}.")
 # === FERMETURE MANUELLE ===
 @bot.message_handler(commands=['close'])
 def close(message):
     log_info(f"[CLOSE] Commande reçue de {message.chat.id} : {message.text}")
-    with open("manual_close_request.txt", "w") as f:
-        f.write("close")
+    args = message.text.split()
+    commands.publish("close", source="telegram", sym=args[1].upper() if len(args) > 1 else None)
     bot.send_message(message.chat.id, "🔴 Fermeture de la position en cours ...")
 
+# === STATISTIQUES ===
+@bot.message_handler(commands=['stats'])
+def stats(message):
+    log_info(f"[STATS] Commande reçue de {message.chat.id} : {message.text}")
+    args = message.text.split()[1:]
+    period = next((a for a in args if not a.upper().endswith("USDT")), "tout")
+    sym = next((a.upper() for a in args if a.upper().endswith("USDT")), None)
+    try:
+        bot.reply_to(message, trade_stats.report(period, sym))
+    except ValueError as e:
+        bot.reply_to(message, f"⚠ {e}\nUtilisation : /stats [24h|7j|4s|3m|tout] [SYMBOLE]")
+    except Exception as e:
+        log_error(f"❌ Erreur /stats : {e}")
+        bot.reply_to(message, "❌ Statistiques indisponibles.")
+
 # === SHUTDOWN ===
 # Permet d'arrêter le bot manuellement via Telegram
 @bot.message_handler(commands=['shutdown'])
@@ -198,6 +188,18 @@ def shutdown(message):
         bot.send_message(message.chat.id, "❌ Permission refusée.")
         log_info(f"Tentative d'arrêt non autorisée par {message.chat.id}")
 
+# === STOP ===
+# Arrêt propre du trading (tâches de fond annulées, positions conservées), sans tuer le process
+@bot.message_handler(commands=['stop'])
+def stop(message):
+    log_info(f"[STOP] Commande reçue de {message.chat.id} : {message.text}")
+    if message.chat.id == TELEGRAM_CHAT_ID:
+        commands.publish("stop", source="telegram", reason="commande /stop Telegram")
+        bot.send_message(message.chat.id, "🛑 Arrêt du trading en cours ...")
+    else:
+        bot.send_message(message.chat.id, "❌ Permission refusée.")
+        log_info(f"Tentative d'arrêt non autorisée par {message.chat.id}")
+
 # === CHANGEMENT DE MODE ===
 @bot.message_handler(commands=['mode'])
 def mode(message):
@@ -205,8 +207,7 @@ def mode(message):
     try:
         mode_value = message.text.split(" ")[1].lower()
         if mode_value in ["auto", "alert"]:
-            with open("mode.txt", "w") as f:
-                f.write(mode_value)
+            commands.publish("mode", source="telegram", mode=mode_value)
             bot.reply_to(message, f"✅ SKY_TRADER passe en {mode_value.upper()}")
         else:
             bot.reply_to(message, "⚠ Mode inconnu. Utilisez /mode auto ou /mode alert.")
@@ -219,13 +220,15 @@ def help(message):
     log_info(f"[HELP] Commande reçue de {message.chat.id} : {message.text}")
     help_msg = (
         "/status - Voir l'état du bot\n"
-        "/close - Fermer la position\n"
+        "/close [SYMBOLE] - Fermer la position (toutes par défaut)\n"
         "/mode auto - Activer le mode automatique\n"
         "/mode alert - Activer le mode alerte\n"
         "/gain_alert - Activer/désactiver les alertes de gains\n"
+        "/stats [période] [SYMBOLE] - Statistiques des trades (24h, 7j, 4s, 3m, tout)\n"
         "/help - Affiche cette aide"
         "/menu - Afficher le menu principal\n"
         "/start - Démarrer le bot\n"
+        "/stop - Arrêter le trading (admin seulement)\n"
         "/shutdown - Arrêter le bot (admin seulement)\n"
     )
     bot.reply_to(message, help_msg)
@@ -260,13 +263,11 @@ def handle_main_keyboard(message):
     elif message.text == "📈 Trader":
         send_position_menu(message)
     elif message.text == "🔄 Mode AUTO":
+        commands.publish("mode", source="telegram", mode="auto")
         bot.send_message(message.chat.id, "Mode AUTO activé.")
-        with open("mode.txt", "w") as f:
-            f.write("auto")
     elif message.text == "🔔 Mode ALERT":
+        commands.publish("mode", source="telegram", mode="alert")
         bot.send_message(message.chat.id, "Mode ALERT activé.")
-        with open("mode.txt", "w") as f:
-            f.write("alert")
     elif message.text == "💰 Alertes de gains":
         toggle_gain_alert(message)
     elif message.text == "❓ Aide":
@@ -296,7 +297,7 @@ def handle_all_callbacks(call):
         bot.answer_callback_query(call.id)
     except telebot.apihelper.ApiTelegramException as e:
         if "query is too old" in str(e):
-            print("⏱️ Bouton expiré")
+            log.info("⏱️ Bouton expiré")
             bot.send_message(chat_id, "⏱️ Ce bouton a expiré. Veuillez réessayer.")
         else:
             raise
@@ -305,33 +306,19 @@ def handle_all_callbacks(call):
     try:
         if data == "status":
             log_info(f"[CALLBACK] Bouton 'status' cliqué ")
-            try:
-                with open("mode.txt", "r") as f:
-                    mode_value = f.read().strip()
-            except Exception:
-                mode_value = "inconnu"
-            bot.send_message(chat_id, f"✅ SKY_TRADER actif en mode {mode_value.upper()}")
+            bot.send_message(chat_id, f"✅ SKY_TRADER actif en mode {get_mode().upper()}")
 
         elif data == "close":
-            with open("manual_close_request.txt", "w") as f:
-                f.write("close")
+            commands.publish("close", source="telegram")
             bot.send_message(chat_id, "🔴 Fermeture de la position en cours ...")
         
         elif data == "mode_auto":
-            try:
-                with open("mode.txt", "w") as f:
-                    f.write("auto")
-                bot.send_message(chat_id, "✅ Mode AUTO activé.")
-            except Exception as e:
-                bot.send_message(chat_id, f"❌ Erreur écriture mode.txt : {e}")
+            commands.publish("mode", source="telegram", mode="auto")
+            bot.send_message(chat_id, "✅ Mode AUTO activé.")
 
         elif data == "mode_alert":
-            try:
-                with open("mode.txt", "w") as f:
-                    f.write("alert")
-                bot.send_message(chat_id, "✅ Mode ALERT activé.")
-            except Exception as e:
-                bot.send_message(chat_id, f"❌ Erreur écriture mode.txt : {e}")
+            commands.publish("mode", source="telegram", mode="alert")
+            bot.send_message(chat_id, "✅ Mode ALERT activé.")
         
         elif data == "gain_alert":
             current = read_gain_alert()
@@ -343,10 +330,11 @@ def handle_all_callbacks(call):
         elif data == "help":
             help_msg = (
                 "/status - Voir l'état du bot\n"
-                "/close - Fermer la position\n"
+                "/close [SYMBOLE] - Fermer la position (toutes par défaut)\n"
                 "/mode auto - Activer le mode automatique\n"
                 "/mode alert - Activer le mode alerte\n"
                 "/gain_alert - Activer/désactiver les alertes de gains\n"
+                "/stats [période] [SYMBOLE] - Statistiques des trades (24h, 7j, 4s, 3m, tout)\n"
                 "/help - Affiche cette aide"
             )
             bot.send_message(chat_id, help_msg)
@@ -432,9 +420,9 @@ def send_position_menu(obj):
     )
     bot.send_message(chat_id, "📈 Menu Position :", reply_markup=markup)
 # === Fonctions pour gérer les positions ===
+@rate_limiter.low_priority()  # Vue Telegram : abandonnée si le budget de poids est serré
 def send_current_position(chat_id):
     from core.utils import safe_round, safe_float
-    from core.binance_client import client
     try:
         pos = None
         positions = client.futures_position_information(symbol=symbol)
@@ -474,8 +462,8 @@ def send_current_position(chat_id):
         msg = f"Erreur récupération position : {e}"
     bot.send_message(chat_id, msg)
     
+@rate_limiter.low_priority()
 def send_balance(chat_id):
-    from core.binance_client import client
     try:
         balance = client.futures_account_balance()
         usdt = next((b for b in balance if b["asset"] == "USDT"), None)
@@ -485,8 +473,8 @@ def send_balance(chat_id):
         msg = f"Erreur récupération solde : {e}"
     bot.send_message(chat_id, msg)
 
+@rate_limiter.low_priority()
 def send_take_profit(chat_id):
-    from core.binance_client import client
     try:
         pos = None
         positions = client.futures_position_information(symbol=SYMBOL)
@@ -512,8 +500,8 @@ def send_take_profit(chat_id):
         msg = f"Erreur récupération Take Profit : {e}"
     bot.send_message(chat_id, msg)
 
+@rate_limiter.low_priority()
 def send_stop_loss(chat_id):
-    from core.binance_client import client
     from core.utils import safe_float
     try:
         positions = client.futures_position_information(symbol=SYMBOL)
@@ -605,7 +593,7 @@ def set_new_sl(message, pos):
             new_sl = entry * (1 + sens * percent / 100)
 
         # Ajoute un log pour debug
-        print(f"Demande SL à {new_sl} ({percent}%)")
+        log.info(f"Demande SL à {new_sl} ({percent}%)")
 
         try:
             client.futures_create_order(
@@ -622,7 +610,7 @@ def set_new_sl(message, pos):
             )
         except Exception as e:
             bot.reply_to(message, f"❌ Erreur Binance : {e}")
-            print(f"Erreur Binance : {e}")
+            log.error(f"Erreur Binance : {e}")
 
     except Exception as e:
         log_error(f"[set_new_sl] Erreur : {e}\n{traceback.format_exc()}")
@@ -640,13 +628,11 @@ def save_leverage(message):
         handle_main_keyboard(message)
         return
     try:
-        lev = int(message.text.strip())
-        with open("leverage.txt", "w") as f:
-            f.write(str(lev))
+        lev = settings.update(source="telegram", leverage=message.text.strip()).leverage
         bot.reply_to(message, f"✅ Levier changé à x{lev}. Il sera utilisé au prochain trade.")
     except Exception as e:
         log_error(f"[save_leverage] Erreur avec entrée '{message.text.strip()}' : {e}\n{traceback.format_exc()}")
-        bot.reply_to(message, "❌ Valeur de levier invalide. Réessaie avec un nombre entier.")
+        bot.reply_to(message, "❌ Valeur de levier invalide. Réessaie avec un nombre entier (1-125).")
 
 def save_quantity(message):
     # ...imports...
@@ -659,9 +645,7 @@ def save_quantity(message):
         handle_main_keyboard(message)
         return
     try:
-        qty = float(message.text.strip())
-        with open("quantity.txt", "w") as f:
-            f.write(str(qty))
+        qty = settings.update(source="telegram", quantity_usdt=message.text.strip()).quantity_usdt
         bot.reply_to(message, f"✅ Quantité changée à {qty} USDT. Elle sera utilisée au prochain trade.")
     except Exception as e:
         log_error(f"[save_quantity] Erreur avec entrée '{message.text.strip()}' : {e}\n{traceback.format_exc()}")
@@ -669,19 +653,11 @@ def save_quantity(message):
 
 # Fonction pour lire la quantité
 def read_quantity():
-    try:
-        with open("quantity.txt", "r") as f:
-            return float(f.read().strip())
-    except Exception:
-        return default_quantity_usdt  # valeur par défaut
+    return settings.get().quantity_usdt
 
 # Fonction pour lire le levier
 def read_leverage():
-    try:
-        with open("leverage.txt", "r") as f:
-            return int(f.read().strip())
-    except Exception:
-        return default_leverage  # valeur par défaut
+    return settings.get().leverage
 
 user_trade_context = {}  # stocke le contexte par chat_id
 
@@ -731,7 +707,6 @@ def receive_quantity(message):
 
 
 def receive_leverage(message):
-    from core.binance_client import client
     from core.trade_interface import open_trade
     chat_id = message.chat.id
     text = message.text.strip()
@@ -768,13 +743,13 @@ def receive_leverage(message):
 
 # Pour démarrer le bot
 def start_bot():
-    print("🤖 Bot Telegram démarré...")
+    log.info("🤖 Bot Telegram démarré...")
     bot.infinity_polling(timeout=20, long_polling_timeout=10)
 
 def stop_telegram_bot():
-    print("🔴 Arrêt du bot Telegram demandé...")
+    log.info("🔴 Arrêt du bot Telegram demandé...")
     bot.stop_polling()
-    print("🟢 Bot Telegram arrêté.")
+    log.info("🟢 Bot Telegram arrêté.")
 
 
 if __name__ == "__main__":
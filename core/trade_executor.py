@@ -1,22 +1,25 @@
 import time
-import traceback
-from core.binance_client import client, check_position_open, change_leverage
-from core.state import state
-from core.config import symbol, default_leverage, default_quantity_usdt, stop_loss_pct, take_profit_pct
+from core.binance_client import client, check_position_open
+from core.state import state, states
+from core.config import symbol, stop_loss_pct, take_profit_pct
 from core.trading_utils import (
-    calculate_quantity,
     log_trade,
-    get_leverage_from_file,
-    get_quantity_from_file,
     retry_order,
 )
+from core.settings import settings
+from core.trade_journal import journal
 from core.telegram_controller import send_telegram
 from core.position_utils import sync_position
-from core.trailing import update_trailing_sl_and_tp
+from core.trailing import trail_position
+from core import user_stream, symbol_info, latency, runtime
+from core.scheduler import scheduler
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # Initialisation des threads globaux
-trailing_thread = None
 tp_thread = None
 
 position_lock = threading.Lock()
@@ -37,18 +40,10 @@ except ImportError:
     BinanceOrderException = Exception
 
 def log_error(e):
-    try:
-        with open("logs/errors.txt", "a") as f:
-            f.write(f"{time.ctime()} - Erreur : {traceback.format_exc()}\n")
-    except Exception:
-        pass
-
-def round_quantity(symbol, qty):
-    # Pour ALGOUSDT, 1 décimale
-    if symbol.upper() == "ALGOUSDT":
-        return round(qty, 1)
-    # Ajoute ici d'autres symboles si besoin
-    return qty
+    """
+    Erreur et pile dans le journal (core.log) : écriture par le thread de journalisation.
+    """
+    log.error(f"❌ Erreur : {e}", exc_info=e if isinstance(e, BaseException) else None)
 
 def get_price_with_retry(symbol, retries=3, delay=2):
     """
@@ -102,90 +97,135 @@ def get_real_leverage(symbol):
         log_error(e)
         return None
 
+# === PRÉ-TRADE : requêtes indépendantes en parallèle ===
+# Pool borné, partagé par toutes les ouvertures (une requête par étape)
+_pretrade_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pretrade")
+
+class PreTradeError(Exception):
+    """
+    Échec d'une étape pré-trade ; le message est prêt pour Telegram.
+    """
+
+def prepare_order_context(direction, usdt_margin, lev, sym=symbol):
+    """
+    Lance levier, prix, exchange info et solde en même temps (latence ≈ la plus lente),
+    s'arrête à la première erreur et retourne le contexte complet de l'ordre MARKET.
+    """
+    steps = {
+        "leverage": ("❌ Erreur levier", lambda: client.futures_change_leverage(symbol=sym, leverage=lev)),
+        "price": ("❌ Erreur prix", lambda: get_price_with_retry(sym, retries=3, delay=3)),
+        "filters": ("❌ Erreur exchange info", lambda: symbol_info.get_filters(sym)),
+        "balance": ("❌ Erreur solde", client.futures_account_balance),
+    }
+    futures = {_pretrade_pool.submit(fn): (name, label) for name, (label, fn) in steps.items()}
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    for future in done:
+        error = future.exception()
+        if error is not None:
+            # Les étapes déjà lancées se terminent en arrière-plan (toutes idempotentes)
+            for other in pending:
+                other.cancel()
+            label = futures[future][1]
+            raise PreTradeError(f"{label} : {error}") from error
+    results = {futures[f][0]: f.result() for f in futures}
+
+    # 📊 Calcul de la quantité (arrondie au stepSize du symbole)
+    price = results["price"]
+    filters = results["filters"]
+    notices = []
+    qty = filters.round_qty(usdt_margin * lev / price)
+
+    # ✅ Vérifie minQty & minNotional (filtres en cache)
+    if qty < float(filters.min_qty):
+        qty = float(filters.min_qty)
+        notices.append(f"⚠️ Quantité ajustée à {qty} (minQty)")
+    if qty * price < float(filters.min_notional):
+        qty = filters.min_qty_for_notional(price)
+        notices.append(f"⚠️ Quantité ajustée pour respecter minNotional : {qty}")
+
+    # 🏦 Vérifie le solde (au moins la marge demandée)
+    usdt_balance = float(next(b for b in results["balance"] if b['asset'] == 'USDT')['availableBalance'])
+    if usdt_balance < usdt_margin:
+        raise PreTradeError(f"❌ Solde insuffisant. Requis : {usdt_margin}$, dispo : {usdt_balance:.2f}$")
+
+    return {
+        "direction": direction,
+        "side": SIDE_BUY if direction == "bullish" else SIDE_SELL,
+        "quantity": qty,
+        "price": price,
+        "leverage": lev,
+        "usdt_margin": usdt_margin,
+        "notices": notices,
+    }
+
 # === OUVERTURE DE POSITION ==
-def open_trade(direction, quantity=None, leverage=None):
+def open_trade(direction, quantity=None, leverage=None, sym=symbol):
     """
     Ouvre une position sur Binance Futures en utilisant EXACTEMENT 1$ de marge USDT,
     avec effet de levier personnalisé. Quantité d’ALGO calculée automatiquement.
     """
+    # Trace de latence propre si l'appel ne vient pas d'une stratégie (ex : Telegram)
+    state = states.get(sym)
+    with latency.trace("trade", source="manual", symbol=sym):
+        # Le fill (ACCOUNT_UPDATE) réveille la tâche "sltp" avant set_initial_sl_tp :
+        # elle ignore le symbole tant que l'ouverture n'a pas posé ses propres SL/TP
+        state.opening = True
+        try:
+            return _open_trade(direction, quantity, leverage, sym)
+        finally:
+            state.opening = False
+
+def _open_trade(direction, quantity=None, leverage=None, sym=symbol):
+    state = states.get(sym)
     try:
-        sync_position()
-        if state.position_open or check_position_open(symbol=symbol):
-            send_telegram("⚠️ Une position est déjà ouverte. Fermeture avant nouvelle ouverture.")
-            close_position()
+        sync_position(sym)
+        if state.position_open or check_position_open(symbol=sym):
+            send_telegram(f"⚠️ Une position {sym} est déjà ouverte. Fermeture avant nouvelle ouverture.")
+            close_position(sym)
             time.sleep(1)
-            sync_position()
-            if state.position_open or check_position_open(symbol=symbol):
+            sync_position(sym)
+            if state.position_open or check_position_open(symbol=sym):
                 send_telegram("❌ Impossible de fermer la position précédente.")
                 return
 
-        # ✅ Lecture paramètres dynamiques
-        usdt_margin = float(quantity) if quantity is not None else float(get_quantity_from_file())
-        lev = int(leverage) if leverage is not None else int(get_leverage_from_file())
+        # ✅ Paramètres dynamiques : un seul instantané en mémoire (levier et quantité cohérents)
+        current = settings.get()
+        usdt_margin = float(quantity) if quantity is not None else current.quantity_usdt
+        lev = int(leverage) if leverage is not None else current.leverage
 
-        # 🎯 Applique le levier
-        try:
-            client.futures_change_leverage(symbol=symbol, leverage=lev)
-        except Exception as e:
-            send_telegram(f"❌ Erreur levier : {e}")
-            log_error(e)
-            return
+        latency.mark("executor.position_check")
 
-        # 📈 Récupère le prix du marché
+        # 🚀 Pré-trade : levier, prix, filtres et solde en parallèle
         try:
-            price = get_price_with_retry(symbol, retries=3, delay=3)
-        except Exception as e:
-            send_telegram(f"❌ Erreur prix : {e}")
+            ctx = prepare_order_context(direction, usdt_margin, lev, sym)
+        except PreTradeError as e:
+            send_telegram(str(e))
             log_error(e)
             return
-
-        # 📊 Calcul de la quantité
-        position_value = usdt_margin * lev
-        qty = round_quantity(symbol, position_value / price)
-
-        # ✅ Vérifie minQty & minNotional
-        exchange_info = client.futures_exchange_info()
-        symbol_info = next(s for s in exchange_info['symbols'] if s['symbol'] == symbol)
-        filters = {f['filterType']: f for f in symbol_info['filters']}
-        min_qty = float(filters['LOT_SIZE']['minQty'])
-        min_notional = float(filters['MIN_NOTIONAL']['notional'])
-        step_size = float(filters['LOT_SIZE']['stepSize'])
-
-        if qty < min_qty:
-            qty = min_qty
-            send_telegram(f"⚠️ Quantité ajustée à {qty} (minQty)")
-
-        if qty * price < min_notional:
-            qty = round((min_notional / price) / step_size) * step_size
-            qty = round_quantity(symbol, qty)
-            send_telegram(f"⚠️ Quantité ajustée pour respecter minNotional : {qty}")
-
-        # 🏦 Vérifie le solde (au moins 1$ dispo)
-        balance = client.futures_account_balance()
-        usdt_balance = float(next(b for b in balance if b['asset'] == 'USDT')['availableBalance'])
-        if usdt_balance < usdt_margin:
-            send_telegram(f"❌ Solde insuffisant. Requis : {usdt_margin}$, dispo : {usdt_balance:.2f}$")
-            return
+        latency.mark("pretrade")
+        qty = ctx["quantity"]
 
         # 📤 Place l’ordre
-        side = "BUY" if direction == "bullish" else "SELL"
         try:
             order = retry_order_creation(lambda: client.futures_create_order(
-                symbol=symbol,
-                side=side,
+                symbol=sym,
+                side=ctx["side"],
                 type="MARKET",
-                quantity=qty
+                quantity=qty,
+                newOrderRespType="RESULT"  # Réponse après exécution : statut FILLED + avgPrice
             ), max_retries=3, delay=3)
         except Exception as e:
             send_telegram(f"❌ Erreur création ordre : {e}")
             log_error(e)
             return
+        latency.mark("order.ack")
 
-        # 🎯 Post-trade
-        entry_price = float(order.get("avgFillPrice", price))
-        if not check_position_open(symbol=symbol):
+        # 🎯 Post-trade : exécution confirmée par la réponse, ou par l'événement de fill
+        entry_price = confirm_fill(order, sym=sym)
+        if entry_price is None:
             send_telegram("❌ Aucune position détectée après l’ordre.")
             return
+        latency.mark("fill.confirmed")
 
         # 🧠 State
         state.position_open = True
@@ -193,58 +233,63 @@ def open_trade(direction, quantity=None, leverage=None):
         state.current_entry_price = entry_price
         state.current_quantity = qty
 
-        send_telegram(
-            f"✅Position de {'HAUSSE' if direction == 'bullish' else 'BAISSE'} ouverte à {entry_price}$\n"
-            f"💰 Montant : {usdt_margin}$ ... Quantité: {qty} ALGO |\n⚙️ Levier: x{lev}\n"
-        )
-
-
-        # SL/TP et trailing
-        set_initial_sl_tp(direction, entry_price, qty)
-
-        global trailing_thread
-        try:
-            if trailing_thread and trailing_thread.is_alive():
-                trailing_thread.do_run = False
-                trailing_thread.join()
-        except Exception as e:
-            log_error(e)
+        # 🛡 SL/TP posés immédiatement, avant tout message Telegram
+        breached = set_initial_sl_tp(direction, entry_price, qty, sym)
+        latency.mark("sltp.live")
 
-        trailing_thread = threading.Thread(
-            target=update_trailing_sl_and_tp,
-            args=(direction, entry_price),
-            daemon=True
+        # Avertissements d'ajustement envoyés après l'ordre (pas sur le chemin critique)
+        for notice in ctx["notices"]:
+            send_telegram(notice)
+        send_telegram(
+            f"✅Position de {'HAUSSE' if direction == 'bullish' else 'BAISSE'} {sym} ouverte à {entry_price}$\n"
+            f"💰 Montant : {usdt_margin}$ ... Quantité: {qty} |\n⚙️ Levier: x{lev}\n"
         )
-        trailing_thread.start()
 
-        log_trade(
+        # Journal (écriture différée) : l'identifiant suit la position jusqu'à sa clôture
+        state.current_position_id = log_trade(
             direction,
             entry_price,
             entry_price * (1 - stop_loss_pct if direction == "bullish" else 1 + stop_loss_pct),
             entry_price * (1 + take_profit_pct if direction == "bullish" else 1 - take_profit_pct),
             "AUTO",
-            status="OUVERT"
+            status="OUVERT",
+            sym=sym,
+            quantity=qty,
+            leverage=lev,
         )
 
+        # SL (ou TP) déjà franchi à la pose : aucun stop possible à ce niveau, clôture au marché
+        if breached:
+            label = "SL" if "STOP_MARKET" in breached else "TP"
+            send_telegram(f"⚠️ {sym} : prix déjà au-delà du {label} à la pose, fermeture de la position.")
+            close_position(sym, status=f"FERMÉ - {label}")
+            return
+
+        # Trailing : une coroutine du runtime par position ouverte, réveillée par le
+        # prix mark du symbole ; le suivi précédent du même symbole est annulé
+        runtime.spawn(trail_position, direction, entry_price, sym, name=f"trailing-{sym}", resilient=False)
+
     except Exception as e:
         send_telegram(f"❌ Erreur open_trade : {e}")
         log_error(e)
 
         
 # === FERMETURE DE POSITION ===
-def close_position():
+def close_position(sym=symbol, status="FERMÉ - MANUEL"):
     """
-    Ferme la position ouverte s'il y en a une.
+    Ferme la position ouverte du symbole s'il y en a une.
     Annule tous les ordres SL/TP restants après la fermeture.
+    status : statut inscrit au journal des trades.
     """
+    state = states.get(sym)
     try:
-        sync_position()
-        if not state.position_open and not check_position_open(symbol=symbol):
+        sync_position(sym)
+        if not state.position_open and not check_position_open(symbol=sym):
             send_telegram("⚠️ Aucune position ouverte à fermer.")
             return
 
         # Détermination du sens de clôture
-        positions = client.futures_position_information(symbol=symbol)
+        positions = client.futures_position_information(symbol=sym)
         pos = next((p for p in positions if float(p["positionAmt"]) != 0), None)
         if not pos:
             send_telegram("⚠️ Aucune position détectée sur Binance.")
@@ -252,6 +297,7 @@ def close_position():
 
         amt = float(pos["positionAmt"])
         side = "SELL" if amt > 0 else "BUY"
+        trade_id = state.current_position_id  # Lu avant le fill (la surveillance peut réinitialiser l'état)
         qty = abs(amt)
 
         # Récupère le levier AVANT la fermeture
@@ -259,7 +305,7 @@ def close_position():
         # Fermeture de la position
         try:
             client.futures_create_order(
-                symbol=symbol,
+                symbol=sym,
                 side=side,
                 type="MARKET",
                 quantity=qty,
@@ -282,7 +328,7 @@ def close_position():
             account_info = client.futures_account()
             lev = "inconnu"
             for asset in account_info['positions']:
-                if asset['symbol'] == symbol:
+                if asset['symbol'] == sym:
                     lev = int(asset.get('leverage', 1))
                     break
         except Exception:
@@ -294,7 +340,7 @@ def close_position():
         sens = "HAUSSE" if state.current_direction == "bullish" else "BAISSE"
         gain = (exit_price - entry_price) * qty if sens == "HAUSSE" else (entry_price - exit_price) * qty
         send_telegram(
-            f"✅ La Position {sens} fermée à {exit_price:.4f}$\n"
+            f"✅ La Position {sens} {sym} fermée à {exit_price:.4f}$\n"
             f"💵 Quantité: {qty:.2f} | Prix d'Entrée: {entry_price:.4f}$\n"
             f"⚙️ Levier de : x{lev}"
             f".... 💰Montant : {position_value:.2f} USDT\n"
@@ -302,15 +348,18 @@ def close_position():
         )
 
 
+        # Journal : clôture du trade (par son identifiant, sinon le dernier OUVERT du symbole)
+        journal.close(sym, trade_id, status=status, exit_price=exit_price, gain=gain)
+
         # Nettoyage des ordres SL/TP restants
-        cancel_all_open_orders_if_no_position()
+        cancel_all_open_orders_if_no_position(sym)
 
         # Mise à jour de l'état local
         state.reset_all()
 
         # Vérification de clôture effective
         #time.sleep(1)
-        if check_position_open(symbol=symbol):
+        if check_position_open(symbol=sym):
             send_telegram("⚠️ La position semble toujours ouverte après la clôture. Vérifie manuellement.")
 
     except Exception as e:
@@ -318,30 +367,82 @@ def close_position():
         log_error(e)
 
 # === POSE SL/TP DE SÉCURITÉ SI ABSENT ===
-def set_initial_sl_tp(direction, entry_price, qty):
+def confirm_fill(order, timeout=5, sym=symbol):
     """
-    Pose un SL et un TP si aucun n'est présent, avec précision maximale.
+    Prix d'entrée réel d'un ordre MARKET, sans attente fixe :
+    - réponse RESULT déjà FILLED : avgPrice directement
+    - sinon : attente de l'ACCOUNT_UPDATE (flux actif) ou polling REST court
+    Retourne None si aucune position n'apparaît avant le timeout.
     """
-    try:
-        side_close = "SELL" if direction == "bullish" else "BUY"
-        time.sleep(15)  # Attente pour s'assurer que la position est bien ouverte
-
-        # Récupère le prix d'entrée réel depuis Binance
-        positions = client.futures_position_information(symbol=symbol)
+    if order.get("status") == "FILLED" and float(order.get("avgPrice") or 0) > 0:
+        return float(order["avgPrice"])
+    deadline = time.time() + timeout
+    while True:
+        version = state.version
+        positions = user_stream.get_position_information(sym)
         pos = next((p for p in positions if float(p["positionAmt"]) != 0), None)
         if pos:
-            entry_price_real = float(pos["entryPrice"])
+            return float(pos["entryPrice"])
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        if user_stream.is_live():
+            state.wait_for_change(version, timeout=remaining)
         else:
-            entry_price_real = entry_price  # fallback si non dispo
-
-        # Récupère la précision du tickSize
-        exchange_info = client.futures_exchange_info()
-        symbol_info = next(s for s in exchange_info['symbols'] if s['symbol'] == symbol)
-        tick_size = float(next(f for f in symbol_info['filters'] if f['filterType'] == 'PRICE_FILTER')['tickSize'])
-        def round_to_tick(price, tick_size):
-            return round(round(price / tick_size) * tick_size, 8)
+            time.sleep(min(0.5, remaining))
+
+def _protective_order(side_close, order_type, stop_price, tag, sym=symbol):
+    # Valeurs en chaînes : batchOrders est sérialisé en JSON par python-binance.
+    # newClientOrderId fixé ici : un renvoi du même lot est rejeté au lieu de dupliquer l'ordre.
+    return {
+        "symbol": sym,
+        "side": side_close,
+        "type": order_type,
+        "stopPrice": str(stop_price),
+        "closePosition": "true",
+        "timeInForce": "GTC",
+        "newClientOrderId": f"init-{tag}-{int(time.time() * 1000)}",
+    }
+
+def _resend_protective(params):
+    """
+    Renvoi individuel d'un ordre du lot, avec le même newClientOrderId (réponse
+    perdue puis renvoi : -4116 au lieu d'un second stop). Retourne l'ordre, None
+    s'il est déjà posé, ou {"code": -2021, "msg"} : prix déjà au-delà du niveau,
+    refus déterministe qui n'est pas relancé.
+    """
+    def send():
+        try:
+            return client.futures_create_order(
+                symbol=params["symbol"],
+                side=params["side"],
+                type=params["type"],
+                stopPrice=float(params["stopPrice"]),
+                closePosition=True,
+                timeInForce="GTC",
+                newClientOrderId=params["newClientOrderId"],
+            )
+        except Exception as e:
+            if "code=-4116" in str(e):
+                return None
+            if "code=-2021" in str(e):
+                return {"code": -2021, "msg": str(e)}
+            raise
+    return retry_order(send)
+
+def set_initial_sl_tp(direction, entry_price, qty, sym=symbol):
+    """
+    Pose le SL et le TP manquants dès l'exécution confirmée, en un seul
+    aller-retour (batchOrders). entry_price : prix d'exécution réel.
+    Retourne les types refusés car le prix mark a déjà franchi le niveau
+    (-2021) : la position n'est pas protégée, à l'appelant de la fermer.
+    """
+    breached = []
+    try:
+        side_close = "SELL" if direction == "bullish" else "BUY"
+        entry_price_real = entry_price
 
-        orders = client.futures_get_open_orders(symbol=symbol)
+        orders = user_stream.get_open_orders(sym)
         sl_orders = [o for o in orders if o['type'] == "STOP_MARKET" and o['side'] == side_close and o.get('closePosition', False)]
         tp_orders = [o for o in orders if o['type'] == "TAKE_PROFIT_MARKET" and o['side'] == side_close and o.get('closePosition', False)]
 
@@ -351,87 +452,104 @@ def set_initial_sl_tp(direction, entry_price, qty):
         stop_price = entry_price_real * (1 - stop_loss_pct) if direction == "bullish" else entry_price_real * (1 + stop_loss_pct)
         take_profit = entry_price_real * (1 + take_profit_pct) if direction == "bullish" else entry_price_real * (1 - take_profit_pct)
 
-        stop_price = round_to_tick(stop_price, tick_size)
-        take_profit = round_to_tick(take_profit, tick_size)
+        # Arrondi exact au tickSize (filtres en cache)
+        stop_price = symbol_info.round_price(sym, stop_price)
+        take_profit = symbol_info.round_price(sym, take_profit)
 
+        batch = []
         if not has_sl:
-            retry_order(lambda: client.futures_create_order(
-                symbol=symbol,
-                side=side_close,
-                type="STOP_MARKET",
-                stopPrice=stop_price,
-                closePosition=True,
-                timeInForce="GTC"
-            ))
-            send_telegram(f"🛡 Stop loss automatique à {stop_price}$")
-
+            batch.append(_protective_order(side_close, "STOP_MARKET", stop_price, "sl", sym))
         if not has_tp:
-            retry_order(lambda: client.futures_create_order(
-                symbol=symbol,
-                side=side_close,
-                type="TAKE_PROFIT_MARKET",
-                stopPrice=take_profit,
-                closePosition=True,
-                timeInForce="GTC"
-            ))
-            send_telegram(f"🎯 Take profit automatique à {take_profit}$")
-
-        # Vérification création SL/TP
-        orders = client.futures_get_open_orders(symbol=symbol)
-        has_sl = any(o['type'] == "STOP_MARKET" for o in orders)
-        has_tp = any(o['type'] == "TAKE_PROFIT_MARKET" for o in orders)
-        if not (has_sl and has_tp):
-            send_telegram("⚠️ SL/TP pas créés correctement. Vérifie manuellement.")
+            batch.append(_protective_order(side_close, "TAKE_PROFIT_MARKET", take_profit, "tp", sym))
+        if not batch:
+            return breached
+
+        results = retry_order(lambda: client.futures_place_batch_order(batchOrders=[dict(o) for o in batch]))
+        failed = []
+        for params, result in zip(batch, results):
+            if isinstance(result, dict) and "orderId" in result:
+                user_stream.record_order(result)
+                continue
+            if isinstance(result, dict) and result.get("code") == -4116:
+                # ClientOrderId déjà utilisé : le lot précédent (réponse perdue) est passé
+                continue
+            if not (isinstance(result, dict) and result.get("code") == -2021):
+                # Autre erreur propre à cet ordre ({"code", "msg"}) : renvoi individuel
+                log.warning(f"⚠️ Ordre {params['type']} refusé dans le lot : {result}")
+                try:
+                    result = _resend_protective(params)
+                except Exception as e:
+                    log_error(e)
+                    failed.append(params["type"])
+                    continue
+                if result is None:
+                    continue
+                if "orderId" in result:
+                    user_stream.record_order(result)
+                    continue
+            # -2021 : le prix a déjà franchi le niveau, un renvoi au même stopPrice échouerait encore
+            log.warning(f"⚠️ {params['type']} {sym} à {params['stopPrice']} déjà franchi : {result.get('msg')}")
+            breached.append(params["type"])
+
+        if not has_sl and "STOP_MARKET" not in failed + breached:
+            send_telegram(f"🛡 Stop loss automatique {sym} à {stop_price}$")
+        if not has_tp and "TAKE_PROFIT_MARKET" not in failed + breached:
+            send_telegram(f"🎯 Take profit automatique {sym} à {take_profit}$")
+        if failed:
+            send_telegram(f"⚠️ SL/TP {sym} pas créés correctement. Vérifie manuellement.")
 
     except Exception as e:
         send_telegram(f"❌ Erreur pose SL/TP initial : {e}")
         log_error(e)
+    return breached
 
 # === NETTOYAGE DES ORDRES SL/TP ORPHELINS ===
-def cancel_all_open_orders_if_no_position():
+def cancel_all_open_orders_if_no_position(sym=symbol, positions=None, open_orders=None):
     """
     Annule tous les ordres SL/TP restants UNIQUEMENT s'il n'y a plus de position ouverte.
     N'envoie un message Telegram que si au moins un ordre a été annulé.
+    positions / open_orders : snapshot déjà lu (ordonnanceur), sinon lu ici.
     """
     try:
-        positions = client.futures_position_information(symbol=symbol)
+        if positions is None:
+            positions = user_stream.get_position_information(sym)
         has_position = any(float(p["positionAmt"]) != 0 for p in positions)
         if has_position:
             # Il y a une position ouverte, on ne touche à rien
             return
         # Sinon, on annule les ordres SL/TP restants
-        open_orders = client.futures_get_open_orders(symbol=symbol)
+        if open_orders is None:
+            open_orders = user_stream.get_open_orders(sym)
         cancelled = 0
         for order in open_orders:
             if order['type'] in ["STOP_MARKET", "TAKE_PROFIT_MARKET"]:
                 try:
-                    client.futures_cancel_order(symbol=symbol, orderId=order['orderId'])
+                    user_stream.record_order(client.futures_cancel_order(symbol=sym, orderId=order['orderId']))
                     cancelled += 1
                 except Exception as e:
                     if "code=-2011" in str(e):
-                        print(f"Ordre déjà annulé ou exécuté (id: {order['orderId']})")
+                        log.info(f"Ordre déjà annulé ou exécuté (id: {order['orderId']})")
                     else:
                         log_error(e)
                         raise
         if cancelled > 0:
-            send_telegram(f"✅ {cancelled} ordre(s) SL/TP orphelin(s) ont été annulés car il n'y a plus de position ouverte.")
+            send_telegram(f"✅ {cancelled} ordre(s) SL/TP orphelin(s) {sym} ont été annulés car il n'y a plus de position ouverte.")
     except Exception as e:
         send_telegram(f"⚠️ Erreur lors de l'annulation des ordres sans position : {e}")
         log_error(e)
 
 # === SYNCHRONISATION DE POSITION (exposé pour d'autres modules) ===
-def sync_and_check_position():
-    sync_position()
-    return state.position_open or check_position_open(symbol=symbol)
+def sync_and_check_position(sym=symbol):
+    sync_position(sym)
+    return states.get(sym).position_open or check_position_open(symbol=sym)
 
-def sltp_watchdog_loop():
-    while True:
-        try:
-            cancel_all_open_orders_if_no_position()
-        except Exception as e:
-            log_error(e)
-        time.sleep(10)
+# === WATCHDOG SL/TP ORPHELINS (ordonnanceur commun à tous les symboles) ===
+def _sltp_watchdog(sym, positions, orders):
+    try:
+        cancel_all_open_orders_if_no_position(sym, positions, orders)
+    except Exception as e:
+        log_error(e)
 
-# Lance la surveillance au démarrage du module
-watchdog_thread = threading.Thread(target=sltp_watchdog_loop, daemon=True)
-watchdog_thread.start()
\ No newline at end of file
+# Lectures en basse priorité (annulations d'ordres non concernées) ; réveil à la
+# fermeture de position (événement poussé), ou toutes les 10s sans flux
+scheduler.add("watchdog", _sltp_watchdog, 10, low_priority=True)
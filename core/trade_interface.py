@@ -1,17 +1,22 @@
 from core.trade_executor import open_trade as real_open_trade, close_position as real_close_position
-from core.state import state
+from core.state import states
 from core.binance_client import check_position_open
 import threading
+from collections import defaultdict
 from core.telegram_controller import send_telegram
 from core.position_utils import sync_position
 from core.config import symbol
+from core import latency
+from core.log import get_logger
 
-position_lock = threading.Lock()  # Verrou pour accès thread-safe
+log = get_logger(__name__)
+
+position_locks = defaultdict(threading.Lock)  # Un verrou par symbole pour accès thread-safe
 
 MAX_RETRIES = 3
 RETRY_DELAY = 2
 
-def open_trade(direction, quantity=None, leverage=None):
+def open_trade(direction, quantity=None, leverage=None, sym=symbol):
     """
     Ouvre une position dans la direction donnée, avec quantité et levier personnalisés si fournis.
     - Ferme la position existante si besoin (logique EMA cross).
@@ -19,20 +24,21 @@ def open_trade(direction, quantity=None, leverage=None):
     - Retry sur erreur temporaire (point 3, 7, 8).
     - Notifie tout problème sur Telegram (point 5).
     """
+    state = states.get(sym)
     try:
-        sync_position()
-        with position_lock:
+        sync_position(sym)
+        with position_locks[sym]:
             # Vérification croisée local/Binance
             local_open = state.position_open
-            real_open = check_position_open(symbol=symbol)
+            real_open = check_position_open(symbol=sym)
             if local_open or real_open:
                 msg = "⚠️ Une position est déjà ouverte (local ou Binance). Tentative de fermeture avant ouverture."
-                print(msg)
+                log.warning(msg)
                 send_telegram(msg)
                 # Tentative de fermeture propre
                 for attempt in range(MAX_RETRIES):
                     try:
-                        real_close_position()
+                        real_close_position(sym)
                         state.position_open = False
                         send_telegram("✅ Position précédente fermée automatiquement avant ouverture.")
                         break
@@ -44,11 +50,13 @@ def open_trade(direction, quantity=None, leverage=None):
                             send_telegram("❌ Impossible de fermer la position précédente. Ouverture annulée.")
                             return
 
+            latency.mark("interface.checks")
+
             # Tentative d'ouverture avec retry
             for attempt in range(MAX_RETRIES):
                 try:
                     # Passe quantity et leverage à real_open_trade
-                    real_open_trade(direction, quantity=quantity, leverage=leverage)
+                    real_open_trade(direction, quantity=quantity, leverage=leverage, sym=sym)
                     state.position_open = True
                     return
                 except Exception as open_e:
@@ -61,32 +69,33 @@ def open_trade(direction, quantity=None, leverage=None):
 
     except Exception as e:
         err_msg = f"❌ Erreur générale open_trade : {e}"
-        print(err_msg)
+        log.error(err_msg)
         send_telegram(err_msg)
 
-def close_position():
+def close_position(sym=symbol):
     """
     Ferme la position ouverte s'il y en a une.
     - Vérifie la cohérence local/Binance (point 1, 2, 6).
     - Retry sur erreur temporaire (point 3, 7, 8).
     - Notifie tout problème sur Telegram (point 5).
     """
+    state = states.get(sym)
     try:
-        sync_position()
-        with position_lock:
+        sync_position(sym)
+        with position_locks[sym]:
             local_open = state.position_open
-            real_open = check_position_open(symbol=symbol)
+            real_open = check_position_open(symbol=sym)
             if not local_open and not real_open:
                 msg = "⚠️ Aucune position ouverte à fermer (local ou Binance)."
-                print(msg)
+                log.warning(msg)
                 send_telegram(msg)
                 return
 
             for attempt in range(MAX_RETRIES):
                 try:
-                    real_close_position()
+                    real_close_position(sym)
                     state.position_open = False
-                    print("✅ Position fermée proprement")
+                    log.info("✅ Position fermée proprement")
                     return
                 except Exception as close_e:
                     send_telegram(f"❌ Erreur fermeture trade (tentative {attempt+1}): {close_e}")
@@ -97,5 +106,5 @@ def close_position():
                         return
     except Exception as e:
         err_msg = f"❌ Erreur générale close_position : {e}"
-        print(err_msg)
+        log.error(err_msg)
         send_telegram(err_msg)
\ No newline at end of file
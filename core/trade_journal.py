@@ -0,0 +1,430 @@
+"""
+Module : trade_journal.py
+But : Journal des trades en SQLite (mode WAL), à la place de logs/logs.csv
+      (relu et réécrit en entier à chaque changement de statut).
+      - Écritures : un thread unique ("trade-journal") regroupe ouvertures et
+        mises à jour en une transaction ; log_trade / update_trade_status ne
+        font que déposer l'opération et ne bloquent jamais.
+      - Mises à jour par trade_id (clé unique indexée) : O(log n), quelle que
+        soit la taille de l'historique.
+      - Lectures (Telegram, analyses) sur des connexions séparées : en WAL,
+        un lecteur ne bloque jamais l'écrivain.
+      - Import unique de l'ancien logs.csv (lignes de 7 ou 8 colonnes, avec
+        ou sans entête, encodage UTF-8 ou Windows-1252) au premier démarrage.
+
+CLI :
+    python -m core.trade_journal --import logs/logs.csv
+    python -m core.trade_journal --tail 20
+"""
+
+import os
+import csv
+import time
+import uuid
+import hashlib
+import queue
+import sqlite3
+import argparse
+import datetime
+import threading
+
+from core.config import symbol, LOG_DIR, TRADES_DB, trade_journal_batch_window
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+LEGACY_CSV = os.path.join(LOG_DIR, "logs.csv")
+BATCH_MAX = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    trade_id    TEXT NOT NULL UNIQUE,
+    opened_at   REAL NOT NULL,
+    symbol      TEXT NOT NULL,
+    direction   TEXT NOT NULL,
+    entry_price REAL,
+    stop_loss   REAL,
+    take_profit REAL,
+    quantity    REAL,
+    leverage    INTEGER,
+    mode        TEXT,
+    status      TEXT NOT NULL,
+    gain        REAL,
+    exit_price  REAL,
+    closed_at   REAL,
+    source      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_opened ON trades(symbol, opened_at);
+CREATE INDEX IF NOT EXISTS idx_trades_status_symbol ON trades(status, symbol);
+CREATE INDEX IF NOT EXISTS idx_trades_opened ON trades(opened_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = ("trade_id", "opened_at", "symbol", "direction", "entry_price", "stop_loss", "take_profit",
+           "quantity", "leverage", "mode", "status", "gain", "exit_price", "closed_at", "source")
+UPDATABLE = ("status", "gain", "exit_price", "closed_at", "stop_loss", "take_profit", "quantity", "leverage")
+
+STATUS_OPEN = "OUVERT"
+
+def new_trade_id():
+    return uuid.uuid4().hex[:12]
+
+def _connect(path, readonly=False):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA busy_timeout=10000")
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    else:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL : durable au checkpoint, sans fsync par transaction
+    return conn
+
+class TradeJournal:
+    def __init__(self, path=TRADES_DB, csv_path=LEGACY_CSV):
+        self.path = path
+        self.csv_path = csv_path          # Ancien journal importé une fois (None : pas d'import)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._ready = threading.Event()
+        self._readers = threading.local()
+        self.stats = {"inserted": 0, "updated": 0, "batches": 0, "errors": 0}
+
+    # === Écritures (déposées, exécutées par le thread d'écriture) ===
+    def record_open(self, sym, direction, entry_price, stop_loss=None, take_profit=None, mode=None,
+                    status=STATUS_OPEN, gain=None, quantity=None, leverage=None, source=None,
+                    trade_id=None, opened_at=None):
+        """
+        Enregistre un trade ; retourne son trade_id immédiatement (écriture différée).
+        """
+        row = {
+            "trade_id": trade_id or new_trade_id(),
+            "opened_at": time.time() if opened_at is None else opened_at,
+            "symbol": sym.upper(),
+            "direction": direction.upper(),
+            "entry_price": _num(entry_price),
+            "stop_loss": _num(stop_loss),
+            "take_profit": _num(take_profit),
+            "quantity": _num(quantity),
+            "leverage": leverage,
+            "mode": mode.upper() if mode else None,
+            "status": status,
+            "gain": _num(gain),
+            "exit_price": None,
+            "closed_at": None,
+            "source": source,
+        }
+        self._submit(("insert", row))
+        return row["trade_id"]
+
+    def update(self, trade_id, **fields):
+        """
+        Met à jour un trade par son identifiant (index unique).
+        """
+        self._submit(("update", trade_id, _clean_fields(fields)))
+
+    def update_open(self, sym, entry_price=None, direction=None, date_str=None, **fields):
+        """
+        Met à jour les trades encore OUVERT d'un symbole (index statut/symbole),
+        filtrés par prix d'entrée, direction et date (préfixe AAAA-MM-JJ...) si fournis.
+        Pour les appelants qui n'ont pas de trade_id (ancienne API).
+        """
+        self._submit(("update_open", sym.upper(), _num(entry_price), direction, date_str, _clean_fields(fields)))
+
+    def close(self, sym, trade_id=None, status="FERMÉ", exit_price=None, gain=None):
+        """
+        Clôture un trade : par trade_id, sinon le dernier trade OUVERT du symbole.
+        """
+        fields = {"status": status, "exit_price": exit_price, "gain": gain, "closed_at": time.time()}
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if trade_id:
+            self.update(trade_id, **fields)
+        else:
+            self._submit(("close_latest", sym.upper(), _clean_fields(fields)))
+
+    def _submit(self, op):
+        self._ensure_writer()
+        self._queue.put(op)
+
+    def flush(self, timeout=5):
+        """
+        Attend que les écritures déposées soient en base (lectures juste après une écriture).
+        """
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(("barrier", done))
+        return done.wait(timeout)
+
+    # === Thread d'écriture ===
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="trade-journal", daemon=True)
+                self._writer.start()
+
+    def _open_writer(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = _connect(self.path)
+        conn.executescript(SCHEMA)
+        conn.commit()
+        if self.csv_path and os.path.exists(self.csv_path):
+            self._import_once(conn, self.csv_path)
+        self._ready.set()
+        return conn
+
+    def _write_loop(self):
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + trade_journal_batch_window
+            while len(batch) < BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                if conn is None:
+                    conn = self._open_writer()
+                self._apply(conn, batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.exception(f"❌ Erreur journal des trades : {e}")
+                if conn is not None:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+            finally:
+                for op in batch:
+                    if op[0] == "barrier":
+                        op[1].set()
+
+    def _apply(self, conn, batch):
+        """
+        Un lot = une transaction : inserts groupés (executemany), puis mises à jour dans l'ordre.
+        """
+        inserts = []
+        with conn:
+            for op in batch:
+                kind = op[0]
+                if kind == "insert":
+                    inserts.append(tuple(op[1][c] for c in COLUMNS))
+                    continue
+                if inserts:
+                    self._insert_many(conn, inserts)
+                    inserts = []
+                if kind == "update" and op[2]:
+                    sets = ", ".join(f"{k} = ?" for k in op[2])
+                    cur = conn.execute(f"UPDATE trades SET {sets} WHERE trade_id = ?", (*op[2].values(), op[1]))
+                    self.stats["updated"] += cur.rowcount
+                elif kind == "update_open" and op[5]:
+                    _, sym, entry_price, direction, date_str, fields = op
+                    where, params = ["status = ?", "symbol = ?"], [STATUS_OPEN, sym]
+                    if entry_price is not None:
+                        where.append("abs(entry_price - ?) < 1e-6")
+                        params.append(round(entry_price, 4))
+                    if direction:
+                        where.append("direction = ?")
+                        params.append(direction.upper())
+                    if date_str:
+                        start, end = _date_prefix_range(date_str)
+                        where.append("opened_at >= ? AND opened_at < ?")
+                        params += [start, end]
+                    sets = ", ".join(f"{k} = ?" for k in fields)
+                    cur = conn.execute(f"UPDATE trades SET {sets} WHERE {' AND '.join(where)}", (*fields.values(), *params))
+                    self.stats["updated"] += cur.rowcount
+                elif kind == "close_latest" and op[2]:
+                    sets = ", ".join(f"{k} = ?" for k in op[2])
+                    cur = conn.execute(
+                        f"UPDATE trades SET {sets} WHERE id = (SELECT id FROM trades WHERE status = ? AND symbol = ? "
+                        f"ORDER BY opened_at DESC LIMIT 1)", (*op[2].values(), STATUS_OPEN, op[1]))
+                    self.stats["updated"] += cur.rowcount
+            if inserts:
+                self._insert_many(conn, inserts)
+        self.stats["batches"] += 1
+
+    def _insert_many(self, conn, rows):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        cur = conn.executemany(f"INSERT OR IGNORE INTO trades ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows)
+        self.stats["inserted"] += cur.rowcount
+        return cur.rowcount
+
+    # === Import de l'ancien CSV ===
+    def _import_once(self, conn, csv_path):
+        key = f"csv_import:{os.path.abspath(csv_path)}"
+        if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        rows = read_legacy_csv(csv_path)
+        with conn:
+            inserted = self._insert_many(conn, [tuple(r[c] for c in COLUMNS) for r in rows])
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, f"{inserted}/{len(rows)} lignes, {time.time():.0f}"))
+        log.info(f"📥 {inserted} trade(s) importé(s) depuis {csv_path} dans {self.path} ({len(rows) - inserted} déjà présent(s))")
+        return inserted
+
+    def import_csv(self, csv_path):
+        """
+        Import explicite (CLI) ; sans effet si ce fichier a déjà été importé.
+        """
+        self.flush()
+        conn = _connect(self.path)
+        try:
+            conn.executescript(SCHEMA)
+            return self._import_once(conn, csv_path)
+        finally:
+            conn.close()
+
+    # === Lectures (connexion par thread, lecture seule) ===
+    def open_reader(self):
+        """
+        Nouvelle connexion en lecture seule (base créée au besoin par le thread d'écriture).
+        """
+        if not os.path.exists(self.path):
+            self._ensure_writer()
+            self._queue.put(("barrier", threading.Event()))
+            self._ready.wait(5)
+        return _connect(self.path, readonly=True)
+
+    def _reader(self):
+        conn = getattr(self._readers, "conn", None)
+        if conn is None or getattr(self._readers, "path", None) != self.path:
+            conn = self.open_reader()
+            self._readers.conn, self._readers.path = conn, self.path
+        return conn
+
+    def get(self, trade_id):
+        row = self._reader().execute("SELECT * FROM trades WHERE trade_id = ?", (trade_id,)).fetchone()
+        return dict(row) if row else None
+
+    def trades(self, sym=None, status=None, since=None, until=None, limit=None, newest_first=False):
+        """
+        Trades filtrés (index symbole/date, statut/symbole, date) sous forme de dicts.
+        """
+        where, params = [], []
+        if sym:
+            where.append("symbol = ?")
+            params.append(sym.upper())
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if since is not None:
+            where.append("opened_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("opened_at < ?")
+            params.append(until)
+        sql = "SELECT * FROM trades"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY opened_at DESC" if newest_first else " ORDER BY opened_at"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(r) for r in self._reader().execute(sql, params)]
+
+    def open_trades(self, sym=None):
+        return self.trades(sym=sym, status=STATUS_OPEN)
+
+    def get_stats(self):
+        return {**self.stats, "pending": self._queue.qsize()}
+
+# === Conversions ===
+def _num(value):
+    try:
+        return None if value is None or value == "" else round(float(value), 8)
+    except (TypeError, ValueError):
+        return None
+
+def _clean_fields(fields):
+    unknown = set(fields) - set(UPDATABLE)
+    if unknown:
+        raise ValueError(f"Champ(s) non modifiable(s) : {', '.join(sorted(unknown))}")
+    return {k: (_num(v) if k in ("gain", "exit_price", "stop_loss", "take_profit", "quantity") else v)
+            for k, v in fields.items()}
+
+def _date_prefix_range(date_str):
+    """
+    Préfixe de date du CSV ("2025-07-16", "2025-07-16 13:20"...) -> intervalle [début, fin) en epoch local.
+    """
+    formats = (("%Y-%m-%d %H:%M:%S", 1), ("%Y-%m-%d %H:%M", 60), ("%Y-%m-%d %H", 3600), ("%Y-%m-%d", 86400))
+    for fmt, span in formats:
+        try:
+            start = time.mktime(datetime.datetime.strptime(date_str, fmt).timetuple())
+            return start, start + span
+        except ValueError:
+            continue
+    raise ValueError(f"Date invalide : {date_str}")
+
+def read_legacy_csv(csv_path, sym=symbol):
+    """
+    Lignes de l'ancien logs.csv : Date, Direction, Entry Price, Stop Loss,
+    Take Profit, Mode, Status[, Gain $]. Entête facultative, 7 ou 8 colonnes,
+    UTF-8 ou Windows-1252 (anciens « FERMÉ »). Symbole : paire principale.
+    """
+    with open(csv_path, "rb") as f:
+        raw = f.read()
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = raw.decode("cp1252", errors="replace")
+    rows = []
+    seen = {}
+    for line_no, row in enumerate(csv.reader(text.splitlines()), start=1):
+        if len(row) < 7 or row[0].strip().lower() == "date":
+            continue
+        try:
+            opened_at = time.mktime(datetime.datetime.strptime(row[0].strip(), "%Y-%m-%d %H:%M:%S").timetuple())
+        except ValueError:
+            log.warning(f"⚠️ logs.csv ligne {line_no} ignorée (date invalide) : {row}")
+            continue
+        # Empreinte du contenu (+ rang des doublons exacts) : stable d'un import à l'autre,
+        # distincte d'un fichier à l'autre ; une ligne déjà importée n'est pas ajoutée (INSERT OR IGNORE)
+        content = "\x1f".join(cell.strip() for cell in row)
+        seen[content] = seen.get(content, 0) + 1
+        digest = hashlib.sha1(f"{content}\x1e{seen[content]}".encode("utf-8")).hexdigest()[:16]
+        rows.append({
+            "trade_id": f"csv-{digest}",
+            "opened_at": opened_at,
+            "symbol": sym.upper(),
+            "direction": row[1].strip().upper(),
+            "entry_price": _num(row[2]),
+            "stop_loss": _num(row[3]),
+            "take_profit": _num(row[4]),
+            "quantity": None,
+            "leverage": None,
+            "mode": row[5].strip().upper() or None,
+            "status": row[6].strip() or STATUS_OPEN,
+            "gain": _num(row[7]) if len(row) > 7 else None,
+            "exit_price": None,
+            "closed_at": None,
+            "source": "csv",
+        })
+    return rows
+
+# ✅ Instance globale unique
+journal = TradeJournal()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Journal des trades (SQLite)")
+    parser.add_argument("--import", dest="import_path", help="Importer un ancien logs.csv")
+    parser.add_argument("--tail", type=int, default=0, help="Afficher les N derniers trades")
+    args = parser.parse_args(argv)
+    if args.import_path:
+        count = journal.import_csv(args.import_path)
+        print(f"{count} trade(s) importé(s)")
+    if args.tail:
+        for t in reversed(journal.trades(limit=args.tail, newest_first=True)):
+            opened = datetime.datetime.fromtimestamp(t["opened_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{opened} {t['symbol']} {t['direction']} @ {t['entry_price']} [{t['status']}] gain={t['gain']} ({t['trade_id']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Module : trade_stats.py
+But : Statistiques de l'historique des trades (taux de réussite, R moyen,
+      PnL par stratégie et par symbole, drawdown) pour la commande /stats.
+      - L'historique du journal SQLite (core.trade_journal) est gardé en
+        colonnes NumPy : les agrégats sont vectorisés (quelques ms même sur
+        des dizaines de milliers de trades).
+      - Rafraîchissement incrémental : seules les lignes nouvelles et les
+        trades encore ouverts (susceptibles d'être clôturés) sont relus.
+      - Résultats en cache par (période, symbole), invalidés dès qu'une
+        écriture est validée dans le journal (PRAGMA data_version : ouverture,
+        clôture) ou après trade_stats_cache_ttl (fenêtre glissante).
+
+Utilisation :
+    from core.trade_stats import trade_stats
+    stats = trade_stats.compute("7j")
+    texte = trade_stats.report("24h", sym="BTCUSDT")
+"""
+
+import re
+import time
+import threading
+
+import numpy as np
+
+from core.config import trade_stats_cache_ttl
+from core.trade_journal import journal, STATUS_OPEN
+
+# Colonnes chargées : (nom, dtype, valeur si NULL)
+COLUMNS = (
+    ("id", np.int64, 0),
+    ("opened_at", np.float64, np.nan),
+    ("closed_at", np.float64, np.nan),
+    ("entry_price", np.float64, np.nan),
+    ("stop_loss", np.float64, np.nan),
+    ("quantity", np.float64, np.nan),
+    ("gain", np.float64, np.nan),
+    ("exit_price", np.float64, np.nan),
+)
+_SELECT = ", ".join([name for name, _, _ in COLUMNS] + ["symbol", "source", "direction", "status"])
+_CHUNK = 500  # Paramètres par requête IN (...) pour relire les trades ouverts
+
+# === Périodes (/stats 24h, 7j, 4s, 3m, tout) ===
+_PERIOD = re.compile(r"^(\d+)\s*([hjdswm])$")
+_UNITS = {"h": 3600, "j": 86400, "d": 86400, "s": 7 * 86400, "w": 7 * 86400, "m": 30 * 86400}
+_ALL = ("", "tout", "all")
+
+def parse_period(text):
+    """
+    "24h", "7j", "4s", "3m" (mois de 30 jours), "tout" -> durée en secondes (None : tout l'historique).
+    """
+    text = (text or "").strip().lower()
+    if text in _ALL:
+        return None
+    match = _PERIOD.match(text)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Période invalide : {text} (ex : 24h, 7j, 4s, 3m, tout)")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+class _Codes:
+    """
+    Libellés (symbole, source) encodés en entiers pour np.bincount.
+    """
+    def __init__(self):
+        self.labels = []
+        self._index = {}
+
+    def code(self, label):
+        code = self._index.get(label)
+        if code is None:
+            code = self._index[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def get(self, label):
+        return self._index.get(label)
+
+class TradeStats:
+    def __init__(self, trade_journal=journal, cache_ttl=trade_stats_cache_ttl):
+        self.journal = trade_journal
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._path = None
+        self._reset()
+
+    def _reset(self):
+        self._cols = {name: np.empty(0, dtype) for name, dtype, _ in COLUMNS}
+        self._symbol = np.empty(0, np.int32)
+        self._source = np.empty(0, np.int32)
+        self._side = np.empty(0, np.int8)   # +1 achat, -1 vente
+        self._open = np.empty(0, bool)
+        self._pos = {}                      # id SQLite -> indice dans les colonnes
+        self._last_id = 0
+        self._data_version = None
+        self._cache = {}
+        self.symbols = _Codes()
+        self.sources = _Codes()
+
+    # === Chargement incrémental ===
+    def refresh(self):
+        """
+        Relit les trades ajoutés ou encore ouverts si le journal a changé.
+        Retourne True si des données ont été relues.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if self._conn is None or self._path != self.journal.path:
+            if self._conn is not None:
+                self._conn.close()
+            self._reset()
+            self._conn = self.journal.open_reader()
+            self._path = self.journal.path
+        # Change à chaque transaction validée par une autre connexion (thread d'écriture du journal)
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        self._cache.clear()
+        rows = self._conn.execute(f"SELECT {_SELECT} FROM trades WHERE id > ? ORDER BY id", (self._last_id,)).fetchall()
+        open_ids = self._cols["id"][self._open].tolist()
+        for i in range(0, len(open_ids), _CHUNK):
+            chunk = open_ids[i:i + _CHUNK]
+            rows += self._conn.execute(
+                f"SELECT {_SELECT} FROM trades WHERE id IN ({', '.join('?' for _ in chunk)})", chunk).fetchall()
+        new = [r for r in rows if r["id"] not in self._pos]
+        for r in rows:
+            if r["id"] in self._pos:
+                self._set(self._pos[r["id"]], r)
+        if new:
+            self._append(new)
+        return True
+
+    def _append(self, rows):
+        start = len(self._cols["id"])
+        for name, dtype, missing in COLUMNS:
+            values = np.array([missing if r[name] is None else r[name] for r in rows], dtype=dtype)
+            self._cols[name] = np.concatenate((self._cols[name], values))
+        self._symbol = np.concatenate((self._symbol, np.array([self.symbols.code(r["symbol"]) for r in rows], np.int32)))
+        self._source = np.concatenate((self._source, np.array([self.sources.code(r["source"] or "inconnue") for r in rows], np.int32)))
+        self._side = np.concatenate((self._side, np.array([_side(r["direction"]) for r in rows], np.int8)))
+        self._open = np.concatenate((self._open, np.array([r["status"] == STATUS_OPEN for r in rows], bool)))
+        for offset, r in enumerate(rows):
+            self._pos[r["id"]] = start + offset
+        self._last_id = max(self._last_id, int(self._cols["id"][-1]))
+
+    def _set(self, i, r):
+        for name, _, missing in COLUMNS:
+            self._cols[name][i] = missing if r[name] is None else r[name]
+        self._open[i] = r["status"] == STATUS_OPEN
+
+    # === Agrégats ===
+    def compute(self, period=None, sym=None):
+        """
+        Statistiques des trades clôturés sur la période (date de clôture, à
+        défaut d'ouverture), éventuellement pour un seul symbole. Résultat en cache.
+        """
+        seconds = parse_period(period)
+        sym = sym.upper() if sym else None
+        key = (seconds, sym)
+        with self._lock:
+            self._refresh()
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+                return cached[1]
+            result = self._compute(seconds, sym)
+            result["period"] = (period or "tout").strip().lower() or "tout"
+            self._cache[key] = (time.monotonic(), result)
+            return result
+
+    def _compute(self, seconds, sym):
+        started = time.perf_counter()
+        c = self._cols
+        in_scope = np.ones(len(c["id"]), bool)
+        if sym:
+            code = self.symbols.get(sym)
+            in_scope &= self._symbol == (-1 if code is None else code)
+        ts = np.where(np.isnan(c["closed_at"]), c["opened_at"], c["closed_at"])
+        closed = in_scope & ~self._open
+        if seconds is not None:
+            closed &= ts >= time.time() - seconds
+
+        gain = c["gain"]
+        with_gain = closed & ~np.isnan(gain)
+        g = gain[with_gain]
+        r = _r_multiples(c, self._side)
+        with_r = closed & ~np.isnan(r)
+
+        # Courbe de PnL cumulée dans l'ordre des clôtures -> drawdown max depuis un sommet
+        order = np.argsort(ts[with_gain], kind="stable")
+        curve = np.cumsum(g[order])
+        peaks = np.maximum.accumulate(np.concatenate(([0.0], curve)))[1:]
+        losses = -g[g < 0].sum()
+
+        result = {
+            "symbol": sym,
+            "closed": int(closed.sum()),
+            "open": int((in_scope & self._open).sum()),
+            "with_gain": int(g.size),
+            "win_rate": _ratio((g > 0).sum(), g.size),
+            "pnl": round(float(g.sum()), 4),
+            "avg_gain": round(float(g.mean()), 4) if g.size else None,
+            "best": round(float(g.max()), 4) if g.size else None,
+            "worst": round(float(g.min()), 4) if g.size else None,
+            "profit_factor": round(float(g[g > 0].sum() / losses), 3) if losses > 0 else None,
+            "avg_r": round(float(r[with_r].mean()), 3) if with_r.any() else None,
+            "max_drawdown": round(float((peaks - curve).max()), 4) if curve.size else 0.0,
+            "by_source": _breakdown(self.sources.labels, self._source, with_gain, with_r, gain, r),
+            "by_symbol": _breakdown(self.symbols.labels, self._symbol, with_gain, with_r, gain, r),
+        }
+        result["compute_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    # === Rapport Telegram ===
+    def report(self, period=None, sym=None):
+        s = self.compute(period, sym)
+        title = f"📊 Statistiques {s['symbol'] or 'tous symboles'} — période : {s['period']}"
+        if not s["closed"]:
+            return f"{title}\nAucun trade clôturé sur la période. Positions ouvertes : {s['open']}"
+        lines = [
+            title,
+            f"Trades clôturés : {s['closed']} (gain connu : {s['with_gain']}) | ouverts : {s['open']}",
+            f"✅ Taux de réussite : {_pct(s['win_rate'])}",
+            f"💰 PnL : {s['pnl']:.2f} USDT | moyen : {_usdt(s['avg_gain'])}",
+            f"🔝 Meilleur : {_usdt(s['best'])} | 🔻 Pire : {_usdt(s['worst'])}",
+            f"⚖️ Profit factor : {s['profit_factor'] if s['profit_factor'] is not None else 'n/a'}"
+            f" | R moyen : {_r(s['avg_r'])}",
+            f"📉 Drawdown max : {s['max_drawdown']:.2f} USDT",
+        ]
+        sections = [("Par stratégie", s["by_source"])]
+        if not s["symbol"] and len(s["by_symbol"]) > 1:
+            sections.append(("Par symbole", s["by_symbol"]))
+        for label, rows in sections:
+            if rows:
+                lines.append(f"\n{label} :")
+                for name, b in rows.items():
+                    lines.append(f"• {name} : {b['trades']} trade(s), réussite {_pct(b['win_rate'])}, "
+                                 f"PnL {b['pnl']:.2f} USDT, R moyen {_r(b['avg_r'])}")
+        return "\n".join(lines)
+
+    def get_stats(self):
+        with self._lock:
+            return {"rows": len(self._cols["id"]), "open": int(self._open.sum()), "cached": len(self._cache)}
+
+# === Calculs vectorisés ===
+def _side(direction):
+    return 1 if (direction or "").upper() in ("BULLISH", "LONG", "BUY") else -1
+
+def _r_multiples(c, side):
+    """
+    R = gain / risque initial (|entrée - SL| × quantité). Sans quantité :
+    écart de sortie rapporté à la distance du SL (prix).
+    """
+    risk_price = np.abs(c["entry_price"] - c["stop_loss"])
+    risk_price = np.where(risk_price > 0, risk_price, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        by_gain = c["gain"] / (risk_price * c["quantity"])
+        by_price = side * (c["exit_price"] - c["entry_price"]) / risk_price
+    return np.where(np.isnan(by_gain), by_price, by_gain)
+
+def _breakdown(labels, codes, with_gain, with_r, gain, r):
+    """
+    Agrégats par libellé en un passage (np.bincount) : trades, réussite, PnL, R moyen.
+    """
+    if not labels:
+        return {}
+    n = len(labels)
+    trades = np.bincount(codes[with_gain], minlength=n)
+    wins = np.bincount(codes[with_gain], weights=gain[with_gain] > 0, minlength=n)
+    pnl = np.bincount(codes[with_gain], weights=gain[with_gain], minlength=n)
+    r_count = np.bincount(codes[with_r], minlength=n)
+    r_sum = np.bincount(codes[with_r], weights=r[with_r], minlength=n)
+    out = {}
+    for i in np.argsort(-pnl, kind="stable"):
+        if trades[i] or r_count[i]:
+            out[labels[i]] = {
+                "trades": int(trades[i]),
+                "win_rate": _ratio(wins[i], trades[i]),
+                "pnl": round(float(pnl[i]), 4),
+                "avg_r": round(float(r_sum[i] / r_count[i]), 3) if r_count[i] else None,
+            }
+    return out
+
+def _ratio(part, total):
+    return round(float(part) / float(total), 4) if total else None
+
+def _pct(value):
+    return f"{value * 100:.1f} %" if value is not None else "n/a"
+
+def _usdt(value):
+    return f"{value:.2f} USDT" if value is not None else "n/a"
+
+def _r(value):
+    return f"{value:+.2f}R" if value is not None else "n/a"
+
+# ✅ Instance globale unique
+trade_stats = TradeStats()
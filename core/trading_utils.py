@@ -1,184 +1,116 @@
 import os
-import csv
 import time
-import datetime
 import traceback
-import threading
 
 from core.notifier import send_telegram
 from core.binance_client import client
 from core.utils import safe_round
+from core.symbol_info import get_filters
 from core.config import (
     symbol,
     stop_loss_pct,
     take_profit_pct,
     BASE_DIR,
     LOG_DIR,
-    MODE_FILE,
-    LEVERAGE_FILE,
-    QUANTITY_FILE
 )
+from core.settings import settings
+from core.trade_journal import journal
+from core import latency
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 log_dir = LOG_DIR  # <-- centralisé
-log_file = os.path.join(log_dir, "logs.csv")
-mode_file = MODE_FILE
-leverage_file = LEVERAGE_FILE
-quantity_file = QUANTITY_FILE
 
 # === Création du dossier logs s'il n'existe pas ===
 if not os.path.exists(log_dir):
     os.makedirs(log_dir, exist_ok=True)
 
-# === Verrous globaux pour accès thread-safe aux fichiers ===
-log_lock = threading.Lock()
-config_lock = threading.Lock()  # protège lecture/écriture fichiers config (mode, levier, quantité)
+# === Paramètres dynamiques (core.settings : en mémoire, sans lecture de fichier) ===
+def set_mode(mode: str) -> str:
+    """
+    Change le mode (commande "mode") : effet immédiat, persisté par core.settings.
+    """
+    return settings.update(source="commande", mode=mode).mode
 
 def get_mode() -> str:
     """
-    Lit le mode de fonctionnement (auto/alert) depuis mode.txt.
-    En cas d'erreur ou fichier absent, crée en mode 'auto' et notifie Telegram.
+    Mode de fonctionnement courant (auto/alert).
     """
-    try:
-        with config_lock:
-            if not os.path.exists(mode_file):
-                with open(mode_file, "w") as f:
-                    f.write("auto")
-                # Import local pour éviter l'import circulaire
-                from core.telegram_controller import send_telegram
-                send_telegram("⚠️ mode.txt créé automatiquement en mode AUTO")
-                return "auto"
-
-            with open(mode_file, "r") as file:
-                mode = file.read().strip().lower()
-                if mode not in ["auto", "alert"]:
-                    from core.telegram_controller import send_telegram
-                    send_telegram("⚠️ mode.txt corrompu, passage en mode AUTO")
-                    return "auto"
-                return mode
+    return settings.get().mode
 
-    except Exception as e:
-        err = traceback.format_exc()
-        from core.telegram_controller import send_telegram
-        send_telegram(f"⚠️ Erreur get_mode() : {e}\n{err}")
-        return "auto"
-
-
-def get_leverage_from_file(filepath=leverage_file, default_leverage=10) -> int:
+def get_leverage_from_file() -> int:
     """
-    Lit le levier dans leverage.txt.
-    Valide que c'est un entier entre 1 et 125.
-    Envoie un warning si levier > 50 (risque).
+    Levier courant (nom conservé pour les appelants existants).
     """
-    try:
-        with config_lock:
-            with open(filepath, "r") as f:
-                content = f.read().strip()
-                if not content:
-                    raise ValueError("Fichier levier vide")
-                lev = int(content)
-                if lev < 1 or lev > 125:
-                    raise ValueError("Levier hors limites (1-125)")
-                if lev > 50:
-                    send_telegram(f"⚠️ Attention : levier élevé détecté ({lev})")
-                return lev
-    except Exception as e:
-        err = traceback.format_exc()
-        send_telegram(f"⚠️ Erreur lecture levier : {e}\n{err}")
-        print(f"⚠️ Erreur lecture levier : {e} → Levier par défaut : {default_leverage}")
-        return default_leverage
+    return settings.get().leverage
 
-def get_quantity_from_file(filepath=quantity_file, default_quantity=1.0) -> float:
+def get_quantity_from_file() -> float:
     """
-    Lit la quantité dans quantity.txt.
-    Valide que c'est un float > 0.1 (minimum Binance).
+    Quantité USDT courante (nom conservé pour les appelants existants).
     """
-    try:
-        with config_lock:
-            with open(filepath, "r") as f:
-                content = f.read().strip()
-                if not content:
-                    raise ValueError("Fichier quantité vide")
-                qty = float(content)
-                if qty < 0.1:
-                    send_telegram(f"⚠️ Quantité trop faible détectée ({qty}), minimum 0.1")
-                if qty <= 0:
-                    raise ValueError("Quantité invalide (<=0)")
-                return qty
-    except Exception as e:
-        err = traceback.format_exc()
-        send_telegram(f"⚠️ Erreur lecture quantité : {e}\n{err}")
-        print(f"⚠️ Erreur lecture quantité : {e} → Quantité par défaut : {default_quantity}")
-        return default_quantity
+    return settings.get().quantity_usdt
 
-def calculate_quantity(entry_price: float, quantity_usdt: float, leverage: int) -> float:
+def _warn_risky_settings(old, new, changed):
+    # Avertissements autrefois émis à chaque lecture des fichiers, désormais à la modification
+    if "leverage" in changed and new.leverage > 50:
+        send_telegram(f"⚠️ Attention : levier élevé détecté ({new.leverage})")
+    if "quantity_usdt" in changed and new.quantity_usdt < 0.1:
+        send_telegram(f"⚠️ Quantité trop faible détectée ({new.quantity_usdt}), minimum 0.1")
+
+settings.subscribe(_warn_risky_settings)
+
+def calculate_quantity(entry_price: float, quantity_usdt: float, leverage: int, sym: str = symbol) -> float:
     """
-    Calcule la quantité ALGO à trader en fonction du prix d'entrée, quantité USDT et levier.
-    Arrondi à 1 décimale (conforme Binance).
+    Calcule la quantité à trader en fonction du prix d'entrée, quantité USDT et levier.
+    Arrondi au stepSize du symbole (filtres exchange info en cache).
     Lève une erreur si quantité trop faible.
     """
-    qty = (quantity_usdt * leverage) / entry_price
-    qty = safe_round(qty, 1)
-    if qty < 0.1:
-        raise ValueError("❌ Quantité trop petite pour Binance Futures (min 0.1 ALGO)")
+    filters = get_filters(sym)
+    qty = filters.round_qty((quantity_usdt * leverage) / entry_price)
+    if qty < float(filters.min_qty):
+        raise ValueError(f"❌ Quantité trop petite pour Binance Futures (min {filters.min_qty} {sym})")
     return qty
 
-def log_trade(direction: str, entry_price: float, sl: float, tp: float, mode: str, status="OUVERT", gain: float = None):
+def log_trade(direction: str, entry_price: float, sl: float, tp: float, mode: str, status="OUVERT", gain: float = None,
+              sym: str = symbol, quantity: float = None, leverage: int = None, trade_id: str = None,
+              source: str = None) -> str:
     """
-    Journalise un trade dans logs.csv de façon thread-safe.
-    Crée le fichier et les entêtes s'il n'existe pas.
+    Journalise un trade (core.trade_journal, SQLite) sans attendre l'écriture.
+    Retourne l'identifiant du trade (trace de latence en cours si elle existe).
+    Source : stratégie de la trace en cours (ema_timer_5m, ema_3m_loop, manual) par défaut.
     """
     try:
-        with log_lock:
-            if not os.path.exists(log_file):
-                with open(log_file, mode="w", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["Date", "Direction", "Entry Price", "Stop Loss", "Take Profit", "Mode", "Status", "Gain $"])
-
-            with open(log_file, mode="a", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    direction.upper(),
-                    safe_round(entry_price, 4),
-                    safe_round(sl, 4),
-                    safe_round(tp, 4),
-                    mode.upper(),
-                    status,
-                    safe_round(gain, 4) if gain is not None else ""
-                ])
+        tr = latency.current()
+        if source is None:
+            source = tr.attrs.get("source", "bot") if tr is not None else "bot"
+        return journal.record_open(
+            sym, direction, safe_round(entry_price, 4), safe_round(sl, 4), safe_round(tp, 4), mode,
+            status=status, gain=safe_round(gain, 4) if gain is not None else None,
+            quantity=quantity, leverage=leverage, source=source,
+            trade_id=trade_id or (tr.trace_id if tr is not None else None),
+        )
     except Exception as e:
         err = traceback.format_exc()
         send_telegram(f"❌ Erreur lors de la journalisation : {e}\n{err}")
-        print("❌ Erreur lors de la journalisation :", e)
+        log.error("❌ Erreur lors de la journalisation : %s", e)
+        return None
 
-def update_trade_status(entry_price: float, new_status: str, direction: str = None, date_str: str = None):
+def update_trade_status(entry_price: float, new_status: str, direction: str = None, date_str: str = None,
+                        sym: str = symbol, trade_id: str = None):
     """
-    Met à jour le statut d'un trade dans logs.csv.
-    Recherche par prix d'entrée + direction + date (si fournie) pour éviter confusions.
+    Met à jour le statut d'un trade : par trade_id (index unique) si connu,
+    sinon parmi les trades OUVERT du symbole par prix d'entrée + direction + date.
     """
     try:
-        with log_lock:
-            lines = []
-            with open(log_file, "r", newline="") as file:
-                reader = csv.reader(file)
-                headers = next(reader)
-                for row in reader:
-                    # Comparaison sécurisée des critères pour identifier le bon trade
-                    price_match = abs(float(row[2]) - safe_round(entry_price, 4)) < 1e-6
-                    direction_match = (direction is None or row[1].upper() == direction.upper())
-                    date_match = (date_str is None or row[0].startswith(date_str))
-                    if price_match and direction_match and row[6] == "OUVERT" and date_match:
-                        row[6] = new_status
-                    lines.append(row)
-
-            with open(log_file, "w", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow(headers)
-                writer.writerows(lines)
+        if trade_id:
+            journal.update(trade_id, status=new_status)
+        else:
+            journal.update_open(sym, entry_price, direction, date_str, status=new_status)
     except Exception as e:
         err = traceback.format_exc()
         send_telegram(f"❌ Erreur update_trade_status : {e}\n{err}")
-        print("❌ Erreur update_trade_status :", e)
+        log.error("❌ Erreur update_trade_status : %s", e)
 
 def check_position_open() -> bool:
     """
@@ -193,7 +125,7 @@ def check_position_open() -> bool:
     except Exception as e:
         err = traceback.format_exc()
         send_telegram(f"❌ Erreur check_position_open : {e}\n{err}")
-        print("❌ Erreur check_position_open :", e)
+        log.error("❌ Erreur check_position_open : %s", e)
         return False
 
 def retry_order(order_function, max_attempts=5, initial_delay=0.2):
@@ -208,11 +140,11 @@ def retry_order(order_function, max_attempts=5, initial_delay=0.2):
             return order_function()
         except Exception as e:
             msg = f"⚠️ Tentative {attempt+1}/{max_attempts} échouée : {e}"
-            print(msg)
+            log.warning(msg)
             send_telegram(msg)
             try:
                 time.sleep(delay)
             except Exception as sleep_e:
-                print(f"⚠️ Erreur pendant sleep : {sleep_e}")
+                log.warning(f"⚠️ Erreur pendant sleep : {sleep_e}")
             delay *= 2  # Double le délai à chaque tentative
     raise Exception("❌ Toutes les tentatives d’ordre ont échoué.")
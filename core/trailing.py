@@ -1,171 +1,200 @@
 import time
+import asyncio
 import threading
-import traceback
+from collections import defaultdict
 from binance.enums import SIDE_BUY, SIDE_SELL
 from core.binance_client import client, check_position_open
+from core import mark_price_stream, user_stream, latency, trailing_ladder, runtime, symbol_info
 from core.telegram_controller import send_telegram
 from core.trading_utils import update_trade_status
-from core.config import symbol, take_profit_pct  # <-- Import centralisé
-from core.state import state  # <-- Import de l'état global si besoin
+from core.config import symbol, take_profit_pct, mark_price_rest_interval, trailing_position_check_interval  # <-- Import centralisé
+from core.state import state, states  # <-- État par symbole
+from core.log import get_logger
 
-order_lock = threading.Lock()
+log = get_logger(__name__)
 
-# === Calcul du SL dynamique selon le gain atteint ===
+# Un verrou d'ordres par symbole : les trailings de paires différentes ne se bloquent pas
+order_locks = defaultdict(threading.Lock)
+
+# === Calcul du SL dynamique selon le gain atteint (paliers : core.config.trailing_sl_rules) ===
 def get_trailing_sl(entry_price, current_price, direction):
-    gain_pct = (current_price - entry_price) / entry_price if direction == "bullish" else (entry_price - current_price) / entry_price
-    sl_level = None
-    levels = [
-        (0.005, 0.002),
-        (0.006, 0.003),
-        (0.010, 0.005),
-        (0.012, 0.006),
-        (0.015, 0.010),
-    ]
-    for threshold, sl in levels:
-        if gain_pct >= threshold:
-            sl_level = sl
-    if gain_pct >= 0.015:
-        extra_gain = gain_pct - 0.015
-        steps = int(extra_gain / 0.005)
-        sl_level = 0.010 + steps * 0.005
-
-    if sl_level:
-        if direction == "bullish":
-            new_sl = round(entry_price * (1 + sl_level), 4)
-        else:
-            new_sl = round(entry_price * (1 - sl_level), 4)
-
-        # ✅ Distance minimale : au moins 0.1% entre prix actuel et SL
-        min_distance = entry_price * 0.001
-        if abs(current_price - new_sl) < min_distance:
-            return None
-        return new_sl
-    return None
-
-# === Calcul du TP dynamique selon le gain ===
+    return trailing_ladder.trailing_sl(entry_price, current_price, direction)
+
+# === Calcul du TP dynamique selon le gain (paliers : core.config.trailing_tp_rules) ===
 def get_trailing_tp(entry_price, current_price, direction, current_tp_pct):
-    gain_pct = (current_price - entry_price) / entry_price if direction == "bullish" else (entry_price - current_price) / entry_price
-    tp_levels = [
-        (0.012, 0.02),
-        (0.018, 0.025),
-    ]
-    new_tp_pct = take_profit_pct
-    for threshold, new_tp in tp_levels:
-        if gain_pct >= threshold:
-            new_tp_pct = new_tp
-    if gain_pct > 0.018:
-        extra_gain = gain_pct - 0.018
-        steps = int(extra_gain / 0.005)
-        new_tp_pct = 0.025 + steps * 0.005
-    if new_tp_pct > current_tp_pct:
-        return new_tp_pct
-    return None
+    return trailing_ladder.trailing_tp(entry_price, current_price, direction, current_tp_pct)
 
 # === Suivi dynamique du SL et TP ===
-def update_trailing_sl_and_tp(direction, entry_price):
-    t = threading.current_thread()
-    current_sl = None
-    current_tp_pct = take_profit_pct
-    max_gain_pct_notified = 0
-    trailing_sl_order_id = None
-    trailing_tp_order_id = None
-
-    try:
-        while getattr(t, "do_run", True):
-            try:
-                current_price = float(client.futures_mark_price(symbol=symbol)["markPrice"])
-            except Exception as e:
-                send_telegram(f"❌ Erreur récupération prix : {e}")
-                traceback.print_exc()
-                time.sleep(15)
-                continue
-
-            gain_pct = (current_price - entry_price) / entry_price * 100 if direction == "bullish" else (entry_price - current_price) / entry_price * 100
-
-            # ⛔ Vérifie si position toujours ouverte (local ET Binance si besoin)
-            if not check_position_open(symbol=symbol) or not state.position_open:
-                send_telegram(" 💎 Fin du suivi dynamique SL/TP. 🙌")
-                break
-
-            # 📢 Notifie à chaque +1%
-            next_threshold = max_gain_pct_notified + 1
-            if gain_pct >= next_threshold:
-                max_gain_pct_notified = next_threshold
-                send_telegram(f"📊 Gain +{next_threshold:.0f}% atteint ({direction.upper()} - {current_price}$ 🤗)")
-
-            # 🛡 Mise à jour SL (n'annule que son propre ordre)
-            new_sl = get_trailing_sl(entry_price, current_price, direction)
-            if new_sl and (current_sl is None or
-                (direction == "bullish" and new_sl > current_sl) or
-                (direction == "bearish" and new_sl < current_sl)):
-
-                with order_lock:
-                    try:
-                        # Annule uniquement l'ordre SL posé par le trailing (si existe)
-                        if trailing_sl_order_id:
+TICK_OK, TICK_RETRY, TICK_DONE = range(3)
+
+class TrailingSession:
+    """
+    Suivi dynamique SL/TP d'une position : un appel à tick() par prix mark.
+    Boucles : trail_position (coroutine du runtime) et update_trailing_sl_and_tp (thread).
+    """
+
+    def __init__(self, direction, entry_price, sym=symbol):
+        self.direction = direction
+        self.entry_price = entry_price
+        self.sym = sym
+        self.st = states.get(sym)
+        self.current_sl = None
+        self.current_tp_pct = take_profit_pct
+        self.max_gain_pct_notified = 0
+        self.trailing_sl_order_id = None
+        self.trailing_tp_order_id = None
+        self.last_position_check = time.time()
+
+    def tick(self):
+        """
+        Un pas de trailing (bloquant : REST). TICK_RETRY : prix indisponible,
+        réessayer dans 15s ; TICK_DONE : position fermée, fin du suivi.
+        """
+        try:
+            # Prix mark poussé par le flux @markPrice@1s (repli REST si figé)
+            current_price = mark_price_stream.get_mark_price(self.sym)
+            tick_started = time.perf_counter()  # Latence prix mark -> ordre trailing en place
+        except Exception as e:
+            send_telegram(f"❌ Erreur récupération prix : {e}")
+            log.exception(f"❌ Erreur récupération prix : {e}")
+            return TICK_RETRY
+
+        gain_pct = (current_price - self.entry_price) / self.entry_price * 100 if self.direction == "bullish" else (self.entry_price - current_price) / self.entry_price * 100
+
+        # ⛔ Vérifie si position toujours ouverte : état local à chaque tick, Binance périodiquement
+        position_closed = not self.st.position_open
+        if (not position_closed and not user_stream.is_live()
+                and time.time() - self.last_position_check >= trailing_position_check_interval):
+            self.last_position_check = time.time()
+            position_closed = not check_position_open(symbol=self.sym)
+        if position_closed:
+            send_telegram(f" 💎 Fin du suivi dynamique SL/TP ({self.sym}). 🙌")
+            return TICK_DONE
+
+        # 📢 Notifie à chaque +1%
+        next_threshold = self.max_gain_pct_notified + 1
+        if gain_pct >= next_threshold:
+            self.max_gain_pct_notified = next_threshold
+            send_telegram(f"📊 Gain +{next_threshold:.0f}% atteint ({self.sym} {self.direction.upper()} - {current_price}$ 🤗)")
+
+        # 🛡 Mise à jour SL (n'annule que son propre ordre)
+        new_sl = get_trailing_sl(self.entry_price, current_price, self.direction)
+        if new_sl:
+            new_sl = symbol_info.round_price(self.sym, new_sl)  # Pas de cotation du symbole (-1111 sinon)
+        if new_sl and (self.current_sl is None or
+            (self.direction == "bullish" and new_sl > self.current_sl) or
+            (self.direction == "bearish" and new_sl < self.current_sl)):
+
+            with order_locks[self.sym]:
+                try:
+                    # Annule uniquement l'ordre SL posé par le trailing (si existe)
+                    if self.trailing_sl_order_id:
+                        try:
+                            user_stream.record_order(client.futures_cancel_order(symbol=self.sym, orderId=self.trailing_sl_order_id))
+                        except Exception as e:
+                            if "code=-2011" in str(e):
+                                log.info(f"Ordre SL trailing déjà annulé ou exécuté (id: {self.trailing_sl_order_id})")
+                            else:
+                                raise
+                    sl_order = client.futures_create_order(
+                        symbol=self.sym,
+                        side="SELL" if self.direction == "bullish" else "BUY",
+                        type="STOP_MARKET",
+                        stopPrice=new_sl,
+                        closePosition=True,
+                        timeInForce="GTC"
+                    )
+                    user_stream.record_order(sl_order)
+                    latency.observe("trailing.sl_replace", time.perf_counter() - tick_started)
+                    self.trailing_sl_order_id = sl_order["orderId"]
+                    self.current_sl = new_sl
+                    log.info(f"🔵 SL trailing mis à jour à {new_sl}$ (orderId: {self.trailing_sl_order_id})")
+                    send_telegram(f"🔵 Stop Loss dynamique {self.sym} mis à jour à {new_sl}$🎉...🥳")
+                except Exception as e:
+                    send_telegram(f"❌ Erreur création SL dynamique : {e}")
+                    log.exception(f"❌ Erreur création SL dynamique : {e}")
+
+        # 🎯 Mise à jour TP (n'annule que son propre ordre)
+        new_tp_pct = get_trailing_tp(self.entry_price, current_price, self.direction, self.current_tp_pct)
+        if new_tp_pct:
+            new_tp_price = self.entry_price * (1 + new_tp_pct) if self.direction == "bullish" else self.entry_price * (1 - new_tp_pct)
+            new_tp_price = symbol_info.round_price(self.sym, new_tp_price)
+
+            with order_locks[self.sym]:
+                try:
+                    # Annule TOUS les TP existants (pour éviter qu'un TP plus bas soit exécuté avant)
+                    orders = user_stream.get_open_orders(self.sym)
+                    for o in orders:
+                        if o["type"] == "TAKE_PROFIT_MARKET" and o.get("closePosition", False):
                             try:
-                                client.futures_cancel_order(symbol=symbol, orderId=trailing_sl_order_id)
+                                user_stream.record_order(client.futures_cancel_order(symbol=self.sym, orderId=o["orderId"]))
                             except Exception as e:
                                 if "code=-2011" in str(e):
-                                    print(f"Ordre SL trailing déjà annulé ou exécuté (id: {trailing_sl_order_id})")
+                                    log.info(f"Ordre TP déjà annulé ou exécuté (id: {o['orderId']})")
                                 else:
                                     raise
-                        sl_order = client.futures_create_order(
-                            symbol=symbol,
-                            side="SELL" if direction == "bullish" else "BUY",
-                            type="STOP_MARKET",
-                            stopPrice=new_sl,
-                            closePosition=True,
-                            timeInForce="GTC"
-                        )
-                        trailing_sl_order_id = sl_order["orderId"]
-                        current_sl = new_sl
-                        print(f"🔵 SL trailing mis à jour à {new_sl}$ (orderId: {trailing_sl_order_id})")
-                        send_telegram(f"🔵 Stop Loss dynamique mis à jour à {new_sl}$🎉...🥳")
-                    except Exception as e:
-                        send_telegram(f"❌ Erreur création SL dynamique : {e}")
-                        traceback.print_exc()
-
-            # 🎯 Mise à jour TP (n'annule que son propre ordre)
-            new_tp_pct = get_trailing_tp(entry_price, current_price, direction, current_tp_pct)
-            if new_tp_pct:
-                new_tp_price = round(entry_price * (1 + new_tp_pct), 4) if direction == "bullish" else round(entry_price * (1 - new_tp_pct), 4)
-
-                with order_lock:
-                    try:
-                        # Annule TOUS les TP existants (pour éviter qu'un TP plus bas soit exécuté avant)
-                        orders = client.futures_get_open_orders(symbol=symbol)
-                        for o in orders:
-                            if o["type"] == "TAKE_PROFIT_MARKET" and o.get("closePosition", False):
-                                try:
-                                    client.futures_cancel_order(symbol=symbol, orderId=o["orderId"])
-                                except Exception as e:
-                                    if "code=-2011" in str(e):
-                                        print(f"Ordre TP déjà annulé ou exécuté (id: {o['orderId']})")
-                                    else:
-                                        raise
-
-                        tp_order = client.futures_create_order(
-                            symbol=symbol,
-                            side="SELL" if direction == "bullish" else "BUY",
-                            type="TAKE_PROFIT_MARKET",
-                            stopPrice=new_tp_price,
-                            closePosition=True,
-                            timeInForce="GTC"
-                        )
-                        trailing_tp_order_id = tp_order["orderId"]
-                        current_tp_pct = new_tp_pct
-                        print(f"🎯 TP trailing mis à jour à {new_tp_price}$ (orderId: {trailing_tp_order_id})")
-                        send_telegram(f"🎯 Take Profit dynamique mis à jour à {new_tp_price}$ 🥂💰")
-                    except Exception as e:
-                        send_telegram(f"❌ Erreur création TP dynamique : {e}")
-                        traceback.print_exc()
-
-            time.sleep(15)
 
+                    tp_order = client.futures_create_order(
+                        symbol=self.sym,
+                        side="SELL" if self.direction == "bullish" else "BUY",
+                        type="TAKE_PROFIT_MARKET",
+                        stopPrice=new_tp_price,
+                        closePosition=True,
+                        timeInForce="GTC"
+                    )
+                    user_stream.record_order(tp_order)
+                    latency.observe("trailing.tp_replace", time.perf_counter() - tick_started)
+                    self.trailing_tp_order_id = tp_order["orderId"]
+                    self.current_tp_pct = new_tp_pct
+                    log.info(f"🎯 TP trailing mis à jour à {new_tp_price}$ (orderId: {self.trailing_tp_order_id})")
+                    send_telegram(f"🎯 Take Profit dynamique {self.sym} mis à jour à {new_tp_price}$ 🥂💰")
+                except Exception as e:
+                    send_telegram(f"❌ Erreur création TP dynamique : {e}")
+                    log.exception(f"❌ Erreur création TP dynamique : {e}")
+
+        return TICK_OK
+
+def update_trailing_sl_and_tp(direction, entry_price, sym=symbol):
+    """
+    Version thread (API synchrone) : arrêt via t.do_run = False.
+    """
+    t = threading.current_thread()
+    session = TrailingSession(direction, entry_price, sym)
+    try:
+        while getattr(t, "do_run", True):
+            result = session.tick()
+            if result == TICK_DONE:
+                break
+            if result == TICK_RETRY:
+                time.sleep(15)
+                continue
+            # Réveil au prochain prix mark (~1s), ou au prochain repli REST si le flux est coupé
+            mark_price_stream.wait_for_update(sym, timeout=mark_price_rest_interval)
+    except Exception as e:
+        send_telegram(f"❌ Erreur générale trailing : {e}")
+        log.exception(f"❌ Erreur générale trailing : {e}")
+
+async def trail_position(direction, entry_price, sym=symbol):
+    """
+    Version runtime : une coroutine par position ouverte (pas de thread dédié),
+    réveillée par le prix mark du symbole ; chaque pas s'exécute dans le pool du runtime.
+    Arrêt : runtime.cancel(f"trailing-{sym}").
+    """
+    session = TrailingSession(direction, entry_price, sym)
+    try:
+        while True:
+            result = await runtime.run_blocking(session.tick)
+            if result == TICK_DONE:
+                break
+            if result == TICK_RETRY:
+                await asyncio.sleep(15)
+                continue
+            await mark_price_stream.wait_for_update_async(sym, timeout=mark_price_rest_interval)
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         send_telegram(f"❌ Erreur générale trailing : {e}")
-        traceback.print_exc()
+        log.exception(f"❌ Erreur générale trailing : {e}")
 
 # === Vérifie si TP atteint (autre thread) ===
 def wait_for_tp_or_exit(direction, entry_price, tp):
@@ -175,10 +204,9 @@ def wait_for_tp_or_exit(direction, entry_price, tp):
     try:
         while getattr(t, "do_run", True):
             try:
-                price = float(client.futures_mark_price(symbol=symbol)["markPrice"])
+                price = mark_price_stream.get_mark_price(symbol)
             except Exception as e:
-                print(f"❌ Erreur récupération prix dans wait_for_tp_or_exit : {e}")
-                traceback.print_exc()
+                log.exception(f"❌ Erreur récupération prix dans wait_for_tp_or_exit : {e}")
                 time.sleep(10)
                 continue
 
@@ -188,10 +216,9 @@ def wait_for_tp_or_exit(direction, entry_price, tp):
                 break
 
             if (direction == "bullish" and price >= tp) or (direction == "bearish" and price <= tp):
-                update_trade_status(entry_price, "FERMÉ - TP")
+                update_trade_status(entry_price, "FERMÉ - TP", trade_id=state.current_position_id)
                 send_telegram(f"✅ Take Profit atteint à {price}$")
                 break
-            time.sleep(15)
+            mark_price_stream.wait_for_update(symbol, timeout=mark_price_rest_interval)
     except Exception as e:
-        print("❌ Erreur dans wait_for_tp_or_exit :", e)
-        traceback.print_exc()
+        log.exception("❌ Erreur dans wait_for_tp_or_exit : %s", e)
@@ -0,0 +1,146 @@
+"""
+Module : trailing_ladder.py
+But : Moteur des paliers de trailing SL/TP. Les règles déclaratives de
+      core.config (trailing_sl_rules / trailing_tp_rules) sont compilées une
+      fois en tableaux triés : recherche par bisect pour un tick, par
+      np.searchsorted pour un tableau entier (plusieurs positions, chemins de
+      prix d'un backtest) en un seul appel vectorisé.
+      Résultats identiques aux anciennes boucles de get_trailing_sl / get_trailing_tp,
+      sans arrondi : les prix sont arrondis au pas de cotation du symbole au
+      moment de l'ordre (symbol_info.round_price).
+"""
+
+import bisect
+import numpy as np
+
+from core.config import take_profit_pct, trailing_sl_rules, trailing_tp_rules, trailing_sl_min_distance
+
+class Ladder:
+    """
+    Échelle compilée : niveau du dernier seuil franchi (gain >= seuil), puis
+    au-delà de step_from un niveau ouvert step_base + n * step_level
+    (n = pas de step_gain entiers franchis). default sous le premier seuil.
+    """
+    __slots__ = ("thresholds", "levels", "default", "step_from", "step_base", "step_gain", "step_level",
+                 "_thresholds_arr", "_table")
+
+    def __init__(self, levels, step_from=None, step_base=None, step_gain=None, step_level=None, default=None):
+        pairs = sorted(((float(t), float(l)) for t, l in levels), key=lambda p: p[0])
+        self.thresholds = [t for t, _ in pairs]
+        self.levels = [l for _, l in pairs]
+        self.default = default
+        self.step_from = step_from
+        self.step_base = step_base
+        self.step_gain = step_gain
+        self.step_level = step_level
+        self._thresholds_arr = np.array(self.thresholds, dtype=np.float64)
+        # Indice searchsorted -> niveau ; 0 = sous le premier seuil
+        self._table = np.array([np.nan if default is None else default] + self.levels, dtype=np.float64)
+
+    @classmethod
+    def from_rules(cls, rules, default=None):
+        return cls(
+            rules.get("levels", []), rules.get("step_from"), rules.get("step_base"),
+            rules.get("step_gain"), rules.get("step_level"), default,
+        )
+
+    def scaled(self, factor, default=None):
+        """
+        Même échelle, niveaux multipliés par factor (seuils inchangés) ; default
+        remplace le niveau sous le premier seuil s'il est fourni. Sert au backtest.
+        """
+        return Ladder(
+            [(t, l * factor) for t, l in zip(self.thresholds, self.levels)], self.step_from,
+            None if self.step_base is None else self.step_base * factor, self.step_gain,
+            None if self.step_level is None else self.step_level * factor,
+            self.default if default is None else default,
+        )
+
+    def level(self, gain):
+        """
+        Niveau pour un gain (None si aucun seuil franchi et pas de défaut).
+        """
+        i = bisect.bisect_right(self.thresholds, gain)
+        level = self.levels[i - 1] if i else self.default
+        if self.step_from is not None and gain >= self.step_from:
+            steps = int((gain - self.step_from) / self.step_gain)
+            level = self.step_base + steps * self.step_level
+        return level
+
+    def level_array(self, gains):
+        """
+        Version vectorisée de level() : NaN là où level() renverrait None.
+        """
+        gains = np.asarray(gains, dtype=np.float64)
+        levels = self._table[np.searchsorted(self._thresholds_arr, gains, side="right")]
+        if self.step_from is not None:
+            stepped = gains >= self.step_from
+            steps = np.trunc((gains[stepped] - self.step_from) / self.step_gain)
+            levels[stepped] = self.step_base + steps * self.step_level
+        return levels
+
+# ✅ Échelles compilées depuis la config
+sl_ladder = Ladder.from_rules(trailing_sl_rules)
+tp_ladder = Ladder.from_rules(trailing_tp_rules, default=take_profit_pct)
+
+def _sign(direction):
+    """
+    "bullish" / "bearish" ou +1 / -1 (scalaire ou tableau) -> tableau de +1 / -1.
+    """
+    d = np.asarray(direction)
+    if d.dtype.kind in "US":
+        return np.where(d == "bullish", 1, -1)
+    return np.where(d > 0, 1, -1)
+
+def gain_array(entry_price, current_price, direction):
+    entry = np.asarray(entry_price, dtype=np.float64)
+    price = np.asarray(current_price, dtype=np.float64)
+    return np.where(_sign(direction) > 0, (price - entry) / entry, (entry - price) / entry)
+
+# === SL ===
+def trailing_sl(entry_price, current_price, direction, ladder=sl_ladder):
+    """
+    Nouveau SL (prix non arrondi) ou None. Voir trailing.get_trailing_sl.
+    """
+    gain_pct = (current_price - entry_price) / entry_price if direction == "bullish" else (entry_price - current_price) / entry_price
+    sl_level = ladder.level(gain_pct)
+    if not sl_level:
+        return None
+    if direction == "bullish":
+        new_sl = entry_price * (1 + sl_level)
+    else:
+        new_sl = entry_price * (1 - sl_level)
+    # Distance minimale entre prix actuel et SL
+    if abs(current_price - new_sl) < entry_price * trailing_sl_min_distance:
+        return None
+    return new_sl
+
+def trailing_sl_array(entry_price, current_price, direction, ladder=sl_ladder):
+    """
+    trailing_sl sur des tableaux (diffusés entre eux) : NaN là où il renverrait None.
+    """
+    entry = np.asarray(entry_price, dtype=np.float64)
+    price = np.asarray(current_price, dtype=np.float64)
+    sign = _sign(direction)
+    level = ladder.level_array(gain_array(entry, price, sign))
+    new_sl = np.where(sign > 0, entry * (1 + level), entry * (1 - level))
+    valid = (level != 0) & ~np.isnan(level) & ~(np.abs(price - new_sl) < entry * trailing_sl_min_distance)
+    return np.where(valid, new_sl, np.nan)
+
+# === TP ===
+def trailing_tp(entry_price, current_price, direction, current_tp_pct, ladder=tp_ladder):
+    """
+    Nouveau % de TP s'il dépasse current_tp_pct, sinon None. Voir trailing.get_trailing_tp.
+    """
+    gain_pct = (current_price - entry_price) / entry_price if direction == "bullish" else (entry_price - current_price) / entry_price
+    new_tp_pct = ladder.level(gain_pct)
+    if new_tp_pct > current_tp_pct:
+        return new_tp_pct
+    return None
+
+def trailing_tp_array(entry_price, current_price, direction, current_tp_pct, ladder=tp_ladder):
+    """
+    trailing_tp sur des tableaux : NaN là où il renverrait None.
+    """
+    level = ladder.level_array(gain_array(entry_price, current_price, direction))
+    return np.where(level > np.asarray(current_tp_pct, dtype=np.float64), level, np.nan)
@@ -0,0 +1,266 @@
+"""
+Module : user_stream.py
+But : User-data stream Futures (listenKey). Création, keepalive et
+      reconnexion du listenKey ; les événements ACCOUNT_UPDATE et
+      ORDER_TRADE_UPDATE sont appliqués à l'état de chaque symbole de
+      l'univers (core.state.states).
+      Les boucles de surveillance lisent l'état poussé au lieu de poller,
+      avec repli REST automatique tant que le flux n'est pas actif ; ce repli
+      est groupé (un seul positionRisk sans symbole pour tout l'univers).
+"""
+
+import time
+import asyncio
+import threading
+
+from core.binance_client import client
+from core.config import (
+    symbol, symbols, futures_ws_url, listen_key_keepalive_interval, user_stream_resync_interval,
+    open_orders_batch_min_symbols,
+)
+from core.state import state, states
+from core.ws_stream import StreamConnection
+from core import runtime
+from core.trade_journal import journal
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+_lock = threading.Lock()
+_connection = None
+_listen_key = None
+_stop = threading.Event()
+_universe = frozenset(symbols)
+_realized = {}  # orderId -> PnL réalisé cumulé (fills partiels d'un ordre closePosition)
+
+# === Conversion des événements au format REST ===
+def _order_from_event(o):
+    return {
+        "orderId": o["i"],
+        "symbol": o["s"],
+        "clientOrderId": o.get("c"),
+        "side": o["S"],
+        "type": o.get("ot") or o["o"],
+        "status": o["X"],
+        "stopPrice": o.get("sp", "0"),
+        "price": o.get("p", "0"),
+        "avgPrice": o.get("ap", "0"),
+        "origQty": o.get("q", "0"),
+        "executedQty": o.get("z", "0"),
+        "closePosition": bool(o.get("cp", False)),
+        "reduceOnly": bool(o.get("R", False)),
+    }
+
+# === Application des événements ===
+def _on_message(payload):
+    event = payload.get("e")
+    if event == "ACCOUNT_UPDATE":
+        for p in payload.get("a", {}).get("P", []):
+            if p["s"].upper() in _universe:
+                states.get(p["s"]).apply_position(float(p["pa"]), float(p["ep"]))
+    elif event == "ORDER_TRADE_UPDATE":
+        o = payload["o"]
+        if o["s"].upper() in _universe:
+            states.get(o["s"]).apply_order(_order_from_event(o))
+            _record_close(o)
+    elif event == "listenKeyExpired":
+        log.warning("⚠️ listenKey expiré, renouvellement...")
+        runtime.spawn(runtime.run_blocking, _renew_listen_key, name="listenKey-renew", resilient=False)
+
+def _record_close(o):
+    """
+    Exécution d'un ordre closePosition (SL, TP, SL trailing) : clôture du trade
+    au journal avec prix de sortie, PnL réalisé (rp) et heure, par current_position_id
+    (à défaut le dernier trade OUVERT du symbole). Écriture différée, non bloquante.
+    """
+    if not o.get("cp") or o.get("x") != "TRADE":
+        return
+    realized = _realized.pop(o["i"], 0.0) + float(o.get("rp") or 0)
+    if o["X"] != "FILLED":
+        _realized[o["i"]] = realized
+        return
+    st = states.get(o["s"])
+    kind = "SL" if (o.get("ot") or o["o"]) == "STOP_MARKET" else "TP"
+    exit_price = float(o.get("ap") or 0) or float(o.get("L") or 0) or None
+    journal.close(o["s"], st.current_position_id, status=f"FERMÉ - {kind}", exit_price=exit_price, gain=realized)
+    st.current_position_id = None  # Déjà clôturé : watch_position ne le réécrit pas
+
+# === Lectures REST groupées ===
+def _fetch_positions():
+    """
+    Un seul positionRisk sans symbole pour tout l'univers -> {symbole: [positions]}.
+    """
+    by_symbol = {sym: [] for sym in _universe}
+    for p in client.futures_position_information():
+        sym = p["symbol"].upper()
+        if sym in by_symbol:
+            by_symbol[sym].append(p)
+    return by_symbol
+
+def _fetch_open_orders(syms):
+    """
+    Ordres ouverts par symbole. openOrders sans symbole pèse 40 : on ne groupe
+    qu'à partir de open_orders_batch_min_symbols symboles, sinon un appel (poids 1) par symbole.
+    """
+    syms = [s.upper() for s in syms]
+    if len(syms) < open_orders_batch_min_symbols:
+        return {sym: client.futures_get_open_orders(symbol=sym) for sym in syms}
+    by_symbol = {sym: [] for sym in syms}
+    for o in client.futures_get_open_orders():
+        if o["symbol"].upper() in by_symbol:
+            by_symbol[o["symbol"].upper()].append(o)
+    return by_symbol
+
+def resync():
+    """
+    Recharge positions et ordres ouverts de tout l'univers via REST
+    (connexion, reconnexion, contrôle périodique).
+    """
+    for sym, positions in _fetch_positions().items():
+        pos = next((p for p in positions if float(p["positionAmt"]) != 0), None)
+        if pos:
+            states.get(sym).apply_position(float(pos["positionAmt"]), float(pos["entryPrice"]))
+        else:
+            states.get(sym).apply_position(0.0, 0.0)
+    for sym, orders in _fetch_open_orders(_universe).items():
+        states.get(sym).set_open_orders(orders)
+
+def _on_open():
+    # Les événements manqués pendant la coupure sont rattrapés par un snapshot REST
+    try:
+        resync()
+        state.user_stream_live = True
+        log.info("🟢 User-data stream actif : position et ordres poussés en temps réel.")
+    except Exception as e:
+        state.user_stream_live = False
+        log.error(f"❌ Erreur resynchronisation user-data stream : {e}")
+
+# === Gestion du listenKey ===
+def _renew_listen_key():
+    global _listen_key
+    state.user_stream_live = False
+    try:
+        key = client.futures_stream_get_listen_key()
+    except Exception as e:
+        log.error(f"❌ Erreur création listenKey : {e}")
+        return
+    with _lock:
+        _listen_key = key
+        conn = _connection
+    if conn is not None:
+        conn.reconnect(f"{futures_ws_url}/{key}")
+
+async def _keepalive_loop():
+    last_resync = time.time()
+    while True:
+        await asyncio.sleep(listen_key_keepalive_interval)
+        if _stop.is_set():
+            return
+        try:
+            await runtime.run_blocking(client.futures_stream_keepalive, listenKey=_listen_key)
+        except Exception as e:
+            log.warning(f"⚠️ Keepalive listenKey échoué ({e}), renouvellement...")
+            await runtime.run_blocking(_renew_listen_key)
+        if state.user_stream_live and time.time() - last_resync >= user_stream_resync_interval:
+            last_resync = time.time()
+            try:
+                await runtime.run_blocking(resync)
+            except Exception as e:
+                log.warning(f"⚠️ Erreur resynchronisation périodique : {e}")
+
+def _on_close():
+    # Repli REST immédiat dès que la connexion tombe
+    if state.user_stream_live:
+        state.user_stream_live = False
+        log.info("🔌 User-data stream coupé, repli sur le polling REST.")
+
+def start():
+    """
+    Démarre le user-data stream (idempotent).
+    """
+    global _connection, _listen_key
+    with _lock:
+        if _connection is not None:
+            return
+    try:
+        key = client.futures_stream_get_listen_key()
+    except Exception as e:
+        log.exception(f"❌ User-data stream indisponible, polling REST conservé : {e}")
+        return
+    with _lock:
+        _listen_key = key
+        _connection = StreamConnection(f"{futures_ws_url}/{key}", _on_message, on_open=_on_open, on_close=_on_close, name="userData")
+    _stop.clear()
+    _connection.start()
+    runtime.spawn(_keepalive_loop, name="listenKey-keepalive")
+
+def stop():
+    global _connection
+    _stop.set()
+    state.user_stream_live = False
+    runtime.cancel("listenKey-keepalive")
+    with _lock:
+        conn, _connection = _connection, None
+    if conn is not None:
+        conn.stop()
+
+def is_live():
+    return state.user_stream_live
+
+# === Lectures utilisées par les boucles de surveillance ===
+def get_position_information(sym=symbol):
+    """
+    Positions poussées par le flux si actif, sinon REST. Pour un symbole de
+    l'univers, le REST passe par le positionRisk groupé : les lectures
+    simultanées de plusieurs symboles partagent la même requête (CoalescingClient).
+    """
+    sym = sym.upper()
+    if sym not in _universe:
+        return client.futures_position_information(symbol=sym)
+    if state.user_stream_live:
+        return states.get(sym).get_position_information(sym)
+    return _fetch_positions()[sym]
+
+def get_open_orders(sym=symbol):
+    """
+    Ordres ouverts poussés par le flux si actif, sinon REST.
+    """
+    sym = sym.upper()
+    if sym in _universe and state.user_stream_live:
+        return states.get(sym).get_open_orders()
+    return client.futures_get_open_orders(symbol=sym)
+
+def snapshot(syms, with_orders=True):
+    """
+    Positions et ordres ouverts de plusieurs symboles en une passe :
+    état poussé si le flux est actif, sinon un positionRisk groupé et les
+    ordres ouverts (voir _fetch_open_orders). Retourne ({sym: positions}, {sym: ordres}) ;
+    ordres à None si with_orders est faux.
+    """
+    syms = [s.upper() for s in syms]
+    if state.user_stream_live:
+        return ({sym: states.get(sym).get_position_information(sym) for sym in syms},
+                {sym: states.get(sym).get_open_orders() if with_orders else None for sym in syms})
+    positions = _fetch_positions()
+    orders = _fetch_open_orders(syms) if with_orders else dict.fromkeys(syms)
+    return {sym: positions.get(sym, []) for sym in syms}, orders
+
+def record_order(order):
+    """
+    Applique tout de suite la réponse REST d'un ordre créé/annulé, sans attendre
+    l'événement correspondant (évite les doublons SL/TP entre deux événements).
+    """
+    if isinstance(order, dict) and "orderId" in order and order.get("symbol", symbol).upper() in _universe:
+        states.get(order.get("symbol", symbol)).apply_order(order)
+
+def wait_for_event(poll_interval, version=None):
+    """
+    Attente entre deux itérations d'une boucle de surveillance :
+    - flux actif : réveil au prochain événement postérieur à `version`
+      (à lire avant l'itération pour ne rien manquer), ou après user_stream_resync_interval
+    - flux inactif : simple sleep de poll_interval (polling REST d'origine)
+    """
+    if state.user_stream_live:
+        state.wait_for_change(state.version if version is None else version, timeout=user_stream_resync_interval)
+    else:
+        time.sleep(poll_interval)
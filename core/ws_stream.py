@@ -0,0 +1,186 @@
+"""
+Module : ws_stream.py
+But : Connexion WebSocket Binance partagée (aiohttp, sur la boucle de
+      core.runtime) avec abonnement dynamique aux flux, reconnexion
+      automatique et callbacks. Aucune connexion n'occupe de thread.
+"""
+
+import json
+import time
+import asyncio
+import threading
+
+import aiohttp
+
+from core import runtime
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+_session = None
+
+async def _get_session():
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession()
+    return _session
+
+async def _close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+runtime.on_shutdown(_close_session)
+
+class StreamConnection:
+    """
+    Connexion WebSocket unique vers un endpoint Binance (/ws).
+    Les flux sont ajoutés via SUBSCRIBE, ré-abonnés après chaque reconnexion.
+    - on_message(payload) : appelé pour chaque événement reçu (dict JSON), sur la boucle
+    - on_open() : appelé après chaque (re)connexion dans le pool du runtime, utile
+      pour un backfill REST ; les messages sont lus une fois qu'il a terminé
+    - on_close() : appelé à chaque déconnexion
+    """
+
+    def __init__(self, url, on_message, on_open=None, on_close=None, name="ws"):
+        self.url = url
+        self.name = name
+        self._on_message = on_message
+        self._on_open = on_open
+        self._on_close = on_close
+        self._lock = threading.Lock()
+        self._streams = set()
+        self._ws = None
+        self._running = False
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._request_id = 0
+        self.last_message_time = 0.0
+
+    # === Gestion des abonnements ===
+    def add_streams(self, streams):
+        with self._lock:
+            new_streams = [s for s in streams if s not in self._streams]
+            self._streams.update(new_streams)
+        if new_streams and self._connected.is_set():
+            self._send_subscribe(new_streams)
+        self.start()
+
+    def _subscribe_message(self, streams):
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+        return json.dumps({"method": "SUBSCRIBE", "params": list(streams), "id": request_id})
+
+    def _send_subscribe(self, streams):
+        ws = self._ws
+        if ws is None:
+            return
+        self._submit(ws.send_str(self._subscribe_message(streams)), "envoi SUBSCRIBE")
+
+    def _submit(self, coro, label):
+        # Depuis n'importe quel thread : exécuté sur la boucle, erreur simplement journalisée
+        def done(fut):
+            if not fut.cancelled() and fut.exception() is not None:
+                log.warning(f"⚠️ [{self.name}] Erreur {label} : {fut.exception()}")
+        if runtime.in_loop():
+            asyncio.get_running_loop().create_task(coro).add_done_callback(done)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, runtime.loop()).add_done_callback(done)
+
+    # === Cycle de vie ===
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._stop.clear()
+        runtime.spawn(self._run, name=f"ws-{self.name}", resilient=False)
+
+    def stop(self):
+        self._stop.set()
+        runtime.cancel(f"ws-{self.name}")
+
+    def reconnect(self, url=None):
+        """
+        Ferme la connexion courante ; la boucle se reconnecte (éventuellement sur une nouvelle URL).
+        """
+        if url:
+            self.url = url
+        ws = self._ws
+        if ws is not None:
+            self._submit(ws.close(), "fermeture")
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    async def _run(self):
+        backoff = 1
+        try:
+            while not self._stop.is_set():
+                started = time.time()
+                try:
+                    session = await _get_session()
+                    async with session.ws_connect(self.url, heartbeat=60, max_msg_size=0) as ws:
+                        self._ws = ws
+                        await self._handle_open(ws)
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._handle_message(msg.data)
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                log.warning(f"⚠️ [{self.name}] Erreur WebSocket : {ws.exception()}")
+                                break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning(f"⚠️ [{self.name}] Erreur WebSocket : {e}")
+                finally:
+                    self._ws = None
+                    self._handle_close()
+                if self._stop.is_set():
+                    break
+                # Backoff exponentiel, réinitialisé si la connexion a tenu un moment
+                if time.time() - started > 60:
+                    backoff = 1
+                log.info(f"🔌 [{self.name}] WebSocket déconnecté, reconnexion dans {backoff}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(60, backoff * 2)
+        finally:
+            with self._lock:
+                self._running = False
+
+    async def _handle_open(self, ws):
+        self._connected.set()
+        log.info(f"🟢 [{self.name}] WebSocket connecté : {self.url}")
+        with self._lock:
+            streams = list(self._streams)
+        if streams:
+            await ws.send_str(self._subscribe_message(streams))
+        if self._on_open:
+            try:
+                await runtime.run_blocking(self._on_open)
+            except Exception as e:
+                log.exception(f"❌ [{self.name}] Erreur on_open : {e}")
+
+    def _handle_message(self, message):
+        self.last_message_time = time.time()
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        # Réponses aux requêtes SUBSCRIBE : {"result": null, "id": 1}
+        if isinstance(payload, dict) and "id" in payload and "result" in payload:
+            return
+        try:
+            self._on_message(payload)
+        except Exception as e:
+            log.exception(f"❌ [{self.name}] Erreur traitement message : {e}")
+
+    def _handle_close(self):
+        self._connected.clear()
+        if self._on_close:
+            try:
+                self._on_close()
+            except Exception as e:
+                log.error(f"❌ [{self.name}] Erreur on_close : {e}")
@@ -0,0 +1,537 @@
+"""
+Module : exchange.py
+But : Moteur du simulateur Binance Futures (USDⓈ-M) local.
+      Marché synthétique (marche aléatoire reproductible), bougies 1m agrégées
+      vers les autres intervalles, compte unique en mode one-way, et moteur
+      de matching pour MARKET, STOP_MARKET et TAKE_PROFIT_MARKET.
+      Les événements (kline, markPrice, ACCOUNT_UPDATE, ORDER_TRADE_UPDATE)
+      sont publiés aux abonnés WebSocket via publish().
+"""
+
+import math
+import time
+import random
+import threading
+from decimal import Decimal
+
+INTERVALS_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+
+# Filtres par défaut : (tickSize, stepSize, minQty, minNotional, prix initial)
+DEFAULT_SYMBOLS = {
+    "ALGOUSDT": ("0.0001", "0.1", "0.1", "5", 0.20),
+    "BTCUSDT": ("0.10", "0.001", "0.001", "100", 60000.0),
+    "ETHUSDT": ("0.01", "0.001", "0.001", "20", 3000.0),
+}
+
+CONDITIONAL_TYPES = ("STOP_MARKET", "TAKE_PROFIT_MARKET")
+
+class ExchangeError(Exception):
+    """
+    Erreur au format Binance : {"code": ..., "msg": ...} avec statut HTTP.
+    """
+
+    def __init__(self, code, msg, http_status=400):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+        self.http_status = http_status
+
+def now_ms():
+    return int(time.time() * 1000)
+
+def _fmt(value, step):
+    # Chaîne au pas du symbole, comme les réponses Binance
+    return str(Decimal(str(value)).quantize(Decimal(step)))
+
+class Market:
+    """
+    Prix synthétique d'un symbole et ses bougies 1m (historique + bougie en cours).
+    """
+
+    def __init__(self, symbol, tick_size, start_price, volatility, history_minutes, rng, clock=now_ms):
+        self.symbol = symbol
+        self.clock = clock  # Horloge du marché (ms), virtuelle en mode accéléré
+        self.tick_size = tick_size
+        self.volatility = volatility  # Écart-type relatif par seconde
+        self.rng = rng
+        self.candles = []  # [open_time, open, high, low, close, volume]
+        self.replay = None  # Itérateur de prix enregistrés (remplace la marche aléatoire)
+        price = start_price
+        start = (self.clock() // 60_000 - history_minutes) * 60_000
+        for i in range(history_minutes):
+            o = price
+            path = []
+            for _ in range(4):  # 4 points intra-bougie pour high/low
+                price = self._step(price, 15)
+                path.append(price)
+            self.candles.append([start + i * 60_000, o, max(o, *path), min(o, *path), price, round(rng.uniform(1000, 50000), 1)])
+        self.price = price
+        self._roll(self.clock())
+
+    def _step(self, price, seconds):
+        shock = self.rng.gauss(0, self.volatility * math.sqrt(seconds))
+        return max(float(self.tick_size), self._round(price * math.exp(shock)))
+
+    def _round(self, price):
+        tick = float(self.tick_size)
+        return round(round(price / tick) * tick, 10)
+
+    def _roll(self, ts):
+        minute = ts // 60_000 * 60_000
+        if not self.candles or self.candles[-1][0] < minute:
+            self.candles.append([minute, self.price, self.price, self.price, self.price, 0.0])
+            if len(self.candles) > 20_000:
+                del self.candles[:-20_000]
+
+    def tick(self, seconds=1.0):
+        if self.replay is not None:
+            # Chemin enregistré : le dernier prix est conservé une fois épuisé
+            self.price = self._round(next(self.replay, self.price))
+        else:
+            self.price = self._step(self.price, seconds)
+        ts = self.clock()
+        self._roll(ts)
+        c = self.candles[-1]
+        c[2] = max(c[2], self.price)
+        c[3] = min(c[3], self.price)
+        c[4] = self.price
+        c[5] = round(c[5] + self.rng.uniform(1, 500), 1)
+        return self.price
+
+    def klines(self, interval, limit=500, start_time=None, end_time=None):
+        """
+        Bougies au format REST Binance, agrégées depuis le 1m.
+        """
+        step = INTERVALS_MS.get(interval)
+        if step is None:
+            raise ExchangeError(-1120, "Invalid interval.")
+        candles = self.candles
+        if start_time is None and end_time is None:
+            # Seules les dernières bougies 1m sont utiles
+            candles = candles[-(limit + 1) * (step // 60_000):]
+        buckets = {}
+        for t, o, h, l, c, v in candles:
+            key = t // step * step
+            b = buckets.get(key)
+            if b is None:
+                buckets[key] = [key, o, h, l, c, v]
+            else:
+                b[2] = max(b[2], h)
+                b[3] = min(b[3], l)
+                b[4] = c
+                b[5] += v
+        rows = [buckets[k] for k in sorted(buckets)]
+        if start_time is not None:
+            rows = [r for r in rows if r[0] >= start_time]
+        if end_time is not None:
+            rows = [r for r in rows if r[0] <= end_time]
+        rows = rows[:limit] if start_time is not None else rows[-limit:]
+        return [self._kline_row(r, step) for r in rows]
+
+    def _kline_row(self, r, step):
+        t, o, h, l, c, v = r
+        f = lambda x: _fmt(x, self.tick_size)
+        return [t, f(o), f(h), f(l), f(c), f"{v:.1f}", t + step - 1, f"{v * c:.4f}", int(v // 10), f"{v / 2:.1f}", f"{v * c / 2:.4f}", "0"]
+
+    def kline_event(self, interval):
+        row = self.klines(interval, limit=1)[0]
+        t = row[0]
+        return {
+            "e": "kline", "E": self.clock(), "s": self.symbol,
+            "k": {
+                "t": t, "T": row[6], "s": self.symbol, "i": interval,
+                "o": row[1], "c": row[4], "h": row[2], "l": row[3], "v": row[5],
+                "n": row[8], "x": False, "q": row[7], "V": row[9], "Q": row[10],
+            },
+        }
+
+class Exchange:
+    """
+    État complet du simulateur (thread-safe) : marchés, compte, ordres.
+    publish(stream, payload) est fourni par le serveur pour diffuser les événements.
+    """
+
+    def __init__(self, symbols=None, balance=1000.0, fee_rate=0.0004, slippage_bps=0.0,
+                 volatility=0.0005, history_minutes=3000, seed=42, publish=None, replay=None):
+        self.lock = threading.RLock()
+        self.clock_ms = now_ms()  # Horloge virtuelle, avancée par tick()
+        self.rng = random.Random(seed)
+        self.fee_rate = fee_rate
+        self.slippage_bps = slippage_bps
+        self.publish = publish or (lambda stream, payload: None)
+        self.filters = {}
+        self.markets = {}
+        for sym, (tick, step, min_qty, min_notional, price) in (symbols or DEFAULT_SYMBOLS).items():
+            self.filters[sym] = {"tickSize": tick, "stepSize": step, "minQty": min_qty, "minNotional": min_notional}
+            self.markets[sym] = Market(sym, tick, price, volatility, history_minutes, self.rng, self.now_ms)
+        for sym, prices in (replay or {}).items():
+            self.market(sym).replay = iter(prices)
+        self.wallet = balance
+        self.leverage = {sym: 20 for sym in self.markets}
+        self.positions = {sym: {"amt": 0.0, "entry": 0.0} for sym in self.markets}
+        self.orders = {}          # orderId -> ordre (format REST)
+        self.next_order_id = 1_000_000
+        self.listen_keys = set()
+        self.stats = {"market_fills": 0, "conditional_fills": 0, "expired": 0, "canceled": 0}
+
+    def now_ms(self):
+        return self.clock_ms
+
+    # === Accès ===
+    def market(self, symbol):
+        m = self.markets.get((symbol or "").upper())
+        if m is None:
+            raise ExchangeError(-1121, "Invalid symbol.")
+        return m
+
+    def mark_price(self, symbol):
+        return self.market(symbol).price
+
+    # === Horloge du marché ===
+    def tick(self, seconds=1.0):
+        """
+        Avance tous les marchés d'un pas, déclenche les ordres conditionnels et publie les flux.
+        """
+        with self.lock:
+            self.clock_ms += int(seconds * 1000)
+            for sym, m in self.markets.items():
+                m.tick(seconds)
+                self._check_triggers(sym)
+            events = [(sym, m.price) for sym, m in self.markets.items()]
+        for sym, price in events:
+            m = self.markets[sym]
+            self.publish(f"{sym.lower()}@markPrice@1s", {
+                "e": "markPriceUpdate", "E": self.now_ms(), "s": sym,
+                "p": _fmt(price, m.tick_size), "i": _fmt(price, m.tick_size),
+                "P": _fmt(price, m.tick_size), "r": "0.00010000", "T": self.now_ms() + 3_600_000,
+            })
+            for interval in INTERVALS_MS:
+                stream = f"{sym.lower()}@kline_{interval}"
+                self.publish(stream, lambda m=m, interval=interval: m.kline_event(interval))
+
+    # === Compte ===
+    def _unrealized(self, sym):
+        pos = self.positions[sym]
+        return (self.markets[sym].price - pos["entry"]) * pos["amt"]
+
+    def _initial_margin(self, sym):
+        pos = self.positions[sym]
+        return abs(pos["amt"]) * self.markets[sym].price / self.leverage[sym]
+
+    def available_balance(self):
+        upnl = sum(self._unrealized(s) for s in self.markets)
+        margin = sum(self._initial_margin(s) for s in self.markets)
+        return self.wallet + upnl - margin
+
+    def position_risk(self, symbol=None):
+        with self.lock:
+            symbols = [self.market(symbol).symbol] if symbol else list(self.markets)
+            out = []
+            for sym in symbols:
+                pos, m = self.positions[sym], self.markets[sym]
+                notional = pos["amt"] * m.price
+                out.append({
+                    "symbol": sym,
+                    "positionSide": "BOTH",
+                    "positionAmt": _fmt(pos["amt"], self.filters[sym]["stepSize"]),
+                    "entryPrice": str(pos["entry"]),
+                    "breakEvenPrice": str(pos["entry"]),
+                    "markPrice": _fmt(m.price, m.tick_size),
+                    "unRealizedProfit": f"{self._unrealized(sym):.8f}",
+                    "liquidationPrice": "0",
+                    "leverage": str(self.leverage[sym]),
+                    "notional": f"{notional:.8f}",
+                    "marginType": "cross",
+                    "isolatedMargin": "0.00000000",
+                    "initialMargin": f"{self._initial_margin(sym):.8f}",
+                    "updateTime": self.now_ms(),
+                })
+            return out
+
+    def balance(self):
+        with self.lock:
+            upnl = sum(self._unrealized(s) for s in self.markets)
+            return [{
+                "accountAlias": "sim", "asset": "USDT",
+                "balance": f"{self.wallet:.8f}",
+                "crossWalletBalance": f"{self.wallet:.8f}",
+                "crossUnPnl": f"{upnl:.8f}",
+                "availableBalance": f"{self.available_balance():.8f}",
+                "maxWithdrawAmount": f"{max(0.0, self.available_balance()):.8f}",
+                "marginAvailable": True, "updateTime": self.now_ms(),
+            }]
+
+    def account(self):
+        with self.lock:
+            upnl = sum(self._unrealized(s) for s in self.markets)
+            return {
+                "canTrade": True, "canDeposit": True, "canWithdraw": True,
+                "totalWalletBalance": f"{self.wallet:.8f}",
+                "totalUnrealizedProfit": f"{upnl:.8f}",
+                "totalMarginBalance": f"{self.wallet + upnl:.8f}",
+                "availableBalance": f"{self.available_balance():.8f}",
+                "assets": self.balance(),
+                "positions": [{
+                    "symbol": p["symbol"], "positionAmt": p["positionAmt"], "entryPrice": p["entryPrice"],
+                    "unrealizedProfit": p["unRealizedProfit"], "leverage": p["leverage"],
+                    "positionSide": "BOTH", "isolated": False,
+                } for p in self.position_risk()],
+            }
+
+    def change_leverage(self, symbol, leverage):
+        with self.lock:
+            sym = self.market(symbol).symbol
+            leverage = int(leverage)
+            if not 1 <= leverage <= 125:
+                raise ExchangeError(-4028, "Leverage is not valid")
+            self.leverage[sym] = leverage
+            return {"symbol": sym, "leverage": leverage, "maxNotionalValue": "1000000"}
+
+    def leverage_bracket(self, symbol=None):
+        symbols = [self.market(symbol).symbol] if symbol else list(self.markets)
+        return [{"symbol": s, "brackets": [{"bracket": 1, "initialLeverage": self.leverage[s],
+                                            "notionalCap": 1000000, "notionalFloor": 0,
+                                            "maintMarginRatio": 0.01, "cum": 0.0}]} for s in symbols]
+
+    def exchange_info(self):
+        return {
+            "timezone": "UTC", "serverTime": self.now_ms(),
+            "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 2400}],
+            "symbols": [{
+                "symbol": sym, "pair": sym, "contractType": "PERPETUAL", "status": "TRADING",
+                "baseAsset": sym[:-4], "quoteAsset": "USDT", "marginAsset": "USDT",
+                "pricePrecision": max(0, -Decimal(f["tickSize"]).normalize().as_tuple().exponent),
+                "quantityPrecision": max(0, -Decimal(f["stepSize"]).normalize().as_tuple().exponent),
+                "orderTypes": ["LIMIT", "MARKET", "STOP_MARKET", "TAKE_PROFIT_MARKET"],
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": f["tickSize"], "minPrice": f["tickSize"], "maxPrice": "1000000"},
+                    {"filterType": "LOT_SIZE", "stepSize": f["stepSize"], "minQty": f["minQty"], "maxQty": "10000000"},
+                    {"filterType": "MARKET_LOT_SIZE", "stepSize": f["stepSize"], "minQty": f["minQty"], "maxQty": "10000000"},
+                    {"filterType": "MIN_NOTIONAL", "notional": f["minNotional"]},
+                ],
+            } for sym, f in self.filters.items()],
+        }
+
+    # === Ordres ===
+    def open_orders(self, symbol=None, conditional=None):
+        with self.lock:
+            sym = self.market(symbol).symbol if symbol else None
+            return [dict(o) for o in self.orders.values()
+                    if (sym is None or o["symbol"] == sym)
+                    and (conditional is None or (o["type"] in CONDITIONAL_TYPES) == conditional)]
+
+    def get_order(self, symbol, order_id):
+        with self.lock:
+            o = self.orders.get(int(order_id))
+            if o is None or o["symbol"] != self.market(symbol).symbol:
+                raise ExchangeError(-2013, "Order does not exist.")
+            return dict(o)
+
+    def create_order(self, params):
+        """
+        params : paramètres REST (chaînes). Accepte stopPrice ou triggerPrice (endpoint algoOrder).
+        """
+        with self.lock:
+            m = self.market(params.get("symbol"))
+            sym = m.symbol
+            side = (params.get("side") or "").upper()
+            order_type = (params.get("type") or "").upper()
+            if side not in ("BUY", "SELL"):
+                raise ExchangeError(-1102, "Mandatory parameter 'side' was not sent, was empty/null, or malformed.")
+            if order_type not in ("MARKET",) + CONDITIONAL_TYPES:
+                raise ExchangeError(-1116, "Invalid orderType.")
+            close_position = str(params.get("closePosition", "false")).lower() == "true"
+            reduce_only = str(params.get("reduceOnly", "false")).lower() == "true"
+            qty = float(params.get("quantity") or 0)
+            f = self.filters[sym]
+            if not close_position:
+                if qty <= 0:
+                    raise ExchangeError(-1102, "Mandatory parameter 'quantity' was not sent, was empty/null, or malformed.")
+                if qty < float(f["minQty"]):
+                    raise ExchangeError(-4003, "Quantity less than or equal to zero.")
+                if Decimal(str(qty)) % Decimal(f["stepSize"]) != 0:
+                    raise ExchangeError(-1111, "Precision is over the maximum defined for this asset.")
+            client_id = params.get("newClientOrderId") or params.get("clientAlgoId") or f"sim_{self.next_order_id}"
+            if any(o["clientOrderId"] == client_id for o in self.orders.values()):
+                raise ExchangeError(-4116, "ClientOrderId is duplicated.")
+            stop_price = params.get("stopPrice") or params.get("triggerPrice") or "0"
+            if order_type in CONDITIONAL_TYPES:
+                sp = float(stop_price)
+                if sp <= 0:
+                    raise ExchangeError(-1102, "Mandatory parameter 'stopPrice' was not sent, was empty/null, or malformed.")
+                # Déclenchement immédiat refusé, comme Binance
+                if self._should_trigger(order_type, side, sp, m.price):
+                    raise ExchangeError(-2021, "Order would immediately trigger.")
+            self.next_order_id += 1
+            order = {
+                "orderId": self.next_order_id,
+                "algoId": self.next_order_id,
+                "symbol": sym,
+                "status": "NEW",
+                "clientOrderId": client_id,
+                "price": "0",
+                "avgPrice": "0",
+                "origQty": _fmt(qty, f["stepSize"]),
+                "executedQty": "0",
+                "cumQuote": "0",
+                "timeInForce": params.get("timeInForce", "GTC"),
+                "type": order_type,
+                "origType": order_type,
+                "reduceOnly": reduce_only or close_position,
+                "closePosition": close_position,
+                "side": side,
+                "positionSide": "BOTH",
+                "stopPrice": _fmt(stop_price, m.tick_size) if order_type in CONDITIONAL_TYPES else "0",
+                "workingType": params.get("workingType", "CONTRACT_PRICE"),
+                "updateTime": self.now_ms(),
+            }
+            if order_type == "MARKET":
+                if not reduce_only:
+                    notional = qty * m.price
+                    if notional < float(f["minNotional"]):
+                        raise ExchangeError(-4164, f"Order's notional must be no smaller than {f['minNotional']} (unless you choose reduce only).")
+                    if notional / self.leverage[sym] > self.available_balance() and not self._reduces(sym, side, qty):
+                        raise ExchangeError(-2019, "Margin is insufficient.")
+                self._fill(order, qty)
+                self.stats["market_fills"] += 1
+                response = dict(order)
+                # newOrderRespType ACK : pas encore exécuté vu du client
+                if (params.get("newOrderRespType") or "ACK").upper() == "ACK":
+                    response.update(status="NEW", executedQty="0", avgPrice="0.00")
+                return response
+            self.orders[order["orderId"]] = order
+            self._emit_order(order, "NEW")
+            return dict(order)
+
+    def cancel_order(self, symbol, order_id=None, client_id=None):
+        with self.lock:
+            sym = self.market(symbol).symbol
+            order = None
+            if order_id is not None:
+                order = self.orders.get(int(order_id))
+            elif client_id is not None:
+                order = next((o for o in self.orders.values() if o["clientOrderId"] == client_id), None)
+            if order is None or order["symbol"] != sym:
+                raise ExchangeError(-2011, "Unknown order sent.")
+            del self.orders[order["orderId"]]
+            self.stats["canceled"] += 1
+            order["status"] = "CANCELED"
+            order["updateTime"] = self.now_ms()
+            self._emit_order(order, "CANCELED")
+            return dict(order)
+
+    def cancel_all(self, symbol):
+        with self.lock:
+            sym = self.market(symbol).symbol
+            for oid in [oid for oid, o in self.orders.items() if o["symbol"] == sym]:
+                self.cancel_order(sym, oid)
+            return {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    # === Matching ===
+    @staticmethod
+    def _should_trigger(order_type, side, stop_price, price):
+        if order_type == "STOP_MARKET":
+            return price <= stop_price if side == "SELL" else price >= stop_price
+        return price >= stop_price if side == "SELL" else price <= stop_price
+
+    def _reduces(self, sym, side, qty):
+        amt = self.positions[sym]["amt"]
+        return (amt > 0 and side == "SELL" or amt < 0 and side == "BUY") and qty <= abs(amt)
+
+    def _check_triggers(self, sym):
+        price = self.markets[sym].price
+        for order in [o for o in self.orders.values() if o["symbol"] == sym]:
+            if not self._should_trigger(order["type"], order["side"], float(order["stopPrice"]), price):
+                continue
+            del self.orders[order["orderId"]]
+            amt = self.positions[sym]["amt"]
+            if order["closePosition"]:
+                qty = abs(amt) if (amt > 0) == (order["side"] == "SELL") else 0.0
+            else:
+                qty = float(order["origQty"])
+                if order["reduceOnly"]:
+                    qty = min(qty, abs(amt)) if self._reduces(sym, order["side"], min(qty, abs(amt))) else 0.0
+            if qty <= 0:
+                order["status"] = "EXPIRED"
+                order["updateTime"] = self.now_ms()
+                self._emit_order(order, "EXPIRED")
+                self.stats["expired"] += 1
+                continue
+            self._fill(order, qty)
+            self.stats["conditional_fills"] += 1
+
+    def _fill(self, order, qty):
+        sym = order["symbol"]
+        m = self.markets[sym]
+        slip = self.slippage_bps / 10_000 * (1 if order["side"] == "BUY" else -1)
+        price = m._round(m.price * (1 + slip))
+        signed = qty if order["side"] == "BUY" else -qty
+        pos = self.positions[sym]
+        amt, entry = pos["amt"], pos["entry"]
+        realized = 0.0
+        if amt == 0 or (amt > 0) == (signed > 0):
+            new_amt = amt + signed
+            entry = (entry * abs(amt) + price * abs(signed)) / abs(new_amt)
+        else:
+            closed = min(abs(amt), abs(signed))
+            realized = (price - entry) * closed * (1 if amt > 0 else -1)
+            new_amt = amt + signed
+            if abs(new_amt) < 1e-12:
+                new_amt, entry = 0.0, 0.0
+            elif (new_amt > 0) != (amt > 0):
+                entry = price  # Retournement : le reliquat ouvre au prix d'exécution
+        fee = abs(qty) * price * self.fee_rate
+        self.wallet += realized - fee
+        pos["amt"], pos["entry"] = round(new_amt, 10), entry
+        order.update(
+            status="FILLED", executedQty=_fmt(qty, self.filters[sym]["stepSize"]),
+            origQty=_fmt(qty, self.filters[sym]["stepSize"]),
+            avgPrice=_fmt(price, m.tick_size), cumQuote=f"{qty * price:.8f}", updateTime=self.now_ms(),
+        )
+        self._emit_order(order, "TRADE", last_qty=qty, last_price=price, realized=realized, fee=fee)
+        self._emit_account(sym)
+
+    # === Événements user-data ===
+    def _emit_order(self, order, execution_type, last_qty=0.0, last_price=0.0, realized=0.0, fee=0.0):
+        payload = {
+            "e": "ORDER_TRADE_UPDATE", "E": self.now_ms(), "T": self.now_ms(),
+            "o": {
+                "s": order["symbol"], "c": order["clientOrderId"], "S": order["side"],
+                "o": order["type"], "f": order["timeInForce"], "q": order["origQty"],
+                "p": "0", "ap": order["avgPrice"], "sp": order["stopPrice"],
+                "x": execution_type, "X": order["status"], "i": order["orderId"],
+                "l": str(last_qty), "z": order["executedQty"], "L": str(last_price),
+                "n": f"{fee:.8f}", "N": "USDT", "T": order["updateTime"], "t": 0,
+                "R": order["reduceOnly"], "cp": order["closePosition"], "ot": order["origType"],
+                "ps": "BOTH", "rp": f"{realized:.8f}",
+            },
+        }
+        for key in list(self.listen_keys):
+            self.publish(key, payload)
+
+    def _emit_account(self, sym):
+        pos = self.positions[sym]
+        payload = {
+            "e": "ACCOUNT_UPDATE", "E": self.now_ms(), "T": self.now_ms(),
+            "a": {
+                "m": "ORDER",
+                "B": [{"a": "USDT", "wb": f"{self.wallet:.8f}", "cw": f"{self.wallet:.8f}", "bc": "0"}],
+                "P": [{
+                    "s": sym, "pa": _fmt(pos["amt"], self.filters[sym]["stepSize"]),
+                    "ep": str(pos["entry"]), "bep": str(pos["entry"]), "cr": "0",
+                    "up": f"{self._unrealized(sym):.8f}", "mt": "cross", "iw": "0", "ps": "BOTH",
+                }],
+            },
+        }
+        for key in list(self.listen_keys):
+            self.publish(key, payload)
+
+    # === listenKey ===
+    def new_listen_key(self):
+        with self.lock:
+            key = "".join(self.rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(60))
+            self.listen_keys.add(key)
+            return key
@@ -0,0 +1,497 @@
+"""
+Module : server.py
+But : Serveur du simulateur Binance Futures local (REST + WebSocket + Telegram factice).
+      Un seul port sert :
+      - REST : /api/v3/* (spot : klines, ticker, ping, time) et /fapi/v1|v2|v3/*
+        (positionRisk, openOrders, order, algoOrder, batchOrders, account, balance,
+        premiumIndex, leverage, exchangeInfo, listenKey...)
+      - WebSocket : /ws (SUBSCRIBE <sym>@kline_<i>, <sym>@markPrice@1s) et /ws/<listenKey>
+      - Telegram : /bot<token>/<méthode> (messages affichés dans la console)
+      - /sim/stats : appels et poids par endpoint, exécutions du moteur
+      Latence et erreurs injectables (ex : -2011 sur les annulations, 429 + Retry-After).
+
+Lancement :
+    python -m sim.server --port 8765 --latency-ms 20 --error-rate 0.02 --error-codes=-2011,429
+Côté bot :
+    BINANCE_SIM_URL=http://127.0.0.1:8765 python main.py
+"""
+
+import re
+import sys
+import json
+import time
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+from sim.exchange import Exchange, ExchangeError, now_ms
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Poids approximatifs des endpoints (X-MBX-USED-WEIGHT-1M)
+WEIGHTS = {
+    "klines": 5, "exchangeInfo": 1, "positionRisk": 5, "account": 5, "balance": 5,
+    "openOrders": 1, "openAlgoOrders": 1, "premiumIndex": 1, "leverageBracket": 1,
+    "batchOrders": 5, "allOpenOrders": 1, "ticker/price": 2,
+}
+# Poids sans paramètre symbol (tous les marchés)
+WEIGHTS_ALL_SYMBOLS = {"openOrders": 40, "openAlgoOrders": 40, "ticker/price": 5}
+
+# === Diffusion WebSocket ===
+class WsClient:
+    """
+    Connexion WebSocket côté serveur (trames texte non masquées).
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.send_lock = threading.Lock()
+        self.alive = True
+
+    def send_text(self, text):
+        data = text.encode("utf-8")
+        self._send_frame(0x1, data)
+
+    def _send_frame(self, opcode, data):
+        header = bytes([0x80 | opcode])
+        n = len(data)
+        if n < 126:
+            header += bytes([n])
+        elif n < 65536:
+            header += bytes([126]) + struct.pack("!H", n)
+        else:
+            header += bytes([127]) + struct.pack("!Q", n)
+        with self.send_lock:
+            self.handler.wfile.write(header + data)
+
+    def read_frame(self):
+        rfile = self.handler.rfile
+        head = rfile.read(2)
+        if len(head) < 2:
+            return None, None
+        opcode = head[0] & 0x0F
+        masked = head[1] & 0x80
+        n = head[1] & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", rfile.read(8))[0]
+        mask = rfile.read(4) if masked else b"\x00\x00\x00\x00"
+        payload = bytearray(rfile.read(n))
+        for i in range(len(payload)):
+            payload[i] ^= mask[i % 4]
+        return opcode, bytes(payload)
+
+class Hub:
+    """
+    Abonnements flux -> connexions WebSocket.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, stream, client):
+        with self.lock:
+            self.subscribers.setdefault(stream, set()).add(client)
+
+    def remove(self, client):
+        with self.lock:
+            for clients in self.subscribers.values():
+                clients.discard(client)
+
+    def publish(self, stream, payload):
+        with self.lock:
+            clients = list(self.subscribers.get(stream, ()))
+        if not clients:
+            return
+        # Charge utile calculée seulement s'il y a des abonnés
+        text = json.dumps(payload() if callable(payload) else payload)
+        for client in clients:
+            try:
+                client.send_text(text)
+            except Exception:
+                client.alive = False
+                self.remove(client)
+
+# === Injection de fautes ===
+class Faults:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_codes=(), seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_codes = list(error_codes)
+        self.rng = random.Random(seed)
+
+    def delay(self):
+        ms = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def pick_error(self, method, endpoint):
+        """
+        Erreur à injecter pour cette requête (ou None). -2011 ne vise que les annulations.
+        """
+        if not self.error_codes or self.rng.random() >= self.error_rate:
+            return None
+        codes = [c for c in self.error_codes if c != -2011 or (method == "DELETE" and endpoint in ("order", "algoOrder"))]
+        return self.rng.choice(codes) if codes else None
+
+class WeightCounter:
+    """
+    Poids par minute (en-têtes) et totaux par endpoint depuis le démarrage (/sim/stats).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.minute = {}
+        self.used = {}
+        self.orders = {}
+        self.totals = {}
+
+    def add(self, bucket, weight, is_order, key=None):
+        minute = int(time.time() // 60)
+        with self.lock:
+            if key is not None:
+                total = self.totals.setdefault(key, {"calls": 0, "weight": 0})
+                total["calls"] += 1
+                total["weight"] += weight
+            if self.minute.get(bucket) != minute:
+                self.minute[bucket] = minute
+                self.used[bucket] = 0
+                self.orders[bucket] = 0
+            self.used[bucket] += weight
+            if is_order:
+                self.orders[bucket] += 1
+            return self.used[bucket], self.orders[bucket]
+
+# === Handler HTTP ===
+class SimHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, comme Binance
+    server_version = "binance-sim"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # --- Utilitaires ---
+    def _params(self):
+        parsed = urlparse(self.path)
+        params = dict(parse_qsl(parsed.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8")
+            if "json" in (self.headers.get("Content-Type") or ""):
+                params.update(json.loads(body or "{}"))
+            else:
+                params.update(dict(parse_qsl(body)))
+        return parsed.path, params
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._websocket()
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # --- REST ---
+    def _dispatch(self, method):
+        path, params = self._params()
+        if path.startswith("/bot"):
+            return self._telegram(path, params)
+        if path == "/sim/stats":
+            return self._reply(200, self.server.get_stats())
+        match = re.match(r"^/(api|fapi)/v\d+/(.+)$", path)
+        if not match:
+            return self._reply(404, {"code": -1000, "msg": f"Unknown path {path}"})
+        bucket = "futures" if match.group(1) == "fapi" else "spot"
+        endpoint = match.group(2)
+        faults = self.server.faults
+        faults.delay()
+        is_order = endpoint in ("order", "algoOrder", "batchOrders") and method in ("POST", "DELETE")
+        weight = WEIGHTS.get(endpoint, 1)
+        if "symbol" not in params and endpoint in WEIGHTS_ALL_SYMBOLS:
+            weight = WEIGHTS_ALL_SYMBOLS[endpoint]
+        used, orders = self.server.weights.add(bucket, weight, is_order, f"{method} {endpoint}")
+        headers = {"X-MBX-USED-WEIGHT-1M": used}
+        if is_order:
+            headers["X-MBX-ORDER-COUNT-1M"] = orders
+        injected = faults.pick_error(method, endpoint)
+        if injected == 429:
+            headers["Retry-After"] = 2
+            return self._reply(429, {"code": -1003, "msg": "Too many requests; injected by simulator."}, headers)
+        if injected is not None:
+            status = 503 if injected == -1001 else 400
+            return self._reply(status, {"code": injected, "msg": "Error injected by simulator."}, headers)
+        handler = ROUTES.get((method, endpoint))
+        if handler is None:
+            return self._reply(404, {"code": -1000, "msg": f"Unsupported endpoint {method} {endpoint}"}, headers)
+        try:
+            result = handler(self.server.exchange, params)
+        except ExchangeError as e:
+            return self._reply(e.http_status, {"code": e.code, "msg": e.msg}, headers)
+        except (KeyError, ValueError) as e:
+            return self._reply(400, {"code": -1102, "msg": f"Malformed parameter: {e}"}, headers)
+        self._reply(200, result, headers)
+
+    # --- Telegram factice ---
+    def _telegram(self, path, params):
+        method = path.rsplit("/", 1)[-1]
+        if method == "sendMessage":
+            print(f"📨 [telegram] {params.get('text', '')}")
+            self.server.message_id += 1
+            result = {"message_id": self.server.message_id, "date": int(time.time()),
+                      "chat": {"id": int(params.get("chat_id", 0) or 0), "type": "private"},
+                      "text": params.get("text", "")}
+        elif method == "getUpdates":
+            # Long polling : rien à livrer, on attend (au plus 1s) pour ne pas boucler à vide
+            time.sleep(min(float(params.get("timeout", 0) or 0), 1.0))
+            result = []
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "sim", "username": "sim_bot"}
+        else:
+            result = True
+        self._reply(200, {"ok": True, "result": result})
+
+    # --- WebSocket ---
+    def _websocket(self):
+        path = urlparse(self.path).path
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.close_connection = True
+        client = WsClient(self)
+        hub = self.server.hub
+        # /ws/<listenKey> : flux user-data
+        listen_key = path[len("/ws/"):] if path.startswith("/ws/") else ""
+        if listen_key:
+            if listen_key not in self.server.exchange.listen_keys:
+                client._send_frame(0x8, struct.pack("!H", 1008))
+                return
+            hub.subscribe(listen_key, client)
+        try:
+            while client.alive:
+                opcode, payload = client.read_frame()
+                if opcode is None or opcode == 0x8:
+                    try:
+                        client._send_frame(0x8, b"")
+                    except OSError:
+                        pass
+                    break
+                if opcode == 0x9:
+                    client._send_frame(0xA, payload)
+                elif opcode == 0x1:
+                    self._ws_request(client, payload)
+        except (OSError, ValueError):
+            pass
+        finally:
+            client.alive = False
+            hub.remove(client)
+
+    def _ws_request(self, client, payload):
+        try:
+            request = json.loads(payload)
+        except ValueError:
+            return
+        if request.get("method") == "SUBSCRIBE":
+            for stream in request.get("params", []):
+                self.server.hub.subscribe(stream, client)
+        client.send_text(json.dumps({"result": None, "id": request.get("id")}))
+
+# === Table de routage (endpoint sans préfixe de version) ===
+def _create_order(ex, p):
+    return ex.create_order(p)
+
+def _batch_orders(ex, p):
+    results = []
+    for params in json.loads(p["batchOrders"]):
+        params = {k: str(v).lower() if isinstance(v, bool) else str(v) for k, v in params.items()}
+        try:
+            results.append(ex.create_order(params))
+        except ExchangeError as e:
+            results.append({"code": e.code, "msg": e.msg})
+    return results
+
+def _cancel_order(ex, p):
+    order_id = p.get("orderId") or p.get("algoId")
+    client_id = p.get("origClientOrderId") or p.get("clientAlgoId")
+    return ex.cancel_order(p["symbol"], order_id=order_id, client_id=client_id)
+
+def _klines(ex, p):
+    return ex.market(p["symbol"]).klines(
+        p["interval"], int(p.get("limit", 500)),
+        int(p["startTime"]) if "startTime" in p else None,
+        int(p["endTime"]) if "endTime" in p else None,
+    )
+
+def _ticker_price(ex, p):
+    if "symbol" in p:
+        return {"symbol": p["symbol"].upper(), "price": str(ex.mark_price(p["symbol"])), "time": now_ms()}
+    return [{"symbol": s, "price": str(m.price), "time": now_ms()} for s, m in ex.markets.items()]
+
+def _premium_index(ex, p):
+    def one(sym):
+        price = str(ex.mark_price(sym))
+        return {"symbol": sym.upper(), "markPrice": price, "indexPrice": price, "estimatedSettlePrice": price,
+                "lastFundingRate": "0.00010000", "nextFundingTime": now_ms() + 3_600_000, "time": now_ms()}
+    return one(p["symbol"]) if "symbol" in p else [one(s) for s in ex.markets]
+
+ROUTES = {
+    ("GET", "ping"): lambda ex, p: {},
+    ("GET", "time"): lambda ex, p: {"serverTime": now_ms()},
+    ("GET", "exchangeInfo"): lambda ex, p: ex.exchange_info(),
+    ("GET", "klines"): _klines,
+    ("GET", "ticker/price"): _ticker_price,
+    ("GET", "premiumIndex"): _premium_index,
+    ("GET", "positionRisk"): lambda ex, p: ex.position_risk(p.get("symbol")),
+    ("GET", "account"): lambda ex, p: ex.account(),
+    ("GET", "balance"): lambda ex, p: ex.balance(),
+    ("GET", "openOrders"): lambda ex, p: ex.open_orders(p.get("symbol")),
+    ("GET", "openAlgoOrders"): lambda ex, p: ex.open_orders(p.get("symbol"), conditional=True),
+    ("GET", "order"): lambda ex, p: ex.get_order(p["symbol"], p.get("orderId") or p.get("algoId")),
+    ("GET", "leverageBracket"): lambda ex, p: ex.leverage_bracket(p.get("symbol")),
+    ("POST", "order"): _create_order,
+    ("POST", "algoOrder"): _create_order,
+    ("POST", "batchOrders"): _batch_orders,
+    ("DELETE", "order"): _cancel_order,
+    ("DELETE", "algoOrder"): _cancel_order,
+    ("DELETE", "allOpenOrders"): lambda ex, p: ex.cancel_all(p["symbol"]),
+    ("DELETE", "algoOpenOrders"): lambda ex, p: ex.cancel_all(p["symbol"]),
+    ("POST", "leverage"): lambda ex, p: ex.change_leverage(p["symbol"], p["leverage"]),
+    ("POST", "listenKey"): lambda ex, p: {"listenKey": ex.new_listen_key()},
+    ("PUT", "listenKey"): lambda ex, p: {},
+    ("DELETE", "listenKey"): lambda ex, p: {},
+}
+
+# === Démarrage ===
+class SimServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def start_server(host="127.0.0.1", port=8765, tick_seconds=1.0, faults=None, verbose=False, speed=1.0, **exchange_kwargs):
+    """
+    Démarre le simulateur en arrière-plan (utilisable depuis un benchmark).
+    speed : secondes de marché par seconde réelle (horloge virtuelle accélérée).
+    Retourne le serveur ; server.exchange donne accès à l'état, server.shutdown() l'arrête.
+    """
+    hub = Hub()
+    server = SimServer((host, port), SimHandler)
+    server.hub = hub
+    server.exchange = Exchange(publish=hub.publish, **exchange_kwargs)
+    server.faults = faults or Faults()
+    server.weights = WeightCounter()
+    server.message_id = 0
+    server.verbose = verbose
+    server.url = f"http://{host}:{server.server_address[1]}"
+    stop = threading.Event()
+
+    def ticker():
+        while not stop.wait(tick_seconds):
+            server.exchange.tick(tick_seconds * speed)
+
+    def get_stats():
+        with server.weights.lock:
+            endpoints = {k: dict(v) for k, v in server.weights.totals.items()}
+        with server.exchange.lock:
+            exchange_stats = dict(server.exchange.stats)
+        return {
+            "endpoints": endpoints,
+            "calls": sum(v["calls"] for v in endpoints.values()),
+            "weight": sum(v["weight"] for v in endpoints.values()),
+            "exchange": exchange_stats,
+            "telegram_messages": server.message_id,
+        }
+
+    server.get_stats = get_stats
+
+    threading.Thread(target=server.serve_forever, name="sim-http", daemon=True).start()
+    threading.Thread(target=ticker, name="sim-ticker", daemon=True).start()
+    original_shutdown = server.shutdown
+
+    def shutdown():
+        stop.set()
+        original_shutdown()
+        server.server_close()
+
+    server.shutdown = shutdown
+    return server
+
+def load_prices(path):
+    """
+    Prix enregistrés : un nombre par ligne, ou CSV avec une colonne "close".
+    """
+    import csv
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+    header = [c.strip().lower() for c in rows[0]]
+    if "close" in header:
+        col = header.index("close")
+        return [float(r[col]) for r in rows[1:] if len(r) > col]
+    return [float(r[0]) for r in rows if r and r[0].strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulateur Binance Futures local")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick", type=float, default=1.0, help="Pas du marché synthétique (s)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Secondes de marché par seconde réelle")
+    parser.add_argument("--replay", default="", help="SYMBOL=fichier : prix enregistrés (un par ligne, ou colonne close d'un CSV)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilité d'erreur injectée par requête")
+    parser.add_argument("--error-codes", default="", help="Codes injectés, ex : -2011,429,-1001")
+    parser.add_argument("--balance", type=float, default=1000.0)
+    parser.add_argument("--slippage-bps", type=float, default=0.0)
+    parser.add_argument("--volatility", type=float, default=0.0005, help="Écart-type relatif par seconde")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    codes = [int(c) for c in args.error_codes.split(",") if c.strip()]
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, codes, seed=args.seed)
+    replay = {}
+    if args.replay:
+        sym, _, path = args.replay.partition("=")
+        replay[sym.upper()] = load_prices(path)
+    server = start_server(args.host, args.port, args.tick, faults, args.verbose, args.speed,
+                          balance=args.balance, slippage_bps=args.slippage_bps,
+                          volatility=args.volatility, seed=args.seed, replay=replay)
+    print(f"🟢 Simulateur Binance en écoute sur {server.url} (WebSocket : {server.url.replace('http', 'ws', 1)}/ws)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n🔴 Arrêt du simulateur.")
+        server.shutdown()
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,112 +1,102 @@
-import time
-import threading
-import pandas as pd
-import traceback
-from ta.trend import EMAIndicator
-from core.config import symbol
+from core.config import symbol, symbols
 from core.telegram_controller import send_telegram
-from core.binance_client import client
-from strategies.ema_cross import trade_on_external_signal  # ou adapte si différent
+from core.notifier import INFO
+from core import kline_stream, latency, runtime
+from core.indicators import indicator_engine
+from strategies.ema_cross import trade_on_external_signal, run_symbol_checks  # ou adapte si différent
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 ema_window_short = 20
 ema_window_long = 50
-_last_signal = None
-
-# Cooldown Telegram
-TELEGRAM_COOLDOWN_SECONDS = 60
-_telegram_last_sent = 0
-_telegram_lock = threading.Lock()
-
-_last_cross_kline_time = None
+_last_signal = {}
 
-def can_send_telegram():
-    global _telegram_last_sent
-    with _telegram_lock:
-        now = time.time()
-        if now - _telegram_last_sent > TELEGRAM_COOLDOWN_SECONDS:
-            _telegram_last_sent = now
-            return True
-        return False
+_last_cross_kline_time = {}  # symbole -> bougie du dernier croisement traité
 
 def detect_ema_cross(ema_short, ema_long):
-    if len(ema_short) < 2 or len(ema_long) < 2:
+    """
+    ema_short / ema_long : (EMA dernière bougie clôturée, EMA bougie en cours).
+    """
+    if None in ema_short or None in ema_long:
         return None
-    if ema_short.iloc[-2] < ema_long.iloc[-2] and ema_short.iloc[-1] > ema_long.iloc[-1]:
+    if ema_short[-2] < ema_long[-2] and ema_short[-1] > ema_long[-1]:
         return "bullish"
-    elif ema_short.iloc[-2] > ema_long.iloc[-2] and ema_short.iloc[-1] < ema_long.iloc[-1]:
+    elif ema_short[-2] > ema_long[-2] and ema_short[-1] < ema_long[-1]:
         return "bearish"
     return None
 
-def get_5m_trend():
+def get_5m_trend(sym=symbol):
     try:
-        klines_5m = client.get_klines(symbol=symbol, interval="5m", limit=ema_window_long + 10)
-        closes_5m = [float(k[4]) for k in klines_5m]
-        if len(closes_5m) < ema_window_long:
-            print("Pas assez de bougies pour calculer les EMA 5m.")
+        candles_5m = kline_stream.get_candles(sym, "5m", ema_window_long + 10)
+        if len(candles_5m) < ema_window_long:
+            log.warning(f"Pas assez de bougies pour calculer les EMA 5m ({sym}).")
             return None
-        closes_series = pd.Series(closes_5m)
-        ema20 = EMAIndicator(closes_series, window=20).ema_indicator()
-        ema50 = EMAIndicator(closes_series, window=50).ema_indicator()
-        if ema20.iloc[-1] > ema50.iloc[-1]:
+        _, ema20 = indicator_engine.ema(sym, "5m", 20)
+        _, ema50 = indicator_engine.ema(sym, "5m", 50)
+        if ema20 is None or ema50 is None:
+            return None
+        if ema20 > ema50:
             return "bullish"
-        elif ema20.iloc[-1] < ema50.iloc[-1]:
+        elif ema20 < ema50:
             return "bearish"
         return None
     except Exception as e:
-        print(f"❌ Erreur get_5m_trend : {e}")
+        log.error(f"❌ Erreur get_5m_trend {sym} : {e}")
         return None
 
-def get_live_3m_ema_cross():
+def get_live_3m_ema_cross(sym=symbol):
     try:
-        klines = client.get_klines(symbol=symbol, interval="3m", limit=ema_window_long + 10)
-        closes_3m = [float(k[4]) for k in klines]  # Utilise toutes les bougies, y compris la dernière
-        if len(closes_3m) < ema_window_long:
-            print("Pas assez de bougies pour calculer les EMA 3m.")
+        candles = kline_stream.get_candles(sym, "3m", ema_window_long + 10)  # Bougie en cours incluse
+        if len(candles) < ema_window_long:
+            log.warning(f"Pas assez de bougies pour calculer les EMA 3m ({sym}).")
             return None, None
-        closes_series = pd.Series(closes_3m)
-        ema20 = EMAIndicator(closes_series, window=ema_window_short).ema_indicator()
-        ema50 = EMAIndicator(closes_series, window=ema_window_long).ema_indicator()
+        ema20 = indicator_engine.ema(sym, "3m", ema_window_short)
+        ema50 = indicator_engine.ema(sym, "3m", ema_window_long)
         signal = detect_ema_cross(ema20, ema50)
-        last_kline_time = int(klines[-1][0])  # timestamp de la dernière bougie (en cours)
+        last_kline_time = int(candles.open_time[-1])  # timestamp de la dernière bougie (en cours)
         return signal, last_kline_time
     except Exception as e:
-        print(f"❌ Erreur get_live_3m_ema_cross : {e}")
-        if can_send_telegram():
-            send_telegram(f"❌ Erreur EMA 3m : {e}")
+        log.error(f"❌ Erreur get_live_3m_ema_cross {sym} : {e}")
+        # Erreur répétée à chaque bougie : regroupée par la file d'envoi (fenêtre des informatifs)
+        send_telegram(f"❌ Erreur EMA 3m {sym} : {e}", priority=INFO)
         return None, None
 
-def start_ema_3m_loop():
-    global _last_signal, _last_cross_kline_time
-    _, last_kline_time = get_live_3m_ema_cross()
-    _last_cross_kline_time = last_kline_time
+def check_3m_cross(sym):
+    """
+    Une vérification EMA 3m (+ filtre de tendance 5m) pour un symbole.
+    """
+    # Trace de latence : mise à jour de bougie -> position protégée
+    with latency.trace("trade", source="ema_3m_loop", symbol=sym) as tr:
+        signal, cross_kline_time = get_live_3m_ema_cross(sym)
+        log.debug(f"Signal EMA 3m {sym} : {signal}, Timestamp : {cross_kline_time}")
+        if not signal or cross_kline_time == _last_cross_kline_time.get(sym):
+            log.debug("Aucun nouveau signal ou déjà traité.")
+            tr.discard()
+            return
+        latency.mark("signal.detect")
+        trend_5m = get_5m_trend(sym)
+        log.debug(f"Tendance EMA 5m {sym} : {trend_5m}")
+        # Confirmation stricte de la tendance EMA 5m
+        if (signal == "bullish" and trend_5m == "bullish") or (signal == "bearish" and trend_5m == "bearish"):
+            latency.mark("signal.trend_filter")
+            try:
+                trade_on_external_signal(signal, source="ema_3m_loop", sym=sym)
+                send_telegram(f"🚦 Trade {signal} {sym} confirmé par tendance 5m (EMA 3m)")
+                _last_signal[sym] = signal
+                _last_cross_kline_time[sym] = cross_kline_time
+            except Exception as e:
+                log.error(f"❌ Erreur lors de la prise de position {sym} : {e}")
+                send_telegram(f"❌ Erreur trade EMA 3m {sym} : {e}")
+                # NE PAS mettre à jour _last_cross_kline_time ici pour pouvoir retenter
+        else:
+            tr.discard()
 
-    def loop():
-        global _last_signal, _last_cross_kline_time
-        if can_send_telegram():
-            send_telegram("⏰ Boucle EMA 3min + filtre 5min ACTIVÉE")
-        while True:
-            time.sleep(5)
-            signal, cross_kline_time = get_live_3m_ema_cross()
-            print(f"[DEBUG] Signal EMA 3m : {signal}, Timestamp : {cross_kline_time}")
-            if not signal or cross_kline_time == _last_cross_kline_time:
-                print("Aucun nouveau signal ou déjà traité.")
-                continue
-            trend_5m = get_5m_trend()
-            print(f"[DEBUG] Tendance EMA 5m : {trend_5m}")
-            # Confirmation stricte de la tendance EMA 5m
-            if (signal == "bullish" and trend_5m == "bullish") or (signal == "bearish" and trend_5m == "bearish"):
-                try:
-                    trade_on_external_signal(signal, source="ema_3m_loop")
-                    if can_send_telegram():
-                        send_telegram(f"🚦 Trade {signal} confirmé par tendance 5m (EMA 3m)")
-                    _last_signal = signal
-                    _last_cross_kline_time = cross_kline_time
-                except Exception as e:
-                    print(f"❌ Erreur lors de la prise de position : {e}")
-                    if can_send_telegram():
-                        send_telegram(f"❌ Erreur trade EMA 3m : {e}")
-                    # NE PAS mettre à jour _last_cross_kline_time ici pour pouvoir retenter
+async def ema_3m_loop():
+    send_telegram(f"⏰ Boucle EMA 3min + filtre 5min ACTIVÉE ({len(symbols)} symbole(s))")
+    await run_symbol_checks(check_3m_cross, "3m", "EMA 3m")
 
-    t = threading.Thread(target=loop, daemon=True)
-    t.start()
-    return t
+def start_ema_3m_loop():
+    for sym in symbols:
+        _, _last_cross_kline_time[sym] = get_live_3m_ema_cross(sym)
+    runtime.spawn(ema_3m_loop, name="ema_3m")
@@ -1,109 +1,133 @@
 import time
 import json
+import asyncio
 import threading
-import traceback
-import pandas as pd
-from ta.trend import EMAIndicator
+from collections import defaultdict
 
-from core.config import symbol, ema_interval, ema_lookback
-from core.binance_client import client
+from core.config import symbol, symbols, ema_interval, ema_lookback
+from core import kline_stream, latency, runtime
+from core.indicators import indicator_engine
 from core.trade_interface import open_trade, close_position
 from core.trading_utils import get_leverage_from_file
-from core.state import state
+from core.state import states
 from core.telegram_controller import send_telegram
+from core.notifier import INFO
+from core.log import get_logger
 
-# === États & Verrous ===
-_last_signal_lock = threading.Lock()
-_last_signal = None
+log = get_logger(__name__)
 
-# === Cooldown Telegram ===
-_telegram_cooldown_lock = threading.Lock()
-_telegram_last_sent = 0
-TELEGRAM_COOLDOWN_SECONDS = 60
-
-def can_send_telegram():
-    global _telegram_last_sent
-    with _telegram_cooldown_lock:
-        now = time.time()
-        if now - _telegram_last_sent > TELEGRAM_COOLDOWN_SECONDS:
-            _telegram_last_sent = now
-            return True
-        return False
+# === États & Verrous (par symbole) ===
+_last_signal_locks = defaultdict(threading.Lock)
+_last_signal = {}
 
 # === Détection croisement EMA ===
 def detect_ema_cross(ema_short, ema_long):
-    if len(ema_short) < 2 or len(ema_long) < 2:
+    """
+    ema_short / ema_long : (EMA dernière bougie clôturée, EMA bougie en cours).
+    """
+    if None in ema_short or None in ema_long:
         return None
-    if ema_short.iloc[-2] < ema_long.iloc[-2] and ema_short.iloc[-1] > ema_long.iloc[-1]:
+    if ema_short[-2] < ema_long[-2] and ema_short[-1] > ema_long[-1]:
         return "bullish"
-    elif ema_short.iloc[-2] > ema_long.iloc[-2] and ema_short.iloc[-1] < ema_long.iloc[-1]:
+    elif ema_short[-2] > ema_long[-2] and ema_short[-1] < ema_long[-1]:
         return "bearish"
     return None
 
-def trade_on_external_signal(direction: str, source: str = "   EMA_loop"):
-    global _last_signal
-    with _last_signal_lock:
-        if state.position_open:
-            close_position()
+def trade_on_external_signal(direction: str, source: str = "   EMA_loop", sym: str = symbol):
+    latency.mark("signal.dispatch")
+    # Verrou par symbole : un signal sur une paire n'attend pas l'ouverture d'une autre
+    with _last_signal_locks[sym]:
+        if states.get(sym).position_open:
+            close_position(sym)
             time.sleep(1)
-        open_trade(direction)
-        if can_send_telegram():
-            send_telegram(f"🚦 Trade {direction.upper()} ouvert par {source}")
-        _last_signal = direction
+            latency.mark("signal.close_previous")
+        open_trade(direction, sym=sym)
+        send_telegram(f"🚦 Trade {direction.upper()} {sym} ouvert par {source}")
+        _last_signal[sym] = direction
 
-_last_cross_kline_time = None
+_last_cross_kline_time = {}  # symbole -> bougie du dernier croisement traité
 
-# === Vérifie croisement EMA via REST ===
-def get_live_ema_cross():
+# === Vérifie croisement EMA (candle_store partagé + EMA incrémentales) ===
+def get_live_ema_cross(sym=symbol):
     try:
-        klines = client.get_klines(symbol=symbol, interval=ema_interval, limit=ema_lookback)
-        closes_data = [float(k[4]) for k in klines]  # Utilise toutes les bougies, y compris la dernière
-        closes_series = pd.Series(closes_data)
-        ema20 = EMAIndicator(closes_series, window=20).ema_indicator()
-        ema50 = EMAIndicator(closes_series, window=50).ema_indicator()
+        candles = kline_stream.get_candles(sym, ema_interval, ema_lookback)
+        # EMA incrémentales : dernière bougie clôturée + valeur provisoire de la bougie en cours
+        ema20 = indicator_engine.ema(sym, ema_interval, 20)
+        ema50 = indicator_engine.ema(sym, ema_interval, 50)
         signal = detect_ema_cross(ema20, ema50)
-        last_kline_time = int(klines[-1][0])  # timestamp de la dernière bougie (en cours)
+        last_kline_time = int(candles.open_time[-1])  # timestamp de la dernière bougie (en cours)
         return signal, last_kline_time
     except Exception as e:
-        print(f"❌ Erreur EMA Check : {e}")
-        if can_send_telegram():
-            send_telegram(f"❌ Erreur EMA Check : {e}")
+        log.error(f"❌ Erreur EMA Check {sym} : {e}")
+        # Erreur répétée à chaque bougie : regroupée par la file d'envoi (fenêtre des informatifs)
+        send_telegram(f"❌ Erreur EMA Check {sym} : {e}", priority=INFO)
         return None, None
 
-# === Boucle EMA toutes les 5 secondes ===
-def start_ema_5m_loop():
-    global _last_signal, _last_cross_kline_time
-    # Initialisation pour ignorer les croisements passés
-    _, last_kline_time = get_live_ema_cross()
-    _last_cross_kline_time = last_kline_time
+def check_ema_cross(sym):
+    """
+    Une vérification EMA 5m pour un symbole : trade si nouveau croisement sur une nouvelle bougie.
+    """
+    # Trace de latence : mise à jour de bougie -> position protégée
+    with latency.trace("trade", source="ema_timer_5m", symbol=sym) as tr:
+        signal, cross_kline_time = get_live_ema_cross(sym)
+        # Si nouveau croisement sur une nouvelle bougie
+        if not signal or cross_kline_time == _last_cross_kline_time.get(sym):
+            tr.discard()
+            return
+        latency.mark("signal.detect")
+        try:
+            trade_on_external_signal(signal, source="ema_timer_5m", sym=sym)
+            _last_cross_kline_time[sym] = cross_kline_time
+            _last_signal[sym] = signal
+            send_telegram(f"🚦 Nouveau croisement EMA 5min détecté sur {sym} : {signal.upper()}")
+            log.info(f"📢 Signal EMA 5min {sym} : {signal.upper()} détecté et envoyé.")
+        except Exception as e:
+            log.error(f"❌ Erreur lors de la prise de position {sym} : {e}")
+            _last_cross_kline_time[sym] = cross_kline_time
 
-    def loop():
-        global _last_signal, _last_cross_kline_time
-        print("🟢 Boucle EMA 5m démarrée (vérification toutes les 5s)")
-        while True:
-            time.sleep(5)
-            print("🔄 Vérification EMA 5m en cours...")
+async def run_symbol_checks(check, interval, label, timeout=5):
+    """
+    Boucle de stratégie commune (coroutine du runtime) : réveil à chaque mise à
+    jour de bougie (timeout max), puis check(sym) dans le pool du runtime pour
+    chaque paire dont la série `interval` a bougé (toutes au timeout : get_candles
+    relance le repli REST si le flux est figé). Une paire dont la vérification
+    précédente est encore en cours (ouverture de trade) est sautée ; les autres
+    ne l'attendent pas.
+    """
+    seen = {}
+    inflight = {}
 
-            signal, cross_kline_time = get_live_ema_cross()
-            if not signal:
-                continue
+    def finished(sym, fut):
+        inflight.pop(sym, None)
+        if not fut.cancelled() and fut.exception() is not None:
+            log.error(f"❌ Erreur boucle {label} {sym} : {fut.exception()}")
 
-            # Si nouveau croisement sur une nouvelle bougie
-            if cross_kline_time != _last_cross_kline_time:
-                try:
-                    trade_on_external_signal(signal, source="ema_timer_5m")
-                    _last_cross_kline_time = cross_kline_time
-                    _last_signal = signal
-                    if can_send_telegram():
-                        send_telegram(f"🚦 Nouveau croisement EMA 5min détecté : {signal.upper()}")
-                        print(f"📢 Signal EMA 5min : {signal.upper()} détecté et envoyé.")
-                except Exception as e:
-                    print(f"❌ Erreur lors de la prise de position : {e}")
-                    _last_cross_kline_time = cross_kline_time
-            else:
-                continue
+    try:
+        while True:
+            count = kline_stream.update_count()
+            updated = await kline_stream.wait_for_any_update_async(count, timeout)
+            for sym in symbols:
+                if sym in inflight:
+                    continue
+                version = kline_stream.series_version(sym, interval)
+                if updated and seen.get(sym) == version:
+                    continue
+                seen[sym] = version
+                fut = asyncio.ensure_future(runtime.run_blocking(check, sym))
+                inflight[sym] = fut
+                fut.add_done_callback(lambda f, s=sym: finished(s, f))
+    finally:
+        for fut in list(inflight.values()):
+            fut.cancel()
+
+# === Boucle EMA : une seule coroutine pour tous les symboles, réveil à chaque mise à jour de bougie (5s max) ===
+async def ema_5m_loop():
+    log.info(f"🟢 Boucle EMA 5m démarrée sur {len(symbols)} symbole(s) (vérification à chaque mise à jour de bougie)")
+    await run_symbol_checks(check_ema_cross, ema_interval, "EMA 5m")
 
-    t = threading.Thread(target=loop, daemon=True)
-    t.start()
-    return t
+def start_ema_5m_loop():
+    # Initialisation pour ignorer les croisements passés
+    for sym in symbols:
+        _, _last_cross_kline_time[sym] = get_live_ema_cross(sym)
+    runtime.spawn(ema_5m_loop, name="ema_5m")
 